@@ -83,6 +83,18 @@ module airfoil_evaluation
 
   type(xfoil_options_type)       :: xfoil_options
   type(xfoil_geom_options_type)  :: xfoil_geom_options
+
+! Live channel to the visualizer (write_live_designs)
+  integer, parameter :: live_nslots = 64              ! designs kept in the ring
+  integer, parameter :: live_version = 1
+  integer, parameter :: live_headersize = 64          ! bytes
+  integer            :: live_maxpoints = 0            ! 0: file not created yet
+  integer            :: live_sequence = 0             ! designs published
+
+! Binary design history (write_binary_designs)
+  integer, parameter :: binary_version = 1
+  integer, parameter :: binary_headersize = 256       ! bytes
+  integer            :: binary_maxpoints = 0          ! 0: header not read yet
   
 
 contains
@@ -863,12 +875,14 @@ end function matchfoil_objective_function
 ! Generic function to write designs. Selects either 
 ! write_airfoil_optimization_progress or write_matchfoil_optimization_progress
 ! depending on whether match_foils = .true. or not.
+! fmin is the objective function of the design (of the optimizer)
 !
 !=============================================================================80
-function write_function(designvars, designcounter)
+function write_function(designvars, designcounter, fmin)
 
   double precision, dimension(:), intent(in) :: designvars
   integer, intent(in) :: designcounter
+  double precision, intent(in) :: fmin
   integer :: write_function
 
   if (match_foils) then
@@ -876,7 +890,7 @@ function write_function(designvars, designcounter)
                                                            designcounter)
   else
     write_function = write_airfoil_optimization_progress(designvars,           &
-                                                         designcounter)
+                                                         designcounter, fmin)
   end if
 
 end function write_function
@@ -1075,7 +1089,8 @@ end subroutine get_flap_degrees_from_design
 ! Writes airfoil coordinates and polars to files during optimization
 !
 !=============================================================================80
-function write_airfoil_optimization_progress(designvars, designcounter)
+function write_airfoil_optimization_progress(designvars, designcounter,      &
+                                             objective)
 
   use math_deps,          only : interp_vector 
   use airfoil_operations, only : airfoil_write_to_unit
@@ -1084,6 +1099,7 @@ function write_airfoil_optimization_progress(designvars, designcounter)
 
   double precision, dimension(:), intent(in) :: designvars
   integer, intent(in) :: designcounter
+  double precision, intent(in) :: objective
   integer :: write_airfoil_optimization_progress
 
   type(airfoil_type)       :: foil
@@ -1098,8 +1114,10 @@ function write_airfoil_optimization_progress(designvars, designcounter)
   double precision, dimension(noppoint) :: actual_flap_degrees
   double precision :: maxt, xmaxt, maxc, xmaxc
  
-  character(100) :: foilfile, polarfile, text, title
+  character(100) :: foilfile, polarfile, text
+  character(150) :: title
   character(8) :: maxtchar, xmaxtchar, maxcchar, xmaxcchar
+  character(8) :: npointchar, noppointchar
   integer :: foilunit, polarunit
   logical :: xfoil_reinitialize
 
@@ -1154,92 +1172,129 @@ function write_airfoil_optimization_progress(designvars, designcounter)
   write(xmaxcchar,'(F8.5)') xmaxc
   xmaxcchar = adjustl(xmaxcchar)
 
+! Number of lines of the zones (I=...) - the visualizer reads a zone only
+!      when it's complete
+
+  if (designcounter == 0) then
+    write(npointchar,'(I8)') seed_foil_not_smoothed%npoint
+  else
+    write(npointchar,'(I8)') foil%npoint
+  end if
+  npointchar = adjustl(npointchar)
+  write(noppointchar,'(I8)') noppoint
+  noppointchar = adjustl(noppointchar)
+
+! Write design - to the binary design history or as Tecplot zones to the
+!                coordinates and polars file
+
+  if (write_binary_designs) then
+
+    if (designcounter == 0) foil = seed_foil_not_smoothed
+    if (write_binary_design (designcounter, foil, maxt, xmaxt, maxc, xmaxc,   &
+                             op_points_result, actual_flap_degrees) /= 0) then
+      write_airfoil_optimization_progress = 1
+      return
+    end if
+
+  else
+
 ! Set output file names and identifiers
 
-  foilfile = trim(output_prefix)//'_design_coordinates.dat'
-  polarfile = trim(output_prefix)//'_design_polars.dat'
+    foilfile = trim(output_prefix)//'_design_coordinates.dat'
+    polarfile = trim(output_prefix)//'_design_polars.dat'
 
-  foilunit = 13
-  polarunit = 14
+    foilunit = 13
+    polarunit = 14
 
 ! Open files and write headers, if necessary
 
-  if (designcounter == 0) then
+    if (designcounter == 0) then
 
 !   Header for coordinate file
 
-    open(unit=foilunit, file=foilfile, status='replace')
-    write(foilunit,'(A)') 'title="Airfoil coordinates"'
+      open(unit=foilunit, file=foilfile, status='replace')
+      write(foilunit,'(A)') 'title="Airfoil coordinates"'
 
 !  Add 2nd and 3rd derivative to
 !        ...design_coordinates.dat to show it in visualizer
-    write(foilunit,'(A)') 'variables="x" "z" "2nd derivative" "3rd derivative"'
+      write(foilunit,'(A)') 'variables="x" "z" "2nd derivative" "3rd derivative"'
 
-    title =  'zone t="Seed airfoil, maxt='//trim(maxtchar)//&
-             ', xmaxt='//trim(xmaxtchar)//', maxc='//&
-              trim(maxcchar)//', xmaxc='//trim(xmaxcchar)//'"'
+      title =  'zone t="Seed airfoil, maxt='//trim(maxtchar)//&
+               ', xmaxt='//trim(xmaxtchar)//', maxc='//&
+                trim(maxcchar)//', xmaxc='//trim(xmaxcchar)//'", '//&
+               'I='//trim(npointchar)
 
 !   Header for polar file
 
-    open(unit=polarunit, file=polarfile, status='replace')
-    write(polarunit,'(A)') 'title="Airfoil polars"'
+      open(unit=polarunit, file=polarfile, status='replace')
+      write(polarunit,'(A)') 'title="Airfoil polars"'
 
 !   Add current flap angle to polars to show it in visualizer
-    write(polarunit,'(A)') 'variables="alpha" "cl" "cd" "cm" "xtrt" "xtrb" "flapangle"'
-    write(polarunit,'(A)') 'zone t="Seed airfoil polar"'
+      write(polarunit,'(A)') 'variables="alpha" "cl" "cd" "cm" "xtrt" "xtrb" "flapangle"'
+      write(polarunit,'(A)') 'zone t="Seed airfoil polar", I='//trim(noppointchar)
 
-  else
+    else
 
 !   Open coordinate file and write zone header
 
-    open(unit=foilunit, file=foilfile, status='old', position='append', err=900)
-    title =  'zone t="Airfoil, maxt='//trim(maxtchar)//&
-             ', xmaxt='//trim(xmaxtchar)//', maxc='//&
-              trim(maxcchar)//', xmaxc='//trim(xmaxcchar)//'", '//&
-             'SOLUTIONTIME='//trim(text)
+      open(unit=foilunit, file=foilfile, status='old', position='append', err=900)
+      title =  'zone t="Airfoil, maxt='//trim(maxtchar)//&
+               ', xmaxt='//trim(xmaxtchar)//', maxc='//&
+                trim(maxcchar)//', xmaxc='//trim(xmaxcchar)//'", '//&
+               'I='//trim(npointchar)//', SOLUTIONTIME='//trim(text)
 
 !   Open polar file and write zone header
 
-    open(unit=polarunit, file=polarfile, status='old', position='append',      &
-         err=901)
-    write(polarunit,'(A)') 'zone t="Polars", SOLUTIONTIME='//trim(text)
+      open(unit=polarunit, file=polarfile, status='old', position='append',      &
+           err=901)
+      write(polarunit,'(A)') 'zone t="Polars", I='//trim(noppointchar)//         &
+                             ', SOLUTIONTIME='//trim(text)
 
-  end if
+    end if
 
 ! Write coordinates to file
 
-  ! Design 0 is seed airfoil to output - take the original values 
-  ! Take the original, not smoothed seed airfoil to
-  !      ...design_coordinates.dat to show it in visualizer
+    ! Design 0 is seed airfoil to output - take the original values 
+    ! Take the original, not smoothed seed airfoil to
+    !      ...design_coordinates.dat to show it in visualizer
 
-  if (designcounter == 0) then
-    call  airfoil_write_to_unit (foilunit, title, seed_foil_not_smoothed, .True.)
-    foil = seed_foil_not_smoothed
-  else 
-    call  airfoil_write_to_unit (foilunit, title, foil, .True.)
-  end if 
+    if (designcounter == 0) then
+      call  airfoil_write_to_unit (foilunit, title, seed_foil_not_smoothed, .True.)
+      foil = seed_foil_not_smoothed
+    else 
+      call  airfoil_write_to_unit (foilunit, title, foil, .True.)
+    end if 
 
 ! Write polars to file
 
-  do i = 1, noppoint
+    do i = 1, noppoint
 
-    op = op_points_result(i) 
+      op = op_points_result(i) 
 
-    if (.not. op%converged) then 
-      write(text,*) i
-      text = adjustl(text)
-      call print_error ('  Error: Op '//trim(text) // &
-                        ' not converged in final calculation (this should not happen...)')
-    end if 
-    ! Add current flap angle to polars to show it in visualizer
-    write(polarunit,'(6ES14.6, 1ES14.3)') op%alpha, op%cl, op%cd, op%cm, &
-                                          op%xtrt, op%xtrb, actual_flap_degrees (i)
-  end do
+      if (.not. op%converged) then 
+        write(text,*) i
+        text = adjustl(text)
+        call print_error ('  Error: Op '//trim(text) // &
+                          ' not converged in final calculation (this should not happen...)')
+      end if 
+      ! Add current flap angle to polars to show it in visualizer
+      write(polarunit,'(6ES14.6, 1ES14.3)') op%alpha, op%cl, op%cd, op%cm, &
+                                            op%xtrt, op%xtrb, actual_flap_degrees (i)
+    end do
 
 ! Close output files
 
-  close(foilunit)
-  close(polarunit)
+    close(foilunit)
+    close(polarunit)
+
+  end if
+
+! Publish design to the live channel of the visualizer 
+
+  if (write_live_designs) then
+    call write_live_design (designcounter, foil, objective, maxt, xmaxt,       &
+                            maxc, xmaxc, op_points_result, actual_flap_degrees)
+  end if
 
   if (show_details .and. (designcounter > 0)) then 
     call show_op_optimization_progress  (op_points_result) 
@@ -1267,6 +1322,228 @@ function write_airfoil_optimization_progress(designvars, designcounter)
 
 end function write_airfoil_optimization_progress
 
+!=============================================================================80
+!
+! Writes a design as record to the binary design history of the visualizer
+!      <output_prefix>_design_history.bin   (instead of the Tecplot zones of 
+!                                           the coordinates and polars file)
+!
+! Native byte order. The header (256 bytes) holds 'XOPTDSGN', version, header 
+! size, max. number of points, noppoint, number of coordinate and polar 
+! columns (4 byte integers) and the names of the columns. Each design - the 
+! seed airfoil first - is a record of fixed width with 8 byte reals:
+!
+!   design number, npoint, maxt, xmaxt, maxc, xmaxc, 
+!   x, z, 2nd and 3rd derivative (max. number of points each, 0 behind npoint),
+!   alpha, cl, cd, cm, xtrt, xtrb, flap angle (noppoint each)
+!
+!=============================================================================80
+function write_binary_design (designcounter, foil, maxt, xmaxt, maxc, xmaxc,  &
+                              op_points_result, actual_flap_degrees)
+
+  use math_deps,    only : derivation2, derivation3 
+  use xfoil_driver, only : op_point_result_type
+
+  integer, intent(in) :: designcounter
+  type(airfoil_type), intent(in) :: foil
+  double precision, intent(in) :: maxt, xmaxt, maxc, xmaxc
+  type(op_point_result_type), dimension(:), intent(in) :: op_points_result
+  double precision, dimension(:), intent(in) :: actual_flap_degrees
+  integer :: write_binary_design
+
+  integer :: binunit, npoint, i
+  character(100) :: binfile
+  character(8) :: magic
+  character(224) :: columns
+  double precision, dimension(:,:), allocatable :: coords, polars
+
+  binfile = trim(output_prefix)//'_design_history.bin'
+  binunit = 16
+  write_binary_design = 0
+
+! A new optimization writes the header, a restarted one continues the file 
+
+  if (designcounter == 0) then
+
+    binary_maxpoints = max(seed_foil%npoint, seed_foil_not_smoothed%npoint, foil%npoint)
+    columns = 'designnum npoint maxt xmaxt maxc xmaxc | x z deriv2 deriv3 | '//&
+              'alpha cl cd cm xtrt xtrb flapangle'
+
+    open(unit=binunit, file=binfile, status='replace', access='stream',        &
+         form='unformatted', err=900)
+    write(binunit) 'XOPTDSGN', binary_version, binary_headersize,              &
+                   binary_maxpoints, noppoint, 4, 7, columns
+    close(binunit)
+
+  else if (binary_maxpoints == 0) then
+
+    open(unit=binunit, file=binfile, status='old', access='stream',            &
+         form='unformatted', err=900)
+    read(binunit, pos=1) magic
+    read(binunit, pos=17) binary_maxpoints
+    close(binunit)
+    if (magic /= 'XOPTDSGN') goto 900
+
+  end if
+
+  npoint = foil%npoint
+  if (npoint > binary_maxpoints) then
+    call print_warning ('Design has more points than the design history. Skipping ...')
+    write_binary_design = 1
+    return
+  end if
+
+! Record of the design 
+
+  allocate (coords(binary_maxpoints, 4), polars(noppoint, 7))
+  coords = 0d0
+  coords(1:npoint,1) = foil%x
+  coords(1:npoint,2) = foil%z
+  coords(1:npoint,3) = derivation2 (npoint, foil%x, foil%z)
+  coords(1:npoint,4) = derivation3 (npoint, foil%x, foil%z)
+
+  do i = 1, noppoint
+    polars(i,:) = (/ op_points_result(i)%alpha, op_points_result(i)%cl,        &
+                     op_points_result(i)%cd,    op_points_result(i)%cm,        &
+                     op_points_result(i)%xtrt,  op_points_result(i)%xtrb,      &
+                     actual_flap_degrees(i) /)
+  end do
+
+  open(unit=binunit, file=binfile, status='old', access='stream',              &
+       form='unformatted', position='append', err=900)
+  write(binunit) dble(designcounter), dble(npoint), maxt, xmaxt, maxc, xmaxc,  &
+                 coords, polars
+  close(binunit)
+
+  return
+
+900 call print_warning ('Unable to write '//trim(binfile)//'. Skipping ...')
+  binary_maxpoints = 0
+  write_binary_design = 1
+
+end function write_binary_design
+
+!=============================================================================80
+!
+! Publishes a design to the live channel of the visualizer 
+!      <output_prefix>_design_live.bin
+!
+! The file has a fixed layout, so the visualizer maps it into memory and takes
+! the latest designs without parsing text. Native byte order, 8 byte reals: 
+!
+!   header (64 bytes)  'XOPTLIVE', version, number of slots, max. number of
+!                      points, noppoint (4 byte integers) and sequence number
+!                      of the latest design (8 byte integer)
+!   slots (ring)       sequence number (8 byte integer), design number, npoint,
+!                      objective, maxt, xmaxt, maxc, xmaxc, 
+!                      x, z, 2nd and 3rd derivative (max. number of points each),
+!                      alpha, cl, cd, cm, xtrt, xtrb, flap angle (noppoint each)
+!
+! The sequence number of a slot is -1 while the slot is written.
+!
+!=============================================================================80
+subroutine write_live_design (designcounter, foil, objective, maxt, xmaxt,    &
+                              maxc, xmaxc, op_points_result, actual_flap_degrees)
+
+  use math_deps,    only : derivation2, derivation3 
+  use xfoil_driver, only : op_point_result_type
+
+  integer, intent(in) :: designcounter
+  type(airfoil_type), intent(in) :: foil
+  double precision, intent(in) :: objective, maxt, xmaxt, maxc, xmaxc
+  type(op_point_result_type), dimension(:), intent(in) :: op_points_result
+  double precision, dimension(:), intent(in) :: actual_flap_degrees
+
+  integer, parameter :: i8 = selected_int_kind(18)
+  integer(i8) :: slotsize, pos
+  integer :: liveunit, npoint, i
+  character(100) :: livefile
+  double precision, dimension(:,:), allocatable :: coords, polars
+
+  livefile = trim(output_prefix)//'_design_live.bin'
+  liveunit = 16
+
+! A new optimization (or a restarted one) initializes the file with empty 
+!   slots. The file is never truncated - the visualizer may have mapped it.
+
+  if ((designcounter == 0) .or. (live_maxpoints == 0)) then
+
+    live_maxpoints = max(seed_foil%npoint, seed_foil_not_smoothed%npoint, foil%npoint)
+    live_sequence  = 0
+    slotsize = get_live_slotsize (live_maxpoints, noppoint)
+
+    open(unit=liveunit, file=livefile, status='unknown', access='stream',      &
+         form='unformatted', err=900)
+    write(liveunit, pos=1) 'XOPTLIVE', live_version, live_nslots,              &
+                           live_maxpoints, noppoint, int(live_sequence, i8)
+    do i = 1, live_nslots
+      write(liveunit, pos=live_headersize + (i-1) * slotsize + 1) -1_i8
+    end do 
+    write(liveunit, pos=live_headersize + live_nslots * slotsize) char(0)
+    close(liveunit)
+  end if
+
+  npoint = foil%npoint
+  if (npoint > live_maxpoints) then
+    call print_warning ('Design has more points than the live channel. Skipping ...')
+    return
+  end if
+
+! Design data in the layout of a slot 
+
+  allocate (coords(live_maxpoints, 4), polars(noppoint, 7))
+  coords = 0d0
+  coords(1:npoint,1) = foil%x
+  coords(1:npoint,2) = foil%z
+  coords(1:npoint,3) = derivation2 (npoint, foil%x, foil%z)
+  coords(1:npoint,4) = derivation3 (npoint, foil%x, foil%z)
+
+  do i = 1, noppoint
+    polars(i,:) = (/ op_points_result(i)%alpha, op_points_result(i)%cl,        &
+                     op_points_result(i)%cd,    op_points_result(i)%cm,        &
+                     op_points_result(i)%xtrt,  op_points_result(i)%xtrb,      &
+                     actual_flap_degrees(i) /)
+  end do
+
+! Write slot - invalidate it first, so the visualizer doesn't take a half 
+!              written design. Header sequence is updated at last.
+
+  live_sequence = live_sequence + 1
+  slotsize = get_live_slotsize (live_maxpoints, noppoint)
+  pos = live_headersize + mod(live_sequence - 1, live_nslots) * slotsize + 1
+
+  open(unit=liveunit, file=livefile, status='old', access='stream',            &
+       form='unformatted', err=900)
+
+  write(liveunit, pos=pos) -1_i8
+  flush(liveunit)
+  write(liveunit, pos=pos+8) designcounter, npoint, objective, maxt, xmaxt,   &
+                             maxc, xmaxc, coords, polars
+  flush(liveunit)
+  write(liveunit, pos=pos) int(live_sequence, i8)
+  flush(liveunit)
+  write(liveunit, pos=25) int(live_sequence, i8)
+  close(liveunit)
+
+  return
+
+900 call print_warning ('Unable to open '//trim(livefile)//'. Skipping ...')
+  live_maxpoints = 0
+
+end subroutine write_live_design
+
+!-----------------------------------------------------------------------------
+! Bytes of a slot of the live channel 
+!-----------------------------------------------------------------------------
+function get_live_slotsize (maxpoints, noppoint)
+
+  integer, intent(in) :: maxpoints, noppoint
+  integer(selected_int_kind(18)) :: get_live_slotsize
+
+  get_live_slotsize = 56 + 8 * (4 * maxpoints + 7 * noppoint)
+
+end function get_live_slotsize
+
 !------------------------------------------------------------------------------
 !
 ! Prints op results during optimization 
@@ -1526,7 +1803,9 @@ function write_matchfoil_optimization_progress(designvars, designcounter)
   character(8) :: maxtchar, xmaxtchar, maxcchar, xmaxcchar
 
 
-  character(100) :: foilfile, text, title
+  character(100) :: foilfile, text
+  character(150) :: title
+  character(8) :: npointchar
   integer :: foilunit
 
   write(text,*) designcounter
@@ -1562,6 +1841,12 @@ function write_matchfoil_optimization_progress(designvars, designcounter)
   write(xmaxcchar,'(F8.5)') xmaxc
   xmaxcchar = adjustl(xmaxcchar)
 
+! Number of lines of the zone (I=...) - the visualizer reads a zone only
+!      when it's complete
+
+  write(npointchar,'(I8)') foil%npoint
+  npointchar = adjustl(npointchar)
+
 ! Set output file names and identifiers
 
   foilfile = trim(output_prefix)//'_design_coordinates.dat'
@@ -1577,7 +1862,8 @@ function write_matchfoil_optimization_progress(designvars, designcounter)
     write(foilunit,'(A)') 'variables="x" "z"'
     title = 'zone t="Seed airfoil", maxt='//trim(maxtchar)//&
             ', xmaxt='//trim(xmaxtchar)//', maxc='//&
-             trim(maxcchar)//', xmaxc='//trim(xmaxcchar)
+             trim(maxcchar)//', xmaxc='//trim(xmaxcchar)//&
+            ', I='//trim(npointchar)
   else
 
 !   Append to file: Header for design foil coordinates
@@ -1585,7 +1871,7 @@ function write_matchfoil_optimization_progress(designvars, designcounter)
     title =  'zone t="Airfoil, maxt='//trim(maxtchar)//&
              ', xmaxt='//trim(xmaxtchar)//', maxc='//&
               trim(maxcchar)//', xmaxc='//trim(xmaxcchar)//'", '//&
-             'SOLUTIONTIME='//trim(text)
+             'I='//trim(npointchar)//', SOLUTIONTIME='//trim(text)
   end if
 
   call  airfoil_write_to_unit (foilunit, title, foil, .True.)
@@ -1598,7 +1884,10 @@ function write_matchfoil_optimization_progress(designvars, designcounter)
     write (*,'(4x,A)') '-> Writing foil to match to file '//trim(output_prefix)//'[...].dat'
 
     open(unit=foilunit, file=foilfile, status='old', position='append', err=910)
-    call  airfoil_write_to_unit (foilunit, 'zone t="Match airfoil"', foil_to_match, .True.)
+    write(npointchar,'(I8)') foil_to_match%npoint
+    npointchar = adjustl(npointchar)
+    call  airfoil_write_to_unit (foilunit, 'zone t="Match airfoil", I='//trim(npointchar), &
+                                 foil_to_match, .True.)
     close(foilunit)  
   end if 
 
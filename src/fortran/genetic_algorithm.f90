@@ -110,9 +110,10 @@ subroutine geneticalgorithm(xopt, fmin, step, fevals, objfunc, x0, xmin, xmax, &
 
   optional :: converterfunc
   interface
-    integer function converterfunc(x, designcounter)
+    integer function converterfunc(x, designcounter, fmin)
       double precision, dimension(:), intent(in) :: x
       integer, intent(in) :: designcounter
+      double precision, intent(in) :: fmin
     end function
   end interface
 
@@ -353,7 +354,7 @@ subroutine geneticalgorithm(xopt, fmin, step, fevals, objfunc, x0, xmin, xmax, &
     if ( (signal_progress) .and. (ga_options%write_designs) ) then
       designcounter = designcounter + 1
       if (present(converterfunc)) then
-        stat = converterfunc(xopt, designcounter)
+        stat = converterfunc(xopt, designcounter, fmin)
       else
         call write_design('geneticalgorithm_designs.dat', 'old', xopt,         &
                           designcounter)
@@ -230,7 +230,7 @@ subroutine optimize(search_type, global_search, local_search, constrained_dvs, &
 
 !   Analyze and write seed airfoil
     write (*,'(" - ",A)') 'Writing design #0 being seed airfoil'
-    stat = write_function(x0, 0) 
+    stat = write_function(x0, 0, f0_ref) 
 
   end if
 
@@ -102,9 +102,10 @@ subroutine particleswarm(xopt, fmin, step, fevals, objfunc, x0, xmin, xmax,    &
 
   optional :: converterfunc
   interface
-    integer function converterfunc(x, designcounter)
+    integer function converterfunc(x, designcounter, fmin)
       double precision, dimension(:), intent(in) :: x
       integer, intent(in) :: designcounter
+      double precision, intent(in) :: fmin
     end function
   end interface
 
@@ -418,7 +419,7 @@ subroutine particleswarm(xopt, fmin, step, fevals, objfunc, x0, xmin, xmax,    &
     if ( (signal_progress) .and. (pso_options%write_designs) ) then
       designcounter = designcounter + 1
       if (present(converterfunc)) then
-        stat = converterfunc(xopt, designcounter)
+        stat = converterfunc(xopt, designcounter, fmin)
       else
         call write_design('particleswarm_designs.dat', 'old', xopt, designcounter)
       end if
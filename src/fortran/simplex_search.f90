@@ -71,9 +71,10 @@ subroutine simplexsearch(xopt, fmin, step, fevals, objfunc, x0, given_f0_ref,  &
 
   optional :: converterfunc
   interface
-    integer function converterfunc(x, designcounter)
+    integer function converterfunc(x, designcounter, fmin)
       double precision, dimension(:), intent(in) :: x
       integer, intent(in) :: designcounter
+      double precision, intent(in) :: fmin
     end function
   end interface
 
@@ -247,7 +248,7 @@ subroutine simplexsearch(xopt, fmin, step, fevals, objfunc, x0, given_f0_ref,  &
     if ( (signal_progress) .and. (ds_options%write_designs) ) then
       designcounter = designcounter + 1
       if (present(converterfunc)) then
-        stat = converterfunc(dv(:,1), designcounter)
+        stat = converterfunc(dv(:,1), designcounter, fmin)
       else
         call write_design('simplex_designs.dat', filestat, dv(:,1),            &
                           designcounter)
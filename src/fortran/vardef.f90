@@ -67,6 +67,12 @@ module vardef
 ! Show more infos during optimization
   logical :: show_details
 
+! Publish each design to the live channel of the visualizer
+  logical :: write_live_designs
+
+! Write designs to the binary design history instead of Tecplot zones
+  logical :: write_binary_designs
+
 ! --------------------------------------------------------------------------------
 
 ! #exp-dynamic mb-mod dynamic weighting
@@ -592,8 +592,9 @@ subroutine write_design_coordinates (output_prefix, designcounter, foil)
   type (airfoil_type), intent (in)  :: foil
 
   double precision :: maxt, xmaxt, maxc, xmaxc
-  character(100) :: foilfile, text, title
-  character(8)   :: maxtchar, xmaxtchar, maxcchar, xmaxcchar
+  character(100) :: foilfile, text
+  character(150) :: title
+  character(8)   :: maxtchar, xmaxtchar, maxcchar, xmaxcchar, npointchar
   integer :: foilunit
              
 ! Get geometry info
@@ -610,6 +611,12 @@ subroutine write_design_coordinates (output_prefix, designcounter, foil)
   write(xmaxcchar,'(F8.5)') xmaxc
   xmaxcchar = adjustl(xmaxcchar)
 
+! Number of lines of the zone (I=...) - the visualizer reads a zone only
+!      when it's complete
+
+  write(npointchar,'(I8)') foil%npoint
+  npointchar = adjustl(npointchar)
+
 ! Set output file names and identifiers
 
   foilfile = trim(output_prefix)//'_design_coordinates.dat'
@@ -632,7 +639,8 @@ subroutine write_design_coordinates (output_prefix, designcounter, foil)
 
     title =  'zone t="Seed airfoil, maxt='//trim(maxtchar)//&
              ', xmaxt='//trim(xmaxtchar)//', maxc='//&
-              trim(maxcchar)//', xmaxc='//trim(xmaxcchar)//'"'
+              trim(maxcchar)//', xmaxc='//trim(xmaxcchar)//'", '//&
+             'I='//trim(npointchar)
   else
 
 !   Open coordinate file and write zone header
@@ -644,7 +652,7 @@ subroutine write_design_coordinates (output_prefix, designcounter, foil)
     title =  'zone t="Airfoil, maxt='//trim(maxtchar)//&
              ', xmaxt='//trim(xmaxtchar)//', maxc='//&
               trim(maxcchar)//', xmaxc='//trim(xmaxcchar)//'", '//&
-             'SOLUTIONTIME='//trim(text)
+             'I='//trim(npointchar)//', SOLUTIONTIME='//trim(text)
 
   end if
 
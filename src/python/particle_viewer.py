@@ -23,6 +23,13 @@ import numpy as np
 import argparse
 import sys
 import math
+import gzip
+import lzma
+import io
+try:
+  import zstandard    # optional - to read particle files compressed with zstd
+except ImportError:
+  zstandard = None
 
 #fonts
 csfont = {'fontname':'Segoe Print'}
@@ -44,12 +51,35 @@ def my_input(message):
     return input(message)
 
 
+################################################################################
+# function that opens a text file, decompressing files compressed with
+# gzip, xz or zstd (recognized by their magic bytes) while reading
+def open_text_file(fileName):
+    with open(fileName, "rb") as file:
+        magic = file.read(6)
+
+    if magic.startswith(b'\x1f\x8b'):
+        return gzip.open(fileName, "rt")
+    elif magic.startswith(b'\xfd7zXZ\x00'):
+        return lzma.open(fileName, "rt")
+    elif magic.startswith(b'\x28\xb5\x2f\xfd'):
+        if zstandard is None:
+            print("Error: %s is compressed with zstd. Install the python "
+                  "package zstandard to read it." % fileName)
+            sys.exit(1)
+        stream = zstandard.ZstdDecompressor().stream_reader(open(fileName, "rb"),
+                                                             closefd=True)
+        return io.TextIOWrapper(stream)
+    else:
+        return open(fileName, "r")
+
+
 ################################################################################
 # function that reads particle-data from file
 def read_particleFile(fileName):
     # open file containing particle-information position and velocity
     print ("Reading file %s.." % fileName)
-    file = open(fileName, "r")
+    file = open_text_file(fileName)
 
     # create empty list
     AllIterations = []
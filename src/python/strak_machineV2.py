@@ -33,6 +33,13 @@ from colorama import init
 from termcolor import colored
 import change_airfoilname
 import re
+import gzip
+import lzma
+import io
+try:
+    import zstandard    # optional - to read polars compressed with zstd
+except ImportError:
+    zstandard = None
 
 # paths and separators
 bs = "\\"
@@ -150,6 +157,29 @@ def remove_suffix(text, suffix):
         ErrorMsg("remove_suffix failed, text was %s, suffix was %s" % (text, suffix))
     return text
 
+
+# opens a text-file for reading, a file compressed with gzip, xz or zstd
+# (e.g. of an archived run) is recognized by its magic bytes and decompressed
+# while reading
+def open_text_file(fileName):
+    with open(fileName, 'rb') as fileHandle:
+        magic = fileHandle.read(6)
+
+    if magic.startswith(b'\x1f\x8b'):
+        return gzip.open(fileName, 'rt')
+    elif magic.startswith(b'\xfd7zXZ\x00'):
+        return lzma.open(fileName, 'rt')
+    elif magic.startswith(b'\x28\xb5\x2f\xfd'):
+        if zstandard == None:
+            ErrorMsg("%s is compressed with zstd, install the python package "\
+                     "zstandard to read it" % fileName)
+            sys.exit(-1)
+        stream = zstandard.ZstdDecompressor().stream_reader(open(fileName, 'rb'),
+                                                             closefd=True)
+        return io.TextIOWrapper(stream)
+    else:
+        return open(fileName)
+
 # get the name and absolute path of an template xoptfoil-input-file, that
 # resides in the 'presets'-folder.
 def get_PresetInputFileName(xoptfoilTemplate, params):
@@ -2275,8 +2305,8 @@ class polarData:
         parseInDataPoints = 0
         print("importing polar %s..." %fileName)
 
-        # open file
-        fileHandle = open(fileName)
+        # open file (may be compressed)
+        fileHandle = open_text_file(fileName)
 
         # parse all lines
         for line in fileHandle:
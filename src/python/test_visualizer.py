@@ -0,0 +1,426 @@
+#!/usr/bin/env python
+
+#  This file is part of XOPTFOIL-JX.
+
+#  XOPTFOIL-JX is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+
+#  XOPTFOIL-JX is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with XOPTFOIL-JX.  If not, see <http://www.gnu.org/licenses/>.
+
+################################################################################
+#
+# Tests of xoptfoil_visualizer-jx.py on synthetic runs of visualizer_benchmark
+#
+#    python -m pytest test_visualizer.py
+#
+################################################################################
+
+import json
+import os
+import queue
+import shutil
+import struct
+import subprocess
+
+import numpy as np
+import pytest
+
+import visualizer_benchmark
+from visualizer_benchmark import SyntheticRun, get_zone_offsets, quiet
+
+visualizer_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               visualizer_benchmark.visualizer_file)
+
+@pytest.fixture
+def vis():
+  return visualizer_benchmark.load_visualizer(visualizer_path)
+
+#-------------------------------------------------------------------------------
+# Synthetic run in a temporary directory - returns the prefix
+#-------------------------------------------------------------------------------
+@pytest.fixture
+def run(tmp_path, monkeypatch):
+  monkeypatch.chdir(tmp_path)
+  visualizer_benchmark.SyntheticRun('test', 300).write()
+  return 'test'
+
+def load(vis, prefix):
+  return vis.load_airfoils_from_file(prefix + '_design_coordinates.dat',
+                                     prefix + '_design_polars.dat')
+
+################################################################################
+# Bounded store (--keep): polars of designs which were dropped from memory
+
+def test_polars_of_dropped_design(vis, run):
+
+  seedfoil, designfoils, reader, ioerror = load(vis, run)
+
+  vis.bounded_designs = 10
+  seedfoil, bounded, reader, ioerror = load(vis, run)
+  assert isinstance(bounded, vis.BoundedDesignStore)
+  assert 151 not in bounded.rows
+
+  # polars first - reading them reads the dropped design again
+
+  assert np.array_equal(bounded[151].cl, designfoils[151].cl)
+  assert np.array_equal(bounded[151].y, designfoils[151].y)
+
+  # many dropped designs in one batch - some are dropped again meanwhile
+
+  dropped = [i for i in range(len(bounded)) if i not in bounded.rows]
+  bounded.load_polars(dropped)
+  for i in dropped[::7]:
+    assert np.array_equal(bounded[i].cd, designfoils[i].cd)
+    assert np.array_equal(bounded[i].x, designfoils[i].x)
+
+################################################################################
+# Files of older Xoptfoil versions - zones without their number of lines (I=...)
+
+def write_old_zone(filename, zonetitle, x, y):
+  with open(filename, 'a') as f:
+    f.write(zonetitle + '\n')
+    for xi, yi in zip(x, y):
+      f.write('%12.7f%12.7f\n' % (xi, yi))
+
+def test_old_format_match_airfoil(vis, tmp_path, monkeypatch):
+
+  monkeypatch.chdir(tmp_path)
+  coordfilename = 'old_design_coordinates.dat'
+  with open(coordfilename, 'w') as f:
+    f.write('title="Airfoil coordinates"\nvariables="x" "z"\n')
+
+  seed = SyntheticRun('old', 0, npoint=81)
+  match = SyntheticRun('old', 0, npoint=61)
+  write_old_zone(coordfilename, 'zone t="Seed airfoil", maxt=0.12000, xmaxt=0.30000, '
+                 'maxc=0.02000, xmaxc=0.40000', seed.x, seed.get_coordinates())
+  write_old_zone(coordfilename, 'zone t="Match airfoil"', match.x, match.get_coordinates())
+
+  # The match airfoil is the last zone - it has fewer points than the seed
+
+  reader = vis.DesignFileReader(coordfilename, 'old_design_polars.dat')
+  matchfoil, ioerror = quiet(vis.read_matchfoil, reader)
+  assert ioerror == 0
+  assert np.allclose(matchfoil.x, match.x, atol=1e-6)
+
+  # The first design is compared with the seed, not with the match airfoil
+
+  write_old_zone(coordfilename, 'zone t="Airfoil, maxt=0.12000, xmaxt=0.30000, '
+                 'maxc=0.02000, xmaxc=0.40000", SOLUTIONTIME=1', seed.x, seed.get_coordinates())
+  reader.coordfile.update_index()
+  assert reader.coordfile.designnums == [0, -1, 1]
+
+################################################################################
+# Animation of designs without polars - the polars file ends before the
+# coordinates file
+
+def test_animation_without_polars(vis, run):
+
+  polarfilename = run + '_design_polars.dat'
+  with open(polarfilename, 'rb') as f:
+    data = f.read()
+  with open(polarfilename, 'wb') as f:
+    f.write(data[:get_zone_offsets(data)[4]])       # seed and designs 1 ... 3
+
+  seedfoil, designfoils, reader, ioerror = quiet(load, vis, run)
+  assert len(designfoils[3].alpha) == 0
+
+  for plotnum in [3, 4, 5]:
+    vis.plot_polars(seedfoil, designfoils, plotnum, firsttime=(plotnum == 3),
+                    animation=True, prefix=run)
+  vis.plt.close('all')
+
+# Arrays of a design taken before other designs are dropped keep their values
+
+def test_view_across_drop(vis, run):
+
+  seedfoil, designfoils, reader, ioerror = load(vis, run)
+
+  vis.bounded_designs = 10
+  seedfoil, bounded, reader, ioerror = load(vis, run)
+
+  foil = bounded[151]
+  y, cl = foil.y, foil.cl
+  for i in range(len(bounded)):
+    bounded[i].y
+  assert 151 not in bounded.rows
+
+  assert np.array_equal(y, designfoils[151].y)
+  assert np.array_equal(cl, designfoils[151].cl)
+
+################################################################################
+# Web dashboard (--serve)
+
+# Cuts the files of a run after the zones of the given number of designs
+
+def cut_run(prefix, numcoords, numpolars):
+  runfiles = []
+  for suffix, numdesigns in [('_design_coordinates.dat', numcoords),
+                             ('_design_polars.dat', numpolars)]:
+    with open(prefix + suffix, 'rb') as f:
+      data = f.read()
+    with open(prefix + suffix, 'wb') as f:
+      f.write(data[:get_zone_offsets(data)[numdesigns+1]])
+    runfiles.append((prefix + suffix, data))
+  return runfiles
+
+def test_dashboard_events(vis, run):
+
+  runfiles = cut_run(run, 100, 99)
+
+  server = vis.DashboardServer(run)
+  events = queue.Queue()
+  server.clients.add(events)
+
+  # Seed, history and designs - the last one before its polars
+
+  server.update()
+  sent = [events.get_nowait() for k in range(events.qsize())]
+  names = [name for name, record in sent]
+  assert names == ['seed', 'history'] + ['design'] * 100
+  assert sent[1][1]['reset'] and (len(sent[1][1]['steps']) == 600)
+  assert 'cl' in sent[-2][1] and 'cl' not in sent[-1][1]
+  json.dumps(sent)
+
+  # Rest of the run: polars of the last design, then the new designs
+
+  for filename, data in runfiles:
+    with open(filename, 'wb') as f:
+      f.write(data)
+  server.update()
+  sent = [events.get_nowait() for k in range(events.qsize())]
+  assert sent[0][0] == 'polars' and (sent[0][1]['design'] == 100)
+  assert [record['design'] for name, record in sent[1:]] == list(range(101, 301))
+
+  # A new browser gets seed, latest design and the whole history
+
+  snapshot = server.get_snapshot()
+  assert [name for name, record in snapshot] == ['seed', 'design', 'history']
+  assert (snapshot[1][1]['design'] == 300) and ('cl' in snapshot[1][1])
+  assert snapshot[2][1]['reset'] and (len(snapshot[2][1]['steps']) == 600)
+
+# The script of the page runs with the browser globals it must not replace
+# (window.history is read-only) - the browser is stubbed in node
+
+dashboard_script_runner = r"""
+const vm = require('vm');
+const script = require('fs').readFileSync(0, 'utf8');
+const listeners = {};
+const canvas = { width: 330, height: 280, textContent: '',
+                 getContext: () => new Proxy({}, { get: () => () => {} }) };
+const context = {
+  document: { getElementById: () => canvas },
+  window: { requestAnimationFrame: () => {} },
+  EventSource: function () { this.addEventListener = (name, f) => { listeners[name] = f; }; },
+};
+Object.defineProperty(context, 'history', { get: () => ({}), enumerable: true });
+vm.createContext(context);
+vm.runInContext(script, context);
+for (const line of process.argv.slice(1)) {
+  const event = JSON.parse(line);
+  listeners[event[0]]({ data: JSON.stringify(event[1]) });
+}
+vm.runInContext('redraw()', context);
+"""
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='needs node')
+def test_dashboard_page(vis, run):
+
+  server = vis.DashboardServer(run)
+  server.update()
+  script = vis.dashboard_html.split('<script>')[1].split('</script>')[0]
+  events = [json.dumps(event) for event in server.get_snapshot()]
+
+  result = subprocess.run(['node', '-e', dashboard_script_runner, '--'] + events,
+                          input=script, capture_output=True, text=True)
+  assert result.returncode == 0, result.stderr
+
+################################################################################
+# Export of all designs (option 5) - duplicates are skipped except key designs
+
+def test_export_duplicates(vis, tmp_path, monkeypatch):
+
+  monkeypatch.chdir(tmp_path)
+  SyntheticRun('dup', 20).write()
+
+  seedfoil, designfoils, reader, ioerror = quiet(load, vis, 'dup')
+  keydesigns = vis.get_key_designs(20, quiet(vis.read_new_optimization_history))
+  skipped = [n for n in range(3, 20) if n not in keydesigns][0]
+
+  # Design 'skipped' repeats its predecessor, the last design repeats design 2
+
+  coordfilename = 'dup_design_coordinates.dat'
+  with open(coordfilename, 'rb') as f:
+    data = f.read()
+  offsets = get_zone_offsets(data)
+  zones = [data[offsets[k]:offsets[k+1]] for k in range(len(offsets) - 1)]
+  def repeat(n, original):
+    title = zones[n].split(b'\n', 1)[0]
+    zones[n] = title + b'\n' + zones[original].split(b'\n', 1)[1]
+  repeat(skipped, skipped - 1)
+  repeat(20, 2)
+  with open(coordfilename, 'wb') as f:
+    f.write(data[:offsets[0]] + b''.join(zones))
+
+  seedfoil, designfoils, reader, ioerror = quiet(load, vis, 'dup')
+  assert designfoils.count_duplicates() == 2
+
+  # Two ranges like two worker processes - without ffmpeg image frames are written
+
+  monkeypatch.setattr(vis, 'set_plot_style', lambda: None)
+  vis.init_export_worker(seedfoil, vis.Airfoil(), designfoils, 'dup', vis.plotoptions,
+                         ['coordinates'], None, keydesigns)
+  numframes = [vis.export_frames(designrange) for designrange in [(0, 1, 11), (1, 11, 21)]]
+  vis.plt.close('all')
+
+  assert sum(numframes) == 19
+  frames = sorted(name for name in os.listdir('.') if name.endswith('_coordinates.png'))
+  assert frames == [vis.get_frame_prefix('dup', n, 19) + '_coordinates.png' for n in range(1, 20)]
+
+################################################################################
+# The benchmark gives the Agg figure managers a window only while it runs
+
+def test_benchmark_leaves_matplotlib(vis):
+
+  from matplotlib.backend_bases import FigureManagerBase
+
+  assert not hasattr(FigureManagerBase, 'window')
+  with visualizer_benchmark.headless_windows():
+    assert hasattr(FigureManagerBase, 'window')
+  assert not hasattr(FigureManagerBase, 'window')
+
+################################################################################
+# Binary design history and live channel - written with struct in the layout
+# of the Fortran writers out of the zones of a text run, read back and compared
+# with the designs of the text files
+
+compared_names = ['x', 'y', 'deriv2', 'deriv3', 'maxt', 'xmaxt', 'maxc', 'xmaxc',
+                  'alpha', 'cl', 'cd', 'cm', 'xtrt', 'xtrb', 'flapangle']
+
+def assert_same_design(foil, textfoil):
+  for name in compared_names:
+    assert np.array_equal(getattr(foil, name), getattr(textfoil, name)), name
+
+# Seed and designs of the text run as (designnum, geometry info, coordinates
+# table, polars table) like Xoptfoil has them
+
+def get_text_designs(vis, prefix):
+  reader = vis.DesignFileReader(prefix + '_design_coordinates.dat',
+                                prefix + '_design_polars.dat')
+  reader.coordfile.update_index()
+  reader.polarfile.update_index()
+  designs = []
+  for designnum in reader.coordfile.designnums:
+    zonetitle, data = reader.coordfile.read_zone(designnum)
+    polartitle, polardata = reader.polarfile.read_zone(designnum)
+    designs.append((designnum, vis.parse_geometry_info(zonetitle),
+                    vis.decode_zone_data(data), vis.decode_zone_data(polardata)))
+  return designs
+
+# Coordinates and polars column by column (Fortran order), coordinates padded
+# to maxpoints
+
+def get_design_values(coords, polars, maxpoints):
+  padded = np.zeros((4, maxpoints))
+  padded[:,0:coords.shape[0]] = coords.T
+  return np.concatenate([padded.ravel(), polars.T.ravel()])
+
+def write_binary_history(filename, designs, maxpoints, noppoint):
+  columns = b'designnum npoint maxt xmaxt maxc xmaxc | x z deriv2 deriv3 | ' + \
+            b'alpha cl cd cm xtrt xtrb flapangle'
+  with open(filename, 'wb') as f:
+    f.write(struct.pack('=8s6i224s', b'XOPTDSGN', 1, 256, maxpoints, noppoint, 4, 7,
+                        columns.ljust(224)))
+    for designnum, info, coords, polars in designs:
+      record = np.concatenate([[designnum, coords.shape[0]], info,
+                               get_design_values(coords, polars, maxpoints)])
+      f.write(record.tobytes())
+
+def test_binary_history(vis, run):
+
+  seedfoil, designfoils, reader, ioerror = load(vis, run)
+  designs = get_text_designs(vis, run)
+  maxpoints = 170                                   # more than the 161 points
+  noppoint = designs[0][3].shape[0]
+
+  # The optimizer is writing the record of design 101
+
+  filename = 'bin' + vis.binary_suffix
+  write_binary_history(filename, designs[0:102], maxpoints, noppoint)
+  size = os.path.getsize(filename)
+  with open(filename, 'r+b') as f:
+    f.truncate(size - 100)
+
+  binseed, binfoils, binreader, ioerror = quiet(load, vis, 'bin')
+  assert binreader.is_binary() and (ioerror == 0)
+  assert len(binfoils) == 100
+  assert_same_design(binseed, seedfoil)
+  for i in [0, 1, 57, 99]:
+    assert_same_design(binfoils[i], designfoils[i])
+
+  # Rest of the run appended - the new records are mapped, single designs
+  # are read with a seek
+
+  write_binary_history(filename, designs, maxpoints, noppoint)
+  binseed, binfoils, ioerror = quiet(vis.read_new_airfoil_data, binreader, binseed, binfoils)
+  assert len(binfoils) == len(designfoils)
+  for i in [100, 101, 250, 299]:
+    assert_same_design(binfoils[i], designfoils[i])
+    assert_same_design(vis.read_design(binreader, i+1), designfoils[i])
+
+def test_live_channel(vis, run):
+
+  designs = get_text_designs(vis, run)
+  runfiles = cut_run(run, 100, 100)
+  seedfoil, livefoils, livereader, ioerror = load(vis, run)
+
+  nslots, maxpoints, noppoint = 8, 161, designs[0][3].shape[0]
+  slotsize = vis.get_live_slotsize((nslots, maxpoints, noppoint))
+  filename = run + vis.live_suffix
+  with open(filename, 'wb') as f:
+    f.write(struct.pack('=8s4iq', b'XOPTLIVE', 1, nslots, maxpoints, noppoint, 0).ljust(64))
+    for k in range(nslots):
+      f.write(struct.pack('=q', -1).ljust(slotsize, b'\0'))
+
+  def write_slot(sequence, slotsequence, designnum):
+    designnum, info, coords, polars = designs[designnum]
+    with open(filename, 'r+b') as f:
+      f.seek(64 + ((sequence - 1) % nslots) * slotsize)
+      f.write(struct.pack('=q2i', slotsequence, designnum, coords.shape[0]))
+      f.write(np.concatenate([[0.9], info, get_design_values(coords, polars, maxpoints)]).tobytes())
+      f.seek(24)
+      f.write(struct.pack('=q', sequence))
+
+  live = vis.LiveChannel(filename)
+  assert quiet(vis.read_live_designs, live, livefoils)
+
+  # 6 designs, then 6 more which wrap around the ring
+
+  for sequence in range(1, 13):
+    write_slot(sequence, sequence, 100 + sequence)
+    if (sequence % 6 == 0):
+      assert quiet(vis.read_live_designs, live, livefoils)
+  assert len(livefoils) == 112
+
+  for runfilename, data in runfiles:
+    with open(runfilename, 'wb') as f:
+      f.write(data)
+  seedfoil, designfoils, reader, ioerror = quiet(load, vis, run)
+  for i in range(100, 112):
+    assert_same_design(livefoils[i], designfoils[i])
+
+  # A slot which is written - or was overwritten by a later design - isn't
+  # taken, the design files have to be read
+
+  write_slot(13, -1, 113)
+  assert not quiet(vis.read_live_designs, live, livefoils)
+  write_slot(14, 22, 114)
+  assert not quiet(vis.read_live_designs, live, livefoils)
+  assert len(livefoils) == 112
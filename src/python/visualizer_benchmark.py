@@ -0,0 +1,490 @@
+#!/usr/bin/env python
+
+#  This file is part of XOPTFOIL-JX.
+
+#  XOPTFOIL-JX is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+
+#  XOPTFOIL-JX is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License
+#  along with XOPTFOIL-JX.  If not, see <http://www.gnu.org/licenses/>.
+
+################################################################################
+#
+# Benchmark of xoptfoil_visualizer-jx.py
+#
+#    Writes synthetic optimization runs with 100 ... 100k designs in the format
+#    of write_airfoil_optimization_progress and times loading, incremental
+#    updates, random access to designs and rendering of frames (Agg backend).
+#    The results are written to a JSON file to compare versions of the
+#    visualizer. Only its public entry points are timed, so the benchmark runs
+#    with each version of it, e.g.
+#
+#       python visualizer_benchmark.py --sizes 100 1000 --output before.json
+#
+#    Versions of the visualizer before the number of lines in the zone titles
+#    are compared with runs written without them (--no-line-counts).
+#
+################################################################################
+
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import platform
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib.backend_bases import FigureManagerBase
+import numpy as np
+
+visualizer_file = 'xoptfoil_visualizer-jx.py'
+
+default_sizes = [100, 1000, 10000, 100000]
+num_update_designs = 50           # designs appended one by one in the update benchmark
+num_random_designs = 200          # designs read in the random access benchmark
+num_render_frames = 30            # frames of the render benchmark
+
+################################################################################
+# Window of the headless Agg backend - older versions of the visualizer place
+# their windows unconditionally. Like a Qt window the geometry sizes the figure.
+class HeadlessWindow:
+
+  def setGeometry(self, x, y, width, height):
+    fig = plt.gcf()
+    fig.set_size_inches(width / fig.dpi, height / fig.dpi)
+
+# The figure managers have the window only while the benchmark runs
+
+@contextlib.contextmanager
+def headless_windows():
+
+  FigureManagerBase.window = HeadlessWindow()
+  try:
+    yield
+  finally:
+    del FigureManagerBase.window
+
+################################################################################
+# Loads the visualizer as module - its file name isn't a valid module name
+def load_visualizer(filename):
+
+  spec = importlib.util.spec_from_file_location('xoptfoil_visualizer', filename)
+  visualizer = importlib.util.module_from_spec(spec)
+  spec.loader.exec_module(visualizer)
+  return visualizer
+
+################################################################################
+#
+# Synthetic optimization run
+#
+#    The seed is a NACA 4-digit like airfoil. Each design adds small Hicks-Henne
+#    bumps to its predecessor, the polars follow the thickness and camber.
+#    Coordinates, polars and history are written like Xoptfoil does it - with
+#    line_counts False like older versions without the number of lines (I=...)
+#    in the zone titles.
+#
+################################################################################
+class SyntheticRun:
+
+  def __init__(self, prefix, numdesigns, npoint=161, noppoint=8, seed=1, line_counts=True):
+    self.prefix = prefix
+    self.numdesigns = numdesigns
+    self.line_counts = line_counts
+    self.npoint = npoint
+    self.noppoint = noppoint
+    self.rng = np.random.default_rng(seed)
+
+    # Cosine spaced points from trailing edge over upper side to lower side
+
+    nside = npoint // 2 + 1
+    xside = 0.5 * (1.0 - np.cos(np.linspace(0.0, np.pi, nside)))
+    self.x = np.concatenate([xside[::-1], xside[1:]])
+    self.upper = np.arange(npoint) < nside - 1
+
+    self.thickness = 0.6 * (0.2969 * np.sqrt(self.x) - 0.1260 * self.x - 0.3516 * self.x**2 +
+                            0.2843 * self.x**3 - 0.1015 * self.x**4)
+    self.camber = np.where(self.x < 0.4, 0.02 / 0.16 * (0.8 * self.x - self.x**2),
+                           0.02 / 0.36 * (0.2 + 0.8 * self.x - self.x**2))
+
+    self.alpha = np.linspace(-2.0, 10.0, noppoint)
+
+  def get_coordinates(self):
+    side = np.where(self.upper, 1.0, -1.0)
+    return self.camber + side * self.thickness
+
+  # Next design: random bump on thickness and camber
+
+  def next_design(self):
+    bumps = []
+    for k in range(2):
+      center = self.rng.uniform(0.05, 0.95)
+      width = self.rng.uniform(1.0, 4.0)
+      height = self.rng.normal(0.0, 2e-5)
+      bump = np.sin(np.pi * self.x ** (np.log(0.5) / np.log(center))) ** width
+      bumps.append(height * bump)
+    self.thickness = self.thickness + bumps[0]
+    self.camber = self.camber + bumps[1]
+
+  #-----------------------------------------------------------------------------
+  # Zone of the coordinates file - x, z, 2nd and 3rd derivative
+  #-----------------------------------------------------------------------------
+  def format_coordinates_zone(self, title):
+
+    # Derivatives along the arc length like the spline of Xoptfoil
+
+    y = self.get_coordinates()
+    s = np.concatenate([[0.0], np.cumsum(np.hypot(np.diff(self.x), np.diff(y)))])
+    deriv2 = np.gradient(np.gradient(y, s), s)
+    deriv3 = np.gradient(deriv2, s)
+    table = np.column_stack([self.x, y, deriv2, deriv3]).ravel()
+
+    return title + '\n' + ('%12.7f%12.7f%17.7E%17.7E\n' * self.npoint) % tuple(table)
+
+  def format_geometry_info(self):
+
+    thickness = 2.0 * self.thickness[~self.upper]
+    maxt = np.max(thickness)
+    xmaxt = self.x[~self.upper][np.argmax(thickness)]
+    maxc = np.max(self.camber)
+    xmaxc = self.x[np.argmax(self.camber)]
+    return 'maxt=%.5f, xmaxt=%.5f, maxc=%.5f, xmaxc=%.5f' % (maxt, xmaxt, maxc, xmaxc)
+
+  #-----------------------------------------------------------------------------
+  # Zone of the polars file - alpha, cl, cd, cm, xtrt, xtrb, flap angle
+  #-----------------------------------------------------------------------------
+  def format_polars_zone(self, title):
+
+    maxc = np.max(self.camber)
+    maxt = 2.0 * np.max(self.thickness)
+    cl = 0.11 * self.alpha + 11.0 * maxc
+    cd = 0.0055 + 0.04 * (maxt - 0.1)**2 + 0.004 * (cl - 0.4)**2
+    cm = -2.5 * maxc - 0.002 * self.alpha
+    xtrt = np.clip(0.6 - 0.05 * self.alpha, 0.01, 1.0)
+    xtrb = np.clip(0.5 + 0.05 * self.alpha, 0.01, 1.0)
+    flap = np.zeros(self.noppoint)
+    table = np.column_stack([self.alpha, cl, cd, cm, xtrt, xtrb, flap]).ravel()
+
+    return title + '\n' + ('%14.6E%14.6E%14.6E%14.6E%14.6E%14.6E%14.3E\n' *
+                           self.noppoint) % tuple(table)
+
+  #-----------------------------------------------------------------------------
+  # Writes the seed airfoil and all designs - and the optimization history
+  #-----------------------------------------------------------------------------
+  def write(self):
+
+    coordfile = open(self.prefix + '_design_coordinates.dat', 'w')
+    polarfile = open(self.prefix + '_design_polars.dat', 'w')
+
+    coordfile.write('title="Airfoil coordinates"\n')
+    coordfile.write('variables="x" "z" "2nd derivative" "3rd derivative"\n')
+    polarfile.write('title="Airfoil polars"\n')
+    polarfile.write('variables="alpha" "cl" "cd" "cm" "xtrt" "xtrb" "flapangle"\n')
+
+    if self.line_counts:
+      npoint = ', I=' + str(self.npoint)
+      noppoint = ', I=' + str(self.noppoint)
+    else:
+      npoint = ''
+      noppoint = ''
+
+    coordfile.write(self.format_coordinates_zone('zone t="Seed airfoil, ' +
+                                                 self.format_geometry_info() + '"' + npoint))
+    polarfile.write(self.format_polars_zone('zone t="Seed airfoil polar"' + noppoint))
+
+    for designnum in range(1, self.numdesigns + 1):
+      self.next_design()
+      coordfile.write(self.format_coordinates_zone('zone t="Airfoil, ' +
+                      self.format_geometry_info() + '"' + npoint + ', SOLUTIONTIME=' +
+                      str(designnum)))
+      polarfile.write(self.format_polars_zone('zone t="Polars"' + noppoint + ', SOLUTIONTIME=' +
+                                              str(designnum)))
+
+    coordfile.close()
+    polarfile.close()
+
+    self.write_history()
+
+  # A design is written at each improvement - some steps in between don't improve
+
+  def write_history(self):
+
+    improved = np.zeros(2 * self.numdesigns, dtype=bool)
+    improved[self.rng.choice(improved.size, self.numdesigns, replace=False)] = True
+
+    history = open('optimization_history.dat', 'w')
+    history.write("Iteration  Objective function  % Improvement over seed  Design radius\n")
+
+    fmin = 1.0
+    for step in range(1, len(improved) + 1):
+      if improved[step-1]:
+        fmin = fmin * (1.0 - self.rng.uniform(0.0, 2e-3))
+      radius = 0.1 / np.sqrt(step)
+      history.write('%-11d%-20.10f%-25.10f%-20.6E\n' % (step, fmin, (1.0 - fmin) * 100.0, radius))
+
+    history.close()
+
+################################################################################
+#
+# Public entry points of the visualizer
+#
+#    Their signatures changed between the versions of the visualizer - the
+#    loaded run is kept as [seedfoil, designfoils, reader] with reader None for
+#    versions which read the files by their prefix
+#
+################################################################################
+
+def load_run(vis, prefix):
+
+  loaded = vis.load_airfoils_from_file(prefix + '_design_coordinates.dat',
+                                       prefix + '_design_polars.dat')
+  reader = loaded[2] if (len(loaded) == 4) else None
+  return [loaded[0], loaded[1], reader]
+
+def read_new_designs(vis, prefix, run):
+
+  seedfoil, designfoils, reader = run
+  if reader is None:
+    seedfoil, designfoils, ioerror = vis.read_new_airfoil_data(seedfoil, designfoils, prefix)
+  else:
+    seedfoil, designfoils, ioerror = vis.read_new_airfoil_data(reader, seedfoil, designfoils)
+  return [seedfoil, designfoils, reader]
+
+# History as steps, fmins, relfmins, rads
+
+def load_history(vis):
+
+  history = vis.read_new_optimization_history()
+  if isinstance(history, tuple): return history
+  return history.steps, history.fmins, history.relfmins, history.rads
+
+################################################################################
+#
+# Timings
+#
+#    Each run size is timed in a scratch directory with copies of the synthetic
+#    files - files the visualizer writes there (e.g. a cache) are removed with it
+#
+################################################################################
+
+run_files = ['_design_coordinates.dat', '_design_polars.dat']
+
+#-------------------------------------------------------------------------------
+# Full load of a run - the first one and again (e.g. with a cache file)
+#-------------------------------------------------------------------------------
+def time_full_load(vis, prefix):
+
+  timings = {}
+  for name in ['load_cold', 'load_cached']:
+    start = time.perf_counter()
+    run = quiet(load_run, vis, prefix)
+    timings[name] = time.perf_counter() - start
+
+  start = time.perf_counter()
+  history = quiet(load_history, vis)
+  timings['load_history'] = time.perf_counter() - start
+
+  return timings, (run, history)
+
+#-------------------------------------------------------------------------------
+# Start offsets of the zones of a synthetic file (seed at 0) and its end
+#-------------------------------------------------------------------------------
+def get_zone_offsets(data):
+
+  offsets = [match.start() for match in re.finditer(b'^zone t=', data, re.MULTILINE)]
+  return offsets + [len(data)]
+
+#-------------------------------------------------------------------------------
+# Incremental update like in monitor mode: the last designs are appended one
+# by one to a copy of the run and read after each
+#-------------------------------------------------------------------------------
+def time_incremental_update(vis, prefix, numdesigns):
+
+  numappend = min(num_update_designs, numdesigns)
+  firstnew = numdesigns - numappend + 1
+
+  copyprefix = prefix + '_update'
+  sources = []
+  for suffix in run_files:
+    with open(prefix + suffix, 'rb') as f:
+      data = f.read()
+    sources.append((data, get_zone_offsets(data), copyprefix + suffix))
+    with open(copyprefix + suffix, 'wb') as fcopy:
+      fcopy.write(data[:sources[-1][1][firstnew]])
+
+  run = quiet(load_run, vis, copyprefix)
+
+  times = []
+  for designnum in range(firstnew, numdesigns + 1):
+    for data, offsets, copy in sources:
+      with open(copy, 'ab') as fcopy:
+        fcopy.write(data[offsets[designnum]:offsets[designnum+1]])
+
+    start = time.perf_counter()
+    run = quiet(read_new_designs, vis, copyprefix, run)
+    run[1][-1].cl                               # polars of the new design are shown
+    times.append(time.perf_counter() - start)
+
+  return dict(update_mean=float(np.mean(times)), update_max=float(np.max(times)),
+              update_designs=numappend)
+
+#-------------------------------------------------------------------------------
+# Random access to designs of the loaded run
+#-------------------------------------------------------------------------------
+def time_random_access(designfoils, rng):
+
+  indices = rng.integers(0, len(designfoils), num_random_designs)
+
+  start = time.perf_counter()
+  for i in indices:
+    foil = designfoils[int(i)]
+    foil.y, foil.cl, foil.maxt
+  store = (time.perf_counter() - start) / len(indices)
+
+  return dict(access_store=store)
+
+#-------------------------------------------------------------------------------
+# Rendering of animation frames of geometry, polars and history
+#-------------------------------------------------------------------------------
+def time_render(vis, prefix, seedfoil, designfoils, history):
+
+  steps, fmins, relfmins, rads = history
+  matchfoil = vis.Airfoil()
+  numfoils = len(designfoils)
+  numframes = min(num_render_frames, numfoils)
+  designs = np.unique(np.linspace(1, numfoils, numframes).astype(int))
+
+  times = []
+  for k, designnum in enumerate(designs):
+    firsttime = (k == 0)
+    numsteps = max(2, int(len(steps) * designnum / numfoils))
+
+    start = time.perf_counter()
+    vis.plot_airfoil_coordinates(seedfoil, matchfoil, designfoils, int(designnum),
+                                 firsttime=firsttime, animation=True, prefix=prefix)
+    vis.plot_polars(seedfoil, designfoils, int(designnum), firsttime=firsttime,
+                    animation=True, prefix=prefix)
+    vis.plot_optimization_history(steps[:numsteps], fmins[:numsteps], relfmins[:numsteps],
+                                  rads[:numsteps], firsttime=firsttime, animation=True,
+                                  prefix=prefix)
+    times.append(time.perf_counter() - start)
+
+  vis.plt.close('all')
+
+  return dict(render_first=times[0],
+              render_frame=float(np.mean(times[1:])) if (len(times) > 1) else times[0])
+
+#-------------------------------------------------------------------------------
+# Calls a function of the visualizer without its progress messages
+#-------------------------------------------------------------------------------
+def quiet(function, *args):
+
+  stdout = sys.stdout
+  sys.stdout = open(os.devnull, 'w')
+  try:
+    return function(*args)
+  finally:
+    sys.stdout.close()
+    sys.stdout = stdout
+
+################################################################################
+# Benchmark of one run size
+def run_benchmark(vis, numdesigns, regenerate, line_counts=True):
+
+  prefix = 'bench' + str(numdesigns) + ('' if line_counts else '_nolines')
+  coordfilename = prefix + '_design_coordinates.dat'
+
+  result = dict(designs=numdesigns, line_counts=line_counts)
+
+  # The history file has a fixed name - it's rewritten for each size
+
+  run = SyntheticRun(prefix, numdesigns, line_counts=line_counts)
+  start = time.perf_counter()
+  if regenerate or not os.path.isfile(coordfilename):
+    run.write()
+  else:
+    run.write_history()
+  result['generate'] = time.perf_counter() - start
+  result['coordinates_bytes'] = os.path.getsize(coordfilename)
+  result['polars_bytes'] = os.path.getsize(prefix + '_design_polars.dat')
+
+  workdir = os.getcwd()
+  scratchdir = tempfile.mkdtemp(prefix=prefix + '_', dir=workdir)
+  for filename in [prefix + suffix for suffix in run_files] + ['optimization_history.dat']:
+    shutil.copy(filename, scratchdir)
+  os.chdir(scratchdir)
+
+  try:
+    timings, loaded = time_full_load(vis, prefix)
+    result.update(timings)
+    (seedfoil, designfoils, reader), history = loaded
+
+    result.update(time_incremental_update(vis, prefix, numdesigns))
+    result.update(time_random_access(designfoils, np.random.default_rng(numdesigns)))
+    with headless_windows():
+      result.update(time_render(vis, prefix, seedfoil, designfoils, history))
+  finally:
+    os.chdir(workdir)
+    shutil.rmtree(scratchdir, ignore_errors=True)
+
+  return result
+
+################################################################################
+# Main program
+if __name__ == "__main__":
+
+  parser = argparse.ArgumentParser(description='Benchmark of the Xoptfoil visualizer')
+  parser.add_argument("--sizes", "-n", type=int, nargs='+', default=default_sizes,
+                      help="number of designs of the synthetic runs")
+  parser.add_argument("--output", "-o", default='visualizer_benchmark.json',
+                      help="JSON file of the results")
+  parser.add_argument("--workdir", "-w", default='visualizer_benchmark',
+                      help="directory of the synthetic runs (kept for the next benchmark)")
+  parser.add_argument("--visualizer", "-v",
+                      default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                           visualizer_file),
+                      help="visualizer to benchmark")
+  parser.add_argument("--regenerate", "-r", action="store_true",
+                      help="write the synthetic runs again")
+  parser.add_argument("--no-line-counts", dest="line_counts", action="store_false",
+                      help="zone titles without number of lines (I=...) like older Xoptfoil "
+                           "- for versions of the visualizer which don't know them")
+  args = parser.parse_args()
+
+  vis = load_visualizer(os.path.abspath(args.visualizer))
+  outputfile = os.path.abspath(args.output)
+
+  os.makedirs(args.workdir, exist_ok=True)
+  os.chdir(args.workdir)
+
+  results = []
+  for numdesigns in args.sizes:
+    print("Benchmark with " + str(numdesigns) + " designs ...")
+    result = run_benchmark(vis, numdesigns, args.regenerate, args.line_counts)
+    for key, value in result.items():
+      if isinstance(value, float):
+        print("   {:<20s}{:12.4f} s".format(key, value))
+    results.append(result)
+
+  report = dict(visualizer=os.path.abspath(args.visualizer),
+                date=time.strftime('%Y-%m-%d %H:%M:%S'),
+                python=platform.python_version(), numpy=np.__version__,
+                matplotlib=matplotlib.__version__, platform=platform.platform(),
+                results=results)
+
+  with open(outputfile, 'w') as f:
+    json.dump(report, f, indent=2)
+  print("Results written to " + outputfile)
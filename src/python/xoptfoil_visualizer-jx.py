@@ -18,12 +18,38 @@
 #  Copyright (C) 2014 -- 2016 Daniel Prosser
 
 import argparse
+import asyncio
+import contextlib
+import ctypes
+import ctypes.util
+import fnmatch
+import functools
+import glob
+import gzip
+import hashlib
+import json
 from matplotlib import pyplot as plt
 from matplotlib import rcParams
 import numpy as np
 from math import log10, floor
+import lzma
+import mmap
+import multiprocessing
+import os
+import shutil
+import struct
+import subprocess
+import sys
 from sys import version_info
 import time
+try:
+  import zstandard                      # optional - to read files compressed with zstd
+except ImportError:
+  zstandard = None
+try:
+  from scipy.spatial import cKDTree     # optional - spatial index of the polar search
+except ImportError:
+  cKDTree = None
 
 # Default plottiong options
 
@@ -37,16 +63,189 @@ plotoptions = dict(show_seed_airfoil = True,
                    plot_optimization_history = True,
                    drag_plot_type = "vs. lift",
                    save_animation_frames = False,
+                   fast_rendering = True,
                    color_for_seed = "blue",
                    color_for_new_designs = "red",
-                   monitor_update_interval = 5)
+                   monitor_update_interval = 5,
+                   animation_fps = 10,
+                   evolution_delta_y = True,
+                   show_frame_timing = False)
+
+################################################################################
+#
+# Timings of the update phases of a frame
+#
+#    The time of a frame is split into the phases file read, parse, derive,
+#    draw and canvas flush for each plot - and for 'data', the reading of the
+#    files outside of the plots. A phase within another phase (e.g. parsing a
+#    polar zone read lazily while plotting) only counts for the inner one.
+#
+#    The timings of the last frame are shown in the plot windows with
+#    show_frame_timing, and written for each frame to a csv file with --timing.
+#
+################################################################################
+
+timing_phases = ['read', 'parse', 'derive', 'draw', 'flush']
+
+class FrameTimer:
+
+  def __init__(self):
+    self.filename = None            # csv file of the timings (--timing)
+    self.starttime = time.perf_counter()
+    self.numframes = 0
+    self.times = {}                 # plot -> seconds per phase of this frame
+    self.latest = {}                # plot -> seconds per phase of the last frame
+    self.stack = []                 # (phase, plot) currently running
+    self.plot = 'data'
+    self.start = 0.0                # time the innermost phase was (re)started
+
+  @property
+  def enabled(self):
+    return (self.filename is not None) or plotoptions["show_frame_timing"]
+
+  # Creates the csv file - one line per frame and plot, times in ms
+
+  def start_log(self, filename):
+    f = open(filename, 'w')
+    f.write("frame,time,plot," + ",".join(timing_phases) + ",total\n")
+    f.close()
+    self.filename = filename
+    self.starttime = time.perf_counter()
+
+  # Time spent within the block counts for phase (of plot)
+
+  @contextlib.contextmanager
+  def phase(self, name, plot=None):
+
+    self.add_time()
+    self.stack.append((name, self.plot))
+    if plot is not None: self.plot = plot
+    try:
+      yield
+    finally:
+      self.add_time()
+      name, self.plot = self.stack.pop()
+
+  def add_time(self):
+    now = time.perf_counter()
+    if (len(self.stack) > 0):
+      times = self.times.setdefault(self.plot, dict.fromkeys(timing_phases, 0.0))
+      times[self.stack[-1][0]] += now - self.start
+    self.start = now
+
+  # Finishes the frame - its timings are written and become the latest ones
+
+  def end_frame(self):
+
+    if (len(self.times) == 0): return
+    self.numframes += 1
+
+    if self.filename is not None:
+      frametime = time.perf_counter() - self.starttime
+      f = open(self.filename, 'a')
+      for plot, times in self.times.items():
+        values = [1000 * times[name] for name in timing_phases]
+        f.write(str(self.numframes) + ',' + '{:.3f}'.format(frametime) + ',' + plot + ',' +
+                ','.join('{:.3f}'.format(value) for value in values + [sum(values)]) + '\n')
+      f.close()
+
+    self.latest.update(self.times)
+    self.times = {}
+
+  # Text of the latest timings of a plot (and of reading the data)
+
+  def get_text(self, plot):
+
+    lines = []
+    for name in [plot, 'data']:
+      if name not in self.latest: continue
+      times = self.latest[name]
+      lines.append(name + ': ' + '  '.join(phase + ' {:.1f}'.format(1000 * times[phase])
+                                           for phase in timing_phases if times[phase] > 0.0) +
+                   ' ms')
+    return '\n'.join(lines)
+
+frame_timer = FrameTimer()
+
+#-------------------------------------------------------------------------------
+# Decorator - the time of the function counts for phase (of plot)
+#-------------------------------------------------------------------------------
+def timed(phase, plot=None):
+
+  def decorator(function):
+    @functools.wraps(function)
+    def timed_function(*args, **kwargs):
+      if not frame_timer.enabled: return function(*args, **kwargs)
+      with frame_timer.phase(phase, plot):
+        return function(*args, **kwargs)
+    return timed_function
+
+  return decorator
+
+#-------------------------------------------------------------------------------
+# Block whose time counts for phase - nothing is measured if timing is off
+#-------------------------------------------------------------------------------
+def timed_phase(phase):
+
+  if not frame_timer.enabled: return contextlib.nullcontext()
+  return frame_timer.phase(phase)
 
 ################################################################################
 #
 # Airfoil class
 #
 ################################################################################
-class Airfoil:
+################################################################################
+# Quantities derived from coordinates and polars of an airfoil
+#
+#    They are computed at the first request and cached, so repeated frames of
+#    the same design (e.g. in monitor mode) reuse them
+################################################################################
+class DerivedQuantities:
+
+  # Value of key - compute() is only called at the first request
+
+  def get_derived(self, key, compute):
+    cache = self.get_derived_cache()
+    if key not in cache:
+      with timed_phase('derive'):
+        cache[key] = compute()
+    return cache[key]
+
+  # Minimum and maximum of values like 'x' or 'cl' - 'xtr' for top and bottom side
+
+  def get_bounds(self, name):
+    if (name == 'xtr'):
+      values = lambda: np.concatenate((self.xtrt, self.xtrb))
+    else:
+      values = lambda: getattr(self, name)
+    return self.get_derived(('bounds', name), lambda: (np.min(values()), np.max(values())))
+
+  # Difference of y to reffoil (having the same x values) times scale
+
+  def get_delta_y(self, reffoil, scale):
+    return self.get_derived(('delta_y', id(reffoil), scale),
+                            lambda: (self.y - reffoil.y) * scale)
+
+  # Coordinate points closest to the points of transition of the operating points
+  # as (x, y) of top and (x, y) of bottom side - iLE separates top and bottom side
+
+  def get_transition_points(self, iLE):
+
+    def compute():
+      points = []
+      for x, y, xtrs in [(self.x[0:iLE], self.y[0:iLE], self.xtrt),
+                         (self.x[-iLE:], self.y[-iLE:], self.xtrb)]:
+        i_nearest = get_nearest_points (x, xtrs)
+        points.append((x[i_nearest], y[i_nearest]))
+      return points
+
+    return self.get_derived(('transition', iLE), compute)
+
+################################################################################
+# Airfoil with coordinates and polars
+################################################################################
+class Airfoil(DerivedQuantities):
 
   def __init__(self):
     self.x = np.zeros((0))
@@ -70,19 +269,22 @@ class Airfoil:
     self.glide = np.zeros((0))
     self.climb = np.zeros((0))
     self.flapangle = np.zeros((0))
+    self.derived = {}
+
+  def get_derived_cache(self):
+    return self.derived
 
   def setCoordinates(self, x, y):
     self.x = x
     self.y = y
     self.npt = x.shape[0]
+    self.derived = {}
 
-  # jx-mod set  2nd, 3rd derivative
+  # jx-mod set  2nd, 3rd derivative - sign of upper side is flipped
   def setDerivatives(self, deriv2, deriv3):
-    self.deriv2 = deriv2
-    self.deriv3 = deriv3
-    iLE = np.argmin(self.x)
-    self.deriv2[0:iLE] = np.multiply(self.deriv2[0:iLE], -1)
-    self.deriv3[0:iLE] = np.multiply(self.deriv3[0:iLE], -1)
+    sign = np.where(np.arange(len(self.x)) < np.argmin(self.x), -1.0, 1.0)
+    self.deriv2 = deriv2 * sign
+    self.deriv3 = deriv3 * sign
 
   def setGeometryInfo(self, maxt, xmaxt, maxc, xmaxc):
     self.maxt = maxt
@@ -100,995 +302,4155 @@ class Airfoil:
     self.noper = alpha.shape[0]
     # jx-mod additional glide and climb ratio
     self.glide = self.cl / self.cd
-    self.climb = np.zeros((len(cl)))
-    for i in range(len(cl)):
-      if cl[i] > 0.0:
-        self.climb[i] = (cl[i]**1.5)/cd[i]
+    self.climb = np.where(cl > 0.0, np.abs(cl)**1.5 / cd, 0.0)
     self.flapangle = flapangle
+    self.derived = {}
 
 ################################################################################
-# Reads airfoil coordinates from file
-def read_airfoil_coordinates(filename, zonetitle, designnum):
+# Array which grows in amortized constant time when values are appended
+################################################################################
+class GrowableArray:
 
-  ioerror = 0
-  x = []
-  y = []
-  maxt = 0.
-  xmaxt = 0.
-  maxc = 0.
-  xmaxc = 0.
-  # jx-mod additionally 2nd and 3rd derivative
-  deriv2 = []
-  deriv3 = []
+  def __init__(self, dtype=float, rowshape=()):
+    self.size = 0
+    self.buffer = np.zeros((16,) + rowshape, dtype=dtype)
 
+  # Appends a block of values (or rows)
 
-  # Try to open the file
+  def extend(self, values):
+    newsize = self.size + len(values)
+    if (newsize > self.buffer.shape[0]):
+      newbuffer = np.zeros((max(newsize, 2*self.buffer.shape[0]),) +
+                           self.buffer.shape[1:], dtype=self.buffer.dtype)
+      newbuffer[0:self.size] = self.buffer[0:self.size]
+      self.buffer = newbuffer
+    self.buffer[self.size:newsize] = values
+    self.size = newsize
 
-  try:
-    f = open(filename)
-  except IOError:
-    ioerror = 1
-    return x, y, maxt, xmaxt, maxc, xmaxc, ioerror, deriv2, deriv3
+  # Widens the rows to width values - new values are set to fill
+
+  def widen(self, width, fill):
+    newbuffer = np.full((self.buffer.shape[0], width), fill, dtype=self.buffer.dtype)
+    newbuffer[:,0:self.buffer.shape[1]] = self.buffer
+    self.buffer = newbuffer
 
-  # Read lines until we get to the correct zone
+  def clear(self):
+    self.size = 0
 
-  zonefound = False
-  zonelen = len(zonetitle)
+  # Replaces the values with a new buffer - views of the old values keep theirs
+
+  def replace(self, values):
+    self.buffer = np.zeros_like(self.buffer)
+    self.size = 0
+    self.extend(values)
+
+  # The valid part of the buffer (a view, no copy)
+
+  @property
+  def data(self):
+    return self.buffer[0:self.size]
+
+################################################################################
+# Columnar store of the designs of an optimization
+#
+#    Geometry is kept in 2D arrays (designs x points), polars in 2D arrays
+#    (designs x op-points) and the geometry info in vectors, so analyses
+#    across designs are single array operations. designfoils[i] returns a
+#    light view which can be used like an Airfoil.
+#
+#    Polars are read from the polars file when they are used first.
+#
+#    Designs are recognized by a hash of their coordinates rounded to the
+#    precision of the design file. A design with the same coordinates as an
+#    earlier one (PSO writes such duplicates) refers to its coordinates instead
+#    of storing them again.
+################################################################################
 
-  for textline in f:
+coordinates_resolution = 1e-7   # coordinates are written with 7 decimals
 
-    if (not zonefound):
+class DesignStore:
 
-      # Check for the zone we are looking for, and read geometry info
+  info_names = ['maxt', 'xmaxt', 'maxc', 'xmaxc']
+  geometry_names = ['x', 'y', 'deriv2', 'deriv3']
 
-      if (textline[0:zonelen] == zonetitle):
-        if (designnum != 0):
-          checkline = textline.split("SOLUTIONTIME=")
-          checkdesign = int(checkline[1])
-          if (checkdesign == designnum): zonefound = True
-        else: zonefound = True
+  # number of valid values per design of each column
 
-      if zonefound:
-        splitline = textline.split(",")
-        if len(splitline) > 2:
-          maxt = float((splitline[1].split("="))[1])
-          xmaxt = float((splitline[2].split("="))[1])
-          maxc = float((splitline[3].split("="))[1])
-          xmaxcline = splitline[4].split('"')[0]
-          xmaxc = float((xmaxcline.split("="))[1])
+  count_of = dict(x='npt', y='npt', deriv2='nderiv', deriv3='nderiv',
+                  alpha='noper', cl='noper', cd='noper', cm='noper',
+                  xtrt='noper', xtrb='noper', glide='noper', climb='noper',
+                  flapangle='nflap')
+  polar_counts = ['noper', 'nflap']
 
+  def __init__(self):
+    self.info = {}
+    for name in self.info_names:
+      self.info[name] = GrowableArray()
+    self.counts = {}
+    for name in ['npt', 'nderiv', 'noper', 'nflap']:
+      self.counts[name] = GrowableArray(dtype=int)
+    self.columns = {}
+    self.polarfile = None           # zone reader of the polars file
+    self.derived = {}               # design index -> cache of derived quantities
+    self.hashes = GrowableArray(dtype=np.int64)   # hash of coordinates per design
+    self.originals = GrowableArray(dtype=int)     # first design with same coordinates
+    self.hashindex = {}             # hash -> design index with these coordinates
+    self.georows = GrowableArray(dtype=int)       # row -> row of x, y, deriv2, deriv3
+    self.numgeometries = 0          # rows of x, y, deriv2, deriv3
+
+  def is_polar(self, name):
+    return (name in self.polar_counts) or (self.count_of.get(name) in self.polar_counts)
+
+  def __len__(self):
+    return self.counts['npt'].size
+
+  def __getitem__(self, i):
+    if (i < 0): i = i + len(self)
+    if (i < 0) or (i >= len(self)): raise IndexError('design index out of range')
+    return DesignView(self, i)
+
+  # 2D array (designs x values) of a column - NaN where a design has no value
+
+  def values(self, name):
+    if self.is_polar(name):
+      self.load_polars(range(len(self)))
+    return self.get_rows(name)
+
+  # Values of a column for each row - duplicates get the coordinates they refer to
+
+  def get_rows(self, name):
+    if name in self.geometry_names:
+      return self._column(name, 0).data[self.georows.data]
+    return self._column(name, 0).data
+
+  # Values of a column of a single design
+
+  def get(self, name, i):
+    if self.is_polar(name):
+      self.load_polars([i])
+    i = self.get_row(i)
+    if name in self.info:
+      return self.info[name].data[i]
+    elif name in self.counts:
+      return self.counts[name].data[i]
+    elif name in self.count_of:
+      n = self.counts[self.count_of[name]].data[i]
+      if (n == 0): return np.zeros((0))
+      if name in self.geometry_names: i = self.georows.data[i]
+      return self.columns[name].data[i,0:n]
     else:
+      raise AttributeError(name)
 
-      # Check to see if we've read all the coordinates
+  # Row of design i in the arrays
 
-      if (textline[0:4] == "zone"): break
+  def get_row(self, i):
+    return i
 
-      # Otherwise read coordinates
+  # Column with at least width values per design and a row for each design
 
-      else:
+  def _column(self, name, width):
+    if name not in self.columns:
+      self.columns[name] = GrowableArray(rowshape=(width,))
+    column = self.columns[name]
+    if (column.buffer.shape[1] < width):
+      column.widen(width, np.nan)
+    if name in self.geometry_names:
+      numrows = self.numgeometries
+    else:
+      numrows = self.counts['npt'].size
+    if (column.size < numrows):
+      column.extend(np.full((numrows - column.size, column.buffer.shape[1]), np.nan))
+    return column
 
-        line = textline.split()
-        x.append(float(line[0]))
-        y.append(float(line[1]))
+  def _set(self, name, i, values):
+    self._column(name, len(values)).data[i,0:len(values)] = values
+
+  # Reads the polars of the designs (indices) which were not read yet
 
-        # jx-mod additionally 2nd and 3rd derivative
-        if (len(line) > 2):
-          deriv2.append(float(line[2]))
-          deriv3.append(float(line[3]))
+  def load_polars(self, indices):
+    if self.polarfile is None: return
 
-  # Error if zone has not been found after reading the file
+    # The row is taken first - getting it may read a dropped design again and
+    # change the arrays (bounded store)
+
+    designnums = []
+    for i in indices:
+      if (i+1) not in self.polarfile.zones: continue
+      row = self.get_row(i)
+      if (self.counts['noper'].data[row] == 0): designnums.append(i+1)
 
-  if (not zonefound):
-    ioerror = 2
+    for designnum, zone in zip(designnums, self.polarfile.read_zones(designnums)):
+      zonetitle, data = zone
+      self.set_polars(designnum-1, decode_zone_data(data))
 
-  # Close the file
+  # All arrays of the store by name - e.g. to save them in a file
 
-  f.close()
+  def get_arrays(self):
+    arrays = {}
+    for name in self.info:
+      arrays['info_' + name] = self.info[name].data
+    for name in self.counts:
+      arrays['count_' + name] = self.counts[name].data
+    for name in self.columns:
+      arrays['column_' + name] = self._column(name, 0).data
+    for name in ['hashes', 'originals', 'georows']:
+      arrays['dedup_' + name] = getattr(self, name).data
+    return arrays
 
-  # Return coordinate data
+  # Replaces the content of the store by arrays of get_arrays()
 
-  # jx-mod additionally 2nd and 3rd derivative
-  return x, y, maxt, xmaxt, maxc, xmaxc, ioerror, deriv2, deriv3
+  def set_arrays(self, arrays):
+    self.__init__()
+    for key in arrays:
+      kind, name = key.split('_', 1)
+      if (kind == 'info'):
+        self.info[name].extend(arrays[key])
+      elif (kind == 'count'):
+        self.counts[name].extend(arrays[key])
+      elif (kind == 'column'):
+        self.columns[name] = GrowableArray(rowshape=arrays[key].shape[1:])
+        self.columns[name].extend(arrays[key])
+      elif (kind == 'dedup'):
+        getattr(self, name).extend(arrays[key])
 
-################################################################################
-# Reads airfoil polars from file
-def read_airfoil_polars(filename, zonetitle):
+    if 'x' in self.columns: self.numgeometries = self.columns['x'].size
+    first = (self.originals.data == np.arange(self.originals.size))
+    self.hashindex = dict(zip(self.hashes.data[first].tolist(),
+                              np.nonzero(first)[0].tolist()))
 
-  ioerror = 0
-  alpha = []
-  cl = []
-  cd = []
-  cm = []
-  xtrt = []
-  xtrb = []
-  #jx-mod Read also flap angle from polar file
-  flapangle = []
+  # Registers design i with its coordinates x, y - returns the index of the
+  # first design with the same coordinates (i if there is none)
 
-  # Try to open the file
+  def register_design(self, i, x, y):
+    digest = get_coordinates_hash(x, y)
+    original = self.hashindex.setdefault(digest, i)
+    self.hashes.extend([digest])
+    self.originals.extend([original])
+    return original
 
-  try:
-    f = open(filename)
-  except IOError:
-    ioerror = 1
-    return alpha, cl, cd, cm, xtrt, xtrb, flapangle, ioerror
+  # True if design i has the same coordinates as an earlier design
 
-  # Read lines until we get to the correct zone
+  def is_duplicate(self, i):
+    return self.originals.data[i] != i
 
-  zonefound = False
-  zonelen = len(zonetitle)
+  def get_original(self, i):
+    return int(self.originals.data[i])
 
-  for textline in f:
+  # Per design True if it is a duplicate of an earlier design
 
-    if (not zonefound):
+  def get_duplicates(self):
+    return self.originals.data != np.arange(self.originals.size)
 
-      # Check for the zone we are looking for
+  def count_duplicates(self):
+    return int(np.count_nonzero(self.get_duplicates()))
 
-      if (textline[0:zonelen] == zonetitle):
+  # Appends a design - table holds x, z and optional 2nd and 3rd derivative
 
-        zonefound = True
+  def append_coordinates(self, maxt, xmaxt, maxc, xmaxc, table):
 
-    else:
+    original = self.register_design(len(self), table[:,0], table[:,1])
+    georow = None
+    if (original < len(self)): georow = self.georows.data[original]
+    self.add_row((maxt, xmaxt, maxc, xmaxc), table, georow)
 
-      # Check to see if we've read all the polars
+  # Adds a row - the coordinates are stored in a new row of x, y, ... unless the
+  # design refers to the coordinates at georow
 
-      if (textline[0:4] == "zone"): break
+  def add_row(self, info, table, georow=None):
 
-      # Otherwise read polars
+    npt = table.shape[0]
+    nderiv = npt if (table.shape[1] > 3) else 0
 
-      else:
+    for name, value in zip(self.info_names, info):
+      self.info[name].extend([value])
+    for name, value in zip(['npt', 'nderiv', 'noper', 'nflap'], [npt, nderiv, 0, 0]):
+      self.counts[name].extend([value])
 
-        line = textline.split()
-        alpha.append(float(line[0]))
-        cl.append(float(line[1]))
-        cd.append(float(line[2]))
-        cm.append(float(line[3]))
-        xtrt.append(float(line[4]))
-        xtrb.append(float(line[5]))
+    if georow is not None:
+      self.georows.extend([georow])
+      return
 
-        #jx-mod Read flap-angle if exists
-        if (len(line) > 6):
-          flapangle.append(float(line[6]))
+    i = self.numgeometries                      # new row of the coordinates
+    self.numgeometries += 1
+    self.georows.extend([i])
 
-  # Error if zone has not been found after reading the file
+    self._set('x', i, table[:,0])
+    self._set('y', i, table[:,1])
 
-  if (not zonefound):
-    ioerror = 2
+    # jx-mod 2nd and 3rd derivative - sign of upper side is flipped
 
-  # Close the file
+    if (nderiv > 0):
+      upper = np.arange(npt) < np.argmin(table[:,0])
+      sign = np.where(upper, -1.0, 1.0)
+      self._set('deriv2', i, table[:,2] * sign)
+      self._set('deriv3', i, table[:,3] * sign)
 
-  f.close()
+  # Sets polars of design i - table holds alpha, cl, cd, cm, xtrt, xtrb and
+  # optional flap angle
 
-  # Return polar data
+  def set_polars(self, i, table):
 
-  return alpha, cl, cd, cm, xtrt, xtrb, flapangle, ioerror
+    # The row is taken right before writing - a design which was dropped in the
+    # meantime (bounded store) is read again and not written to another row
 
-################################################################################
-# Reads optimization history
-def read_optimization_history(step):
+    row = self.get_row(i)
+    noper = table.shape[0]
+    cl = table[:,1]
+    cd = table[:,2]
 
-  ioerror = 0
-  fmin = 0.
-  relfmin = 0.
-  rad = 0.
+    for name, col in zip(['alpha', 'cl', 'cd', 'cm', 'xtrt', 'xtrb'], range(6)):
+      self._set(name, row, table[:,col])
 
-  # Try to open the file
+    # jx-mod additional glide and climb ratio
 
-  try:
-    f = open('optimization_history.dat')
-  except IOError:
-    ioerror = 1
-    return fmin, relfmin, rad, ioerror
+    self._set('glide', row, cl / cd)
+    self._set('climb', row, np.where(cl > 0.0, np.abs(cl)**1.5 / cd, 0.0))
 
-  # Read lines until we get to the step
+    if (table.shape[1] > 6):
+      self._set('flapangle', row, table[:,6])
+      self.counts['nflap'].data[row] = noper
+    self.counts['noper'].data[row] = noper
+    self.derived.pop(i, None)
 
-  stepfound = False
-  for textline in f:
+  # Appends designs given as columns (designs x values) in one step - e.g. the
+  # records of the binary design history. Values behind npoint are ignored.
 
-    if (not stepfound):
+  def append_designs(self, columns):
 
-      # Check for the step we are looking for
+    row = self.counts['npt'].size               # first new row
+    numnew = len(columns['npoint'])
+    npt = columns['npoint'].astype(int)
+    noper = columns['alpha'].shape[1]
 
-      splitline = textline.split()
-      try:
-        linestep = int(splitline[0])
-      except ValueError:
-        continue
+    # Duplicates refer to the coordinates of the first design - only the
+    # coordinates of new (unique) designs are stored
 
-      if (linestep == step):
-        stepfound = True
-        fmin = float(splitline[1])
-        relfmin = float(splitline[2])
-        rad = float(splitline[3])
+    first = self.numgeometries
+    unique = np.zeros(numnew, dtype=bool)
+    for k in range(numnew):
+      original = self.register_design(row + k, columns['x'][k,0:npt[k]], columns['z'][k,0:npt[k]])
+      unique[k] = (original == row + k)
+      if unique[k]:
+        self.georows.extend([self.numgeometries])
+        self.numgeometries += 1
+      else:
+        self.georows.extend([self.georows.data[original]])
+    last = self.numgeometries
 
-  # Error if step has not been found after reading the file
+    for name in self.info_names:
+      self.info[name].extend(columns[name])
+    for name, value in zip(['npt', 'nderiv', 'noper', 'nflap'], [npt, npt, noper, noper]):
+      self.counts[name].extend(np.broadcast_to(value, (numnew,)))
 
-  if (not stepfound):
-    ioerror = 2
+    valid = np.arange(columns['x'].shape[1]) < npt[unique,np.newaxis]
+    for name, column in zip(self.geometry_names, binary_coordinate_columns):
+      values = np.where(valid, columns[column][unique], np.nan)
+      self._column(name, values.shape[1]).data[first:last] = values
 
-  # Close the file
+    # jx-mod 2nd and 3rd derivative - sign of upper side is flipped
 
-  f.close()
+    if (last > first):
+      x = self.columns['x'].data[first:last]
+      upper = np.arange(x.shape[1]) < np.nanargmin(x, axis=1)[:,np.newaxis]
+      for name in ['deriv2', 'deriv3']:
+        self.columns[name].data[first:last] *= np.where(upper, -1.0, 1.0)
 
-  # Return optiimzation history data
+    # jx-mod additional glide and climb ratio
 
-  return fmin, relfmin, rad, ioerror
+    cl = columns['cl']
+    cd = columns['cd']
+    polars = dict((name, columns[name]) for name in
+                  ['alpha', 'cl', 'cd', 'cm', 'xtrt', 'xtrb', 'flapangle'])
+    polars['glide'] = cl / cd
+    polars['climb'] = np.where(cl > 0.0, np.abs(cl)**1.5 / cd, 0.0)
+    for name, values in polars.items():
+      self._column(name, noper).data[row:row+numnew,0:noper] = values
 
 ################################################################################
-# Loads airfoil coordinates and polars from files
-def load_airfoils_from_file(coordfilename, polarfilename):
+# DesignStore with bounded memory for very long monitoring sessions (--keep)
+#
+#    Only the latest designs - the latest is also the best one, as Xoptfoil
+#    writes a design at each improvement - and a sparse logarithmic sample of
+#    older designs (numbers 2^k and 3*2^k) stay in memory. The others are read
+#    again from the coordinates file via the byte offsets of its zone index -
+#    or from their record in the binary design history - when they are used.
+################################################################################
 
-  # Initialize output data
+bounded_designs = 0             # latest designs kept in memory (0: all designs)
+bounded_sample_size = 64        # upper limit of the logarithmic sample
 
-  seedfoil = Airfoil()
-  designfoils = []
-  ioerror = 0
+class BoundedDesignStore(DesignStore):
 
-  # Check for seed airfoil coordinates
+  def __init__(self, numlatest, reader):
+    DesignStore.__init__(self)
+    self.numlatest = numlatest
+    self.reader = reader            # reader of the design files
+    self.numdesigns = 0
+    self.rows = {}                  # design index -> row of the arrays
+    self.designs = []               # design index of each row
 
-  print("Checking for airfoil coordinates file " + coordfilename + "...")
+  def __len__(self):
+    return self.numdesigns
 
-  zonetitle = 'zone t="Seed airfoil'
+  # Row of design i - the design is read again if it was dropped
 
-  # jx-mod additional 2nd and 3rd derivative
-  x, y, maxt, xmaxt, maxc, xmaxc, ioerror, deriv2, deriv3 = read_airfoil_coordinates(
-                                                    coordfilename, zonetitle, 0)
-  if (ioerror == 1):
-    print("Warning: file " + coordfilename + " not found.")
-    return seedfoil, designfoils, ioerror
-  elif (ioerror == 2):
-    print("Error: zone labeled " + zonetitle + " not found in " + coordfilename
-          + ".")
-    return seedfoil, designfoils, ioerror
+  def get_row(self, i):
+    row = self.rows.get(i)
+    if row is None:
+      if self.reader.is_binary():
+        columns = self.reader.binfile.read_records(i+1, i+2)
+        row = self.append_row(i, [columns[name][0] for name in self.info_names],
+                              get_binary_table(columns, binary_coordinate_columns, 0))
+        self.set_polars(i, get_binary_table(columns, binary_polar_columns, 0))
+      else:
+        zonetitle, data = self.reader.coordfile.read_zone(i+1)
+        row = self.append_row(i, parse_geometry_info(zonetitle), decode_zone_data(data))
+    return row
+
+  # Only the designs in memory have values - the others are NaN
+
+  def values(self, name):
+    if self.is_polar(name):
+      self.load_polars(list(self.rows))
+    column = self.get_rows(name)
+    values = np.full((self.numdesigns,) + column.shape[1:], np.nan)
+    values[self.designs] = column
+    return values
+
+  # Duplicates are only recognized - each row keeps its own coordinates, so
+  # rows can be dropped independently
+
+  def append_coordinates(self, maxt, xmaxt, maxc, xmaxc, table):
+    self.register_design(self.numdesigns, table[:,0], table[:,1])
+    self.numdesigns += 1
+    self.append_row(self.numdesigns - 1, (maxt, xmaxt, maxc, xmaxc), table)
+
+  # Designs are appended one by one, so the older ones can be dropped
+
+  def append_designs(self, columns):
+    for k in range(len(columns['npoint'])):
+      self.append_coordinates(*[columns[name][k] for name in self.info_names],
+                              get_binary_table(columns, binary_coordinate_columns, k))
+      self.set_polars(self.numdesigns - 1, get_binary_table(columns, binary_polar_columns, k))
+
+  # Designs are dropped when the arrays are full - before the new row is added,
+  # so a design which was just read stays available
+
+  def append_row(self, i, info, table):
+    if (len(self.designs) >= 2 * (self.numlatest + bounded_sample_size)):
+      self.drop_designs()
+    row = len(self.designs)
+    self.add_row(info, table)
+    self.rows[i] = row
+    self.designs.append(i)
+    return row
+
+  # The kept rows get new buffers - designs handed out before (e.g. to a plot)
+  # are views of the old ones and must not be overwritten
+
+  def drop_designs(self):
+
+    keep = [i for i in self.designs if self.is_kept(i)]
+    keeprows = [self.rows[i] for i in keep]
+
+    arrays = list(self.info.values()) + list(self.counts.values())
+    arrays += [self._column(name, 0) for name in self.columns]
+    for array in arrays:
+      array.replace(array.data[keeprows])
+
+    self.designs = keep
+    self.rows = dict((i, row) for row, i in enumerate(keep))
+    self.derived = dict((i, self.derived[i]) for i in keep if i in self.derived)
+    self.georows.clear()
+    self.georows.extend(np.arange(len(keep)))
+    self.numgeometries = len(keep)
+
+    # only duplicates of designs in memory are recognized - the hash index
+    # doesn't grow with the run
+
+    self.hashindex = dict((digest, i) for digest, i in self.hashindex.items()
+                          if self.is_kept(i))
+
+  def is_kept(self, i):
+    if (i >= self.numdesigns - self.numlatest): return True
+    n = i + 1
+    if (n % 3 == 0): n = n // 3
+    return (n & (n - 1)) == 0
+
+#-------------------------------------------------------------------------------
+# Hash of coordinates rounded to coordinates_resolution (as 64 bit integer)
+#-------------------------------------------------------------------------------
+def get_coordinates_hash(x, y):
+
+  values = np.round(np.concatenate((x, y)) / coordinates_resolution).astype(np.int64)
+  digest = hashlib.blake2b(values.tobytes(), digest_size=8).digest()
+  return int.from_bytes(digest, 'little', signed=True)
+
+#-------------------------------------------------------------------------------
+# New store for the designs of the design files - bounded with --keep
+#-------------------------------------------------------------------------------
+def new_design_store(reader):
+
+  if (bounded_designs > 0):
+    return BoundedDesignStore(bounded_designs, reader)
+  return DesignStore()
 
-  seedfoil.setCoordinates(np.array(x), np.array(y))
-  seedfoil.setGeometryInfo(maxt, xmaxt, maxc, xmaxc)
-  # jx-mod additional 2nd and 3rd derivative
-  seedfoil.setDerivatives(deriv2, deriv3)
+################################################################################
+# View of a single design in the DesignStore with the attributes of Airfoil
+class DesignView(DerivedQuantities):
 
-  # Read coordinate data for designs produced by optimizer
+  def __init__(self, store, i):
+    self.store = store
+    self.i = i
 
-  print("Reading airfoil coordinates from file " + coordfilename + "...")
+  def get_derived_cache(self):
+    return self.store.derived.setdefault(self.i, {})
 
-  read_finished = False
-  counter = 1
-  while (not read_finished):
+  def __getattr__(self, name):
+    if name.startswith('__') or (name in ['store', 'i']):
+      raise AttributeError(name)
+    return self.store.get(name, self.i)
 
-    zonetitle = 'zone t="Airfoil'
-    x, y, maxt, xmaxt, maxc, xmaxc, ioerror, deriv2, deriv3 = read_airfoil_coordinates(
-                                              coordfilename, zonetitle, counter)
-    if (ioerror == 2):
-      read_finished = True
-      numfoils = counter - 1
-      ioerror = 0
-    else:
-      currfoil = Airfoil()
-      currfoil.setCoordinates(np.array(x), np.array(y))
-      currfoil.setGeometryInfo(maxt, xmaxt, maxc, xmaxc)
+################################################################################
+# Optimization history which is read as a stream
+#
+#    The file position is kept, so each call only parses the lines appended
+#    since the previous call - in one block.
+################################################################################
+class OptimizationHistory:
 
-      # jx-mod additional 2nd and 3rd derivative
-      currfoil.setDerivatives(deriv2, deriv3)
+  def __init__(self, filename='optimization_history.dat'):
+    self.filename = filename
+    self.offset = 0                 # byte offset behind the last complete line
+    self._steps = GrowableArray(dtype=int)
+    self._fmins = GrowableArray()
+    self._relfmins = GrowableArray()
+    self._rads = GrowableArray()
 
-      designfoils.append(currfoil)
-      counter += 1
+  # Copy of the history which isn't read from the file any more
 
-  print("   Found " + str(numfoils) + " airfoil coordinates plus seed airfoil.")
+  def get_finished(self):
+    history = OptimizationHistory(self.filename + ' (finished)')
+    history._steps.extend(self.steps)
+    history._fmins.extend(self.fmins)
+    history._relfmins.extend(self.relfmins)
+    history._rads.extend(self.rads)
+    return history
 
-  # Read seed airfoil polars (note: negative error code means coordinates were
-  # read but not polars)
+  @property
+  def steps(self): return self._steps.data
 
-  print("Checking for airfoil polars file " + polarfilename + "...")
+  @property
+  def fmins(self): return self._fmins.data
 
-  zonetitle = 'zone t="Seed airfoil polar"'
-  alpha, cl, cd, cm, xtrt, xtrb, flapangle, ioerror = read_airfoil_polars(polarfilename,
-                                                                      zonetitle)
-  if (ioerror == 1):
-    print("Warning: file " + polarfilename + " not found.")
-    return seedfoil, designfoils, 0 - ioerror
-  elif (ioerror == 2):
-    print("Error: zone labeled " + zonetitle + " not found in " + polarfilename
-          + ".")
-    return seedfoil, designfoils, 0 - ioerror
+  @property
+  def relfmins(self): return self._relfmins.data
 
-  seedfoil.setPolars(np.array(alpha), np.array(cl), np.array(cd), np.array(cm),
-                     np.array(xtrt), np.array(xtrb), np.array(flapangle))
+  @property
+  def rads(self): return self._rads.data
 
-  # Read polar data for designs produced by optimizer
+  # Reads the steps appended since the last call
 
-  print("Reading airfoil polars from file " + polarfilename + "...")
+  @timed('read')
+  def read_new(self):
 
-  read_finished = False
-  counter = 1
-  while (not read_finished):
+    f, compressed = open_data_file(self.filename)
+    if f is None:
+      return 1
 
-    zonetitle = 'zone t="Polars", SOLUTIONTIME=' + str(counter)
-    alpha, cl, cd, cm, xtrt, xtrb, flapangle, ioerror = read_airfoil_polars(polarfilename,
-                                                                      zonetitle)
-    if (ioerror == 2):
-      read_finished = True
-      ioerror = 0
+    # File was replaced by a new optimization run - start again
+    # (an archived, compressed history is read at once)
+
+    if compressed:
+      if (self.offset > 0):
+        f.close()
+        return 0
     else:
-      designfoils[counter-1].setPolars(np.array(alpha), np.array(cl),
-                                       np.array(cd), np.array(cm),
-                                       np.array(xtrt), np.array(xtrb),
-                                       np.array(flapangle))
-      counter += 1
-
-  print("   Found " + str(counter-1) + " airfoil polars plus seed airfoil.")
-  if (counter != numfoils+1):
-    print("Error: number of airfoil coordinates and polars does not match.")
-    ioerror = 3
-    return seedfoil, designfoils, ioerror
+      f.seek(0, 2)
+      if (f.tell() < self.offset):
+        self.__init__(self.filename)
 
-  return seedfoil, designfoils, ioerror
+    f.seek(self.offset)
+    data = f.read()
+    f.close()
+
+    # Only complete lines - skip header line at the beginning of the file
+
+    data = data[0:data.rfind(b'\n')+1]
+    start = 0
+    if (self.offset == 0) and not data[0:1].isdigit():
+      start = data.find(b'\n') + 1
+    self.offset += len(data)
+
+    ncol = len(data[start:data.find(b'\n', start)].split())
+    if (ncol < 3): return 0
+
+    with timed_phase('parse'):
+      table = np.fromstring(data[start:], dtype=float, sep=' ').reshape(-1, ncol)
 
+    # Without relative_fmin_report there is no column "% Improvement"
 
+    self._steps.extend(table[:,0].astype(int))
+    self._fmins.extend(table[:,1])
+    if (ncol > 3):
+      self._relfmins.extend(table[:,2])
+    else:
+      self._relfmins.extend(np.zeros(table.shape[0]))
+    self._rads.extend(table[:,-1])
 
+    return 0
 
 ################################################################################
-# Plots airfoil coordinates
+# Data files compressed with gzip, xz or zstd (e.g. archived runs)
+#
+#    The compression is recognized by the magic bytes at the beginning of the
+#    file. A compressed file may also carry the extension .gz, .xz or .zst.
 ################################################################################
 
-def plot_airfoil_coordinates(seedfoil, matchfoil, designfoils, plotnum, firsttime=True,
-                             animation=False, prefix=None):
-  global plotoptions
+compressed_suffixes = ['.gz', '.xz', '.zst']
+compression_magic = [('gzip', b'\x1f\x8b'), ('xz', b'\xfd7zXZ\x00'), ('zstd', b'\x28\xb5\x2f\xfd')]
 
-  # Set plot options ------
+#-------------------------------------------------------------------------------
+# Name of the existing file - filename itself or with extension of compression
+#-------------------------------------------------------------------------------
+def get_data_filename(filename):
 
-  plot_2nd_deriv  = True                 # Plot of curvature / 2nd derivative of polyline
-  plot_3rd_deriv  = False                # Plot of 3nd derivative of polyline
-  plot_delta_y    = True                 # Plot delta of y ("z") value between current and seed
-  plot_matchfoil  = True                 # Plot the matchfoil and the delta from current to match
-  plot_seedfoil   =     plotoptions["show_seed_airfoil_only"] or plotoptions["show_seed_airfoil"]
-  plot_foil       = not plotoptions["show_seed_airfoil_only"]
+  for name in [filename] + [filename + suffix for suffix in compressed_suffixes]:
+    if os.path.isfile(name): return name
+  return filename
 
-  show_info       = plotoptions["show_airfoil_info"]
-  show_transition = True                 # show transition points
+#-------------------------------------------------------------------------------
+# Compression of a file - 'gzip', 'xz', 'zstd' or None
+#-------------------------------------------------------------------------------
+def get_compression(filename):
 
-  sc = plotoptions["color_for_seed"]
-  nc = plotoptions["color_for_new_designs"]
+  try:
+    with open(filename, 'rb') as f:
+      magic = f.read(6)
+  except IOError:
+    return None
 
-  # --- end plot options
+  for compression, bytes in compression_magic:
+    if magic.startswith(bytes): return compression
+  return None
 
-  # Sanity check of plot options
+#-------------------------------------------------------------------------------
+# Opens a data file for binary reading - decompressing it while reading
+#
+#    returns the file (None if it doesn't exist) and True if it's compressed
+#-------------------------------------------------------------------------------
+def open_data_file(filename):
 
-  if (plotnum > 0): foil = designfoils[plotnum-1]
+  filename = get_data_filename(filename)
+  compression = get_compression(filename)
 
-  plot_foil      = plot_foil and (plotnum > 0)
-  if not (plot_seedfoil or plot_foil): return
+  try:
+    if (compression == 'gzip'):
+      return gzip.open(filename, 'rb'), True
+    elif (compression == 'xz'):
+      return lzma.open(filename, 'rb'), True
+    elif (compression == 'zstd'):
+      if zstandard is None:
+        print("Error: " + filename + " is compressed with zstd. " +
+              "Install the python package zstandard to read it.")
+        return None, False
+      return zstandard.ZstdDecompressor().stream_reader(open(filename, 'rb'),
+                                                        closefd=True), True
+    else:
+      return open(filename, 'rb'), False
+  except IOError:
+    return None, False
 
-  plot_2nd_deriv  = plot_2nd_deriv  and (len(seedfoil.deriv2) > 0)
-  plot_3rd_deriv  = plot_3rd_deriv  and (len(seedfoil.deriv3) > 0)
-  plot_3rd_deriv  = plot_3rd_deriv  and (not plot_2nd_deriv)
-  plot_matchfoil  = plot_matchfoil and (matchfoil.npt > 0)
-  plot_delta_y    = plot_foil and plot_delta_y and plot_seedfoil and (not plot_matchfoil)
-  plot_delta_y    = plot_delta_y and (np.array_equal(seedfoil.x, foil.x))
-  show_transition = plot_foil and show_transition and (len(foil.xtrt > 0))
+################################################################################
+# Index of the zones of a Tecplot-style zone file
+#
+#    The byte range of each zone (seed, match airfoil and every SOLUTIONTIME)
+#    is found once with mmap and the index is extended as the file grows, so
+#    any design can be read with a seek. The last zone in the file is only
+#    taken if it is complete - it has the number of lines of its title (I=...)
+#    or, in files of older Xoptfoil versions, as many as the design before.
+#
+#    Compressed files (archived runs) are indexed once while decompressing them
+#    block by block. Byte ranges are offsets in the decompressed data.
+################################################################################
 
-  # Set up coordinates plot, create figure and axes
+compressed_block_size = 16 * 1024 * 1024
 
-  window_name = "Geometry  " + str(prefix)
+class ZoneFileReader:
 
-  if firsttime:
-    plt.close(window_name)
-    cfig = plt.figure(num= window_name)
-    if plot_matchfoil:                # in this case bigger window
-      try:                            # Qt4Agg
-        plt.get_current_fig_manager().window.setGeometry(600,400,1300,550)
-      except:                         # TkAgg
-        plt.get_current_fig_manager().window.wm_geometry("+600+400")    # position
-        plt.get_current_fig_manager().resize(1300, 550)                 # size
-    else:
-      try:                            # Qt4Agg
-        plt.get_current_fig_manager().window.setGeometry(850,630,1000,400)
-      except:                         # TkAgg
-        plt.get_current_fig_manager().window.wm_geometry("+850+650")    # position
-        plt.get_current_fig_manager().resize(1000, 350)                 # size
-    ax = plt.subplot(111)
-    mirrorax = ax.twinx()
-  else:
-    cfig = plt.figure(num= window_name)
-    if (len(cfig.get_axes()) > 0):
-      ax = cfig.get_axes()[0]
-    else:                                       # Window closed by user?
-      exit()
+  def __init__(self, filename):
+    self.filename = filename
+    self.zones = {}                 # design number -> byte range of zone
+    self.designnums = []            # design numbers in file order
+    self.offset = 0                 # byte offset behind the last complete zone
+    self.zonelines = 0              # number of data lines of the last complete zone
+    self.numread = 0                # number of zones handed out by read_new_zones
+    self.compressed = False
+    self.stream = None              # decompressing reader kept for forward seeks
 
-    mirrorax = ax.get_shared_x_axes().get_siblings(ax)[0]
-    ax.clear()
-    mirrorax.clear()
+  # The open stream isn't copied e.g. to the export processes
 
-  # Auto plotting bounds
+  def __getstate__(self):
+    state = self.__dict__.copy()
+    state['stream'] = None
+    return state
 
-  if ( plot_seedfoil and not plot_foil ):
-    xmax = np.max(seedfoil.x)
-    xmin = np.min(seedfoil.x)
-    ymax = np.max(seedfoil.y)
-    ymin = np.min(seedfoil.y)
-  elif (plot_seedfoil and plot_foil):
-    xmax = max([np.max(seedfoil.x), np.max(foil.x)])
-    xmin = min([np.min(seedfoil.x), np.min(foil.x)])
-    ymax = max([np.max(seedfoil.y), np.max(foil.y)])
-    ymin = min([np.min(seedfoil.y), np.min(foil.y)])
-  else:
-    xmax = np.max(foil.x)
-    xmin = np.min(foil.x)
-    ymax = np.max(foil.y)
-    ymin = np.min(foil.y)
+  # State of the index as arrays - e.g. to save it in a file
+
+  def get_state(self):
+    ranges = [self.zones[designnum] for designnum in self.designnums]
+    return dict(designnums=np.array(self.designnums, dtype=int),
+                ranges=np.array(ranges, dtype=np.int64).reshape(-1, 2),
+                offset=np.int64(self.offset), zonelines=np.int64(self.zonelines))
+
+  # Restores the index from get_state() - all zones count as read
+
+  def set_state(self, state):
+    self.__init__(self.filename)
+    self.designnums = [int(designnum) for designnum in state['designnums']]
+    for designnum, zonerange in zip(self.designnums, state['ranges']):
+      self.zones[designnum] = (int(zonerange[0]), int(zonerange[1]))
+    self.offset = int(state['offset'])
+    self.zonelines = int(state['zonelines'])
+    self.numread = len(self.designnums)
+
+  # Extends the index by the zones appended since the last call
+
+  @timed('read')
+  def update_index(self):
+
+    f, compressed = open_data_file(self.filename)
+    if f is None:
+      return 1
+    if compressed:
+      f.close()
+      return self.update_compressed_index()
+
+    # File was replaced by a new optimization run - start again
+
+    size = os.fstat(f.fileno()).st_size
+    if (size < self.offset) or self.compressed:
+      self.__init__(self.filename)
+    if (size == self.offset):
+      f.close()
+      return 0
+
+    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    self.index_zones(mm, 0, True)
+    mm.close()
+    f.close()
+
+    return 0
+
+  # An archived run doesn't change anymore - it's indexed only once (or the
+  # index was taken from the cache)
+
+  def update_compressed_index(self):
+
+    self.compressed = True
+    if (self.offset > 0): return 0
+
+    stream, compressed = open_data_file(self.filename)
+    if stream is None: return 1
+
+    # Only the incomplete zone at the end of a block is kept for the next one
+
+    data = b''
+    base = 0                        # offset of data in the decompressed file
+    final = False
+    while not final:
+      block = stream.read(compressed_block_size)
+      final = (len(block) == 0)
+      data = data[self.offset - base:] + block
+      base = self.offset
+      self.index_zones(data, base, final)
+    stream.close()
+
+    return 0
+
+  #-----------------------------------------------------------------------------
+  # Adds the complete zones of data (mmap or bytes) behind offset to the index
+  #    base is the offset of data in the file, final is True at the end of file
+  #-----------------------------------------------------------------------------
+  def index_zones(self, data, base, final):
+
+    size = len(data)
+    start = data.find(b'zone t=', self.offset - base)
+    prevrange = None
+
+    while (start >= 0):
+
+      titleend = data.find(b'\n', start)
+      if (titleend < 0): break
+      nextstart = data.find(b'\nzone t=', titleend)
+
+      # Last zone in file - maybe the optimizer is still writing. It's complete
+      # when it has the number of lines of the title (I=...), in files of older
+      # Xoptfoil versions when it has as many lines as the design or seed before.
+      # The match airfoil has its own number of points - like the last zone of
+      # an archived run it's taken with all its lines as these versions did.
+
+      zonetitle = data[start:titleend].decode()
+      designnum = get_zone_designnum(zonetitle)
+
+      if (nextstart >= 0):
+        end = nextstart + 1
+      elif not final:
+        break                           # rest of zone is in the next block
+      else:
+        end = size
+        zonelines = data[titleend+1:end].count(b'\n')
+        numlines = get_zone_numlines(zonetitle)
+        if numlines is None:
+          if prevrange is not None:
+            self.zonelines = data[prevrange[0]:prevrange[1]].count(b'\n')
+          if ((self.zonelines == 0) or (designnum == -1) or self.compressed):
+            numlines = zonelines
+          else:
+            numlines = self.zonelines
+        if not ((data[end-1:end] == b'\n') and (zonelines == numlines)):
+          break
+
+      self.zones[designnum] = (base + start, base + end)
+      self.designnums.append(designnum)
+      self.offset = base + end
+      if (designnum != -1): prevrange = (titleend+1, end)
+
+      if (nextstart >= 0):
+        start = end
+      else:
+        start = -1
 
-  xrng = xmax - xmin
-  xmax= xmax + 0.05*xrng
-  xmin= xmin - 0.05*xrng
-  yrng = ymax - ymin
-  ymax= ymax + 0.05*yrng
-  ymin= ymin - 0.05*yrng
-  ax.set_aspect('equal', 'datalim')
-  ax.set_xlabel('x')
-  ax.set_ylabel('y')
-  ax.set_xlim([xmin,xmax])
+    if prevrange is not None:
+      self.zonelines = data[prevrange[0]:prevrange[1]].count(b'\n')
 
-  # Plot airfoil coordinates
+  # Reads the zones with the given design numbers as list of (title, data)
 
-  if plot_seedfoil:
-    ax.plot(seedfoil.x, seedfoil.y, color=sc, linewidth=0.8)
-  if plot_foil:
-    ax.plot(foil.x, foil.y, color=nc)
+  def read_zones(self, designnums):
 
-  # Plot specials like delta or derivatives
+    zones = []
+    if (len(designnums) == 0): return zones
 
-  if plot_2nd_deriv:
-    ax.set_ylim([-ymax,ymax])       # achieve ax.plot and mirrorax.plot is aligned in x-axis
-    mirrorax.set_ylabel('curvature', color='grey')
-    mirrorax.set_ylim(0.8, -0.8)
-    mirrorax.grid (axis='y')
-    if plot_seedfoil:
-      mirrorax.plot(seedfoil.x,  seedfoil.deriv2,  color='blue', linewidth=0.5, linestyle='--') #top
-    if plot_foil:
-      mirrorax.plot(foil.x, foil.deriv2, color='red', linewidth=0.8, linestyle='--')
+    start = min([self.zones[n][0] for n in designnums])
+    end = max([self.zones[n][1] for n in designnums])
 
-  if plot_3rd_deriv:
-    ax.set_ylim([-ymax,ymax])       # achieve ax.plot and mirrorax.plot is aligned in x-axis
-    mirrorax.set_ylabel('3rd derivative', color='magenta')
-    mirrorax.set_ylim(-8, 8)
-    mirrorax.grid (axis='y')
-    if plot_seedfoil:
-      mirrorax.plot(seedfoil.x,  seedfoil.deriv3,  color='grey', linewidth=0.8, linestyle=':')
-    if plot_foil:
-      mirrorax.plot(foil.x, foil.deriv3,  color='magenta', linewidth=0.8, linestyle='--')
+    data = self.read_range(start, end)
 
-  # Plot delta between seed and current airfoil
-  if plot_delta_y:
-    ax.plot(foil.x, (foil.y - seedfoil.y) * 5, color='green', linewidth=0.8, linestyle=':')
-    ax.axhline(0, color='grey', linewidth=0.5)
+    for n in designnums:
+      zone = data[self.zones[n][0]-start:self.zones[n][1]-start]
+      titleend = zone.find(b'\n')
+      zones.append((zone[0:titleend].decode().rstrip(), zone[titleend+1:]))
 
-  # Plot matchfoil an delta to match foil from Xoptfoil match_foils mode
-  if plot_matchfoil:
-    # ax.plot(matchfoil.x, matchfoil.y, color='green', linewidth=0.8)
-    ax.plot(foil.x, (foil.y - matchfoil.y) * 10, color='green', linewidth=0.8, linestyle='-.')
-    ax.axhline(0, color='grey', linewidth=0.5)
+    return zones
 
-  # show points of transition for the operating points
-  if show_transition:
-    iLE = np.argmin(seedfoil.x)
-    plot_points_of_transition (ax, foil.x[0:iLE], foil.y[0:iLE], foil.xtrt, upperside = True)
-    plot_points_of_transition (ax, foil.x[-iLE:] , foil.y[-iLE:], foil.xtrb, upperside = False)
+  # Reads bytes start to end - a compressed file is decompressed up to start,
+  # but only from the current position if it's a forward seek
 
-  # Display geometry info
+  @timed('read')
+  def read_range(self, start, end):
 
-  if show_info:
-    if plot_seedfoil:
-      mytext = ("Thickness: " + str(seedfoil.maxt) + '\n' +
-                "   at x/c: " + str(seedfoil.xmaxt) + '\n' +
-                "Camber: " + str(seedfoil.maxc) + '\n' +
-                "   at x/c: " + str(seedfoil.xmaxc))
-      ax.text(0.02, 0.02, mytext, color=sc, verticalalignment='bottom', horizontalalignment='left',
-              transform=ax.transAxes, fontsize='small')
-    if plot_foil:
-      mytext = ("Thickness: " + str(foil.maxt) + '\n' +
-                "   at x/c: " + str(foil.xmaxt) + '\n' +
-                "Camber: " + str(foil.maxc) + '\n' +
-                "   at x/c: " + str(foil.xmaxc))
-      ax.text(0.98, 0.02, mytext, color=nc, verticalalignment='bottom', horizontalalignment='right',
-              transform=ax.transAxes, fontsize='small')
+    if not self.compressed:
+      f = open(self.filename, 'rb')
+      f.seek(start)
+      data = f.read(end - start)
+      f.close()
+      return data
 
-  # Legend for coordinates plot
+    if (self.stream is None) or (self.stream.tell() > start):
+      if self.stream is not None: self.stream.close()
+      self.stream, compressed = open_data_file(self.filename)
+    self.stream.seek(start)
+    return self.stream.read(end - start)
 
-  lines = []
-  if plot_seedfoil:   lines.append(plt.Line2D((0,1),(0,0), color=sc,
-                                  label="Seed airfoil"))
-  # if plot_matchfoil:  lines.append(plt.Line2D((0,1),(0,0), color='green', linewidth=0.8,
-  #                                label="Match airfoil"))
-  if plot_foil:       lines.append(plt.Line2D((0,1),(0,0), color=nc,
-                                  label="Design number " + str(plotnum)))
-  if plot_delta_y:    lines.append(plt.Line2D((0,1),(0,0), color='green', linewidth=0.8, linestyle=':',
-                                  label="   delta y *5 "))
-  if plot_matchfoil:  lines.append(plt.Line2D((0,1),(0,0), color='green', linewidth=0.8, linestyle='-.',
-                                  label="   delta y to match *10 "))
-  if plot_2nd_deriv:  lines.append(plt.Line2D((0,1),(0,0), color=nc, linewidth=0.8, linestyle='--',
-                                  label="   curvature"))
-  if plot_3rd_deriv:  lines.append(plt.Line2D((0,1),(0,0), color='magenta', linewidth=0.8, linestyle='--',
-                                  label="   3rd derivative"))
+  # Reads a single zone with a seek - None if it is not in the file (yet)
 
-  # Create legend
+  def read_zone(self, designnum):
 
-  labels = [l.get_label() for l in lines]
-  ax.legend(lines, labels, loc="upper right", numpoints=1)
+    if (designnum not in self.zones):
+      self.update_index()
+    if (designnum not in self.zones):
+      return None
 
-  # Update plot for animation only (for others, plt.show() must be called
-  # separately)
+    return self.read_zones([designnum])[0]
 
-  if animation:
-    if (firsttime): cfig.show()
+  # Returns the zones appended since the last call as list of (title, data)
+  #    - at most maxzones, the others are returned by the next calls
 
-    # Save animation frames if requested
+  def read_new_zones(self, maxzones=None):
 
-    if plotoptions["save_animation_frames"]:
-      if (prefix == None):
-        print("Error: no file prefix specified - cannot save animation frames.")
-      else:
-        imagefname = prefix + '_coordinates.png'
-        print("Saving image frame to file " + imagefname + ' ...')
-        plt.savefig(imagefname)
+    ioerror = self.update_index()
+    designnums = self.designnums[self.numread:]
+    if maxzones is not None:
+      designnums = designnums[0:maxzones]
+    zones = self.read_zones(designnums)
+    self.numread = self.numread + len(designnums)
 
-  cfig.canvas.draw()
+    return zones, ioerror
 
-#---------------------------------------------------------------------------------------
-# Plot points of transition xtrs along polyline x,y
-#---------------------------------------------------------------------------------------
-def plot_points_of_transition (axes, x, y, xtrs, upperside = True):
+################################################################################
+# Holds the readers of the coordinates and polars file of a case - and of the
+# binary design history which Xoptfoil writes instead with write_binary_designs
+class DesignFileReader:
 
-  for i in range(len(xtrs)):
-    xtr = xtrs[i]
-    # get best coordinate point wihich is closest to xtr point
-    i_nearest = np.where(abs(x-xtr)==abs(x-xtr).min())[0][0]
+  def __init__(self, coordfilename, polarfilename):
+    self.coordfile = ZoneFileReader(coordfilename)
+    self.polarfile = ZoneFileReader(polarfilename)
+    self.binfile = BinaryDesignFile(get_binary_filename(coordfilename))
 
-    if upperside:
-      my_marker = 7
-      y_text = 7
-    else:
-      my_marker = 6
-      y_text = -13
+  # True if the designs are in the binary design history - the newer one if
+  # there is also a coordinates file of another run
 
-    axes.plot([x[i_nearest]], [y[i_nearest]], marker=my_marker, markersize=7, color="grey")
-    axes.annotate(('{:d}'.format(i+1)), xy = (x[i_nearest], y[i_nearest]),
-                  xytext = (-3,y_text), textcoords="offset points", fontsize = 8, color='dimgrey')
+  def is_binary(self):
+    binstatus = get_file_status(self.binfile.filename)
+    if binstatus is None: return False
+    coordstatus = get_file_status(get_data_filename(self.coordfile.filename))
+    return (coordstatus is None) or (binstatus[1] >= coordstatus[1])
 
+  def get_filenames(self):
+    return [self.coordfile.filename, self.polarfile.filename, self.binfile.filename]
 
+  # True if the polars of a design are in the polars file (0: seed airfoil)
 
+  def has_polars(self, designnum):
+    if self.is_binary():
+      return (designnum >= 0) and (designnum < self.binfile.numrecords)
+    return designnum in self.polarfile.zones
 
 ################################################################################
-# Plots polars
+# Binary design history of Xoptfoil-JX (<prefix>_design_history.bin)
+#
+#    A header of 256 bytes - 'XOPTDSGN', version, header size, max. points,
+#    op-points, number of coordinate and polar columns (int32) and the names of
+#    the columns - and a record of float64 with fixed width per design, the
+#    seed airfoil first. A record holds the values of the design (design
+#    number, npoint, maxt, ...), the coordinate columns with max. points values
+#    and the polar columns with a value per op-point.
+#
+#    The complete records are mapped into memory and copied column by column
+#    into the arrays of the DesignStore - without parsing text.
 ################################################################################
 
-def plot_polars(seedfoil, designfoils, plotnum, firsttime=True, animation=False,
-                prefix=None):
+binary_suffix = '_design_history.bin'
+binary_magic = b'XOPTDSGN'
+binary_version = 1
+binary_coordinate_columns = ['x', 'z', 'deriv2', 'deriv3']
+binary_polar_columns = ['alpha', 'cl', 'cd', 'cm', 'xtrt', 'xtrb', 'flapangle']
 
+class BinaryDesignFile:
+
+  def __init__(self, filename):
+    self.filename = filename
+    self.headersize = 0
+    self.columns = {}               # name -> (first value, number of values)
+    self.recordsize = 0             # values per record
+    self.numrecords = 0             # complete records at the last update
+    self.numread = 0                # records handed out by read_new_records
+
+  # Reads the header and counts the complete records - the optimizer may still
+  # write the last one
+
+  @timed('read')
+  def update(self):
+
+    try:
+      f = open(self.filename, 'rb')
+    except IOError:
+      return 1
+
+    header = f.read(256)
+    size = os.fstat(f.fileno()).st_size
+    f.close()
+
+    # File was replaced by a new optimization run - start again
+
+    columns = get_binary_columns(header)
+    if (len(columns) == 0):
+      self.__init__(self.filename)
+      return 2
+    if ((columns != self.columns) or
+        (size < self.headersize + self.numrecords * 8 * self.recordsize)):
+      self.__init__(self.filename)
+      self.columns = columns
+      self.headersize = struct.unpack_from('=i', header, 12)[0]
+      self.recordsize = sum(count for first, count in self.columns.values())
+
+    self.numrecords = (size - self.headersize) // (8 * self.recordsize)
+
+    return 0
+
+  # Records start to stop-1 as dict of columns (records x values)
+
+  @timed('read')
+  def read_records(self, start, stop):
+
+    stop = min(stop, self.numrecords)
+    if (stop <= start): return None
+
+    records = np.memmap(self.filename, dtype=float, mode='r', shape=(stop - start, self.recordsize),
+                        offset=self.headersize + start * 8 * self.recordsize)
+    columns = {}
+    for name, (first, count) in self.columns.items():
+      values = np.array(records[:,first:first+count])
+      columns[name] = values[:,0] if (count == 1) else values
+    del records                             # unmap - the optimizer may replace the file
+
+    return columns
+
+  # Returns the records appended since the last call - at most maxrecords, the
+  # others are returned by the next calls
+
+  def read_new_records(self, maxrecords):
+
+    ioerror = self.update()
+    if (ioerror != 0): return None, ioerror
+
+    columns = self.read_records(self.numread, self.numread + maxrecords)
+    if columns is not None:
+      self.numread += len(columns['npoint'])
+
+    return columns, ioerror
+
+#-------------------------------------------------------------------------------
+# Name of the binary design history belonging to a coordinates file
+#-------------------------------------------------------------------------------
+def get_binary_filename(coordfilename):
+
+  if coordfilename.endswith(coordfile_suffix):
+    return coordfilename[0:-len(coordfile_suffix)] + binary_suffix
+  return os.path.splitext(coordfilename)[0] + '.bin'
+
+#-------------------------------------------------------------------------------
+# Columns of the records out of the header - name -> (first value, number of
+# values) within a record. Empty if it isn't a binary design history.
+#-------------------------------------------------------------------------------
+def get_binary_columns(header):
+
+  if (len(header) < 32) or (header[0:8] != binary_magic): return {}
+  version, headersize, maxpoints, noppoint, ncoord, npolar = struct.unpack_from('=6i', header, 8)
+  if (version != binary_version): return {}
+
+  # groups of the names: values of the design | coordinates | polars
+
+  groups = header[32:headersize].decode(errors='replace').split('|')
+  counts = [1, maxpoints, noppoint]
+
+  columns = {}
+  first = 0
+  for names, count in zip(groups, counts):
+    for name in names.split():
+      columns[name] = (first, count)
+      first += count
+
+  return columns
+
+#-------------------------------------------------------------------------------
+# Table (values x columns) of record k like a zone of the design files -
+# the coordinates only up to npoint
+#-------------------------------------------------------------------------------
+def get_binary_table(columns, names, k):
+
+  table = np.column_stack([columns[name][k] for name in names])
+  if (names[0] == 'x'):
+    table = table[0:int(columns['npoint'][k])]
+  return table
+
+#-------------------------------------------------------------------------------
+# Airfoil out of record k
+#-------------------------------------------------------------------------------
+def get_binary_airfoil(columns, k):
+
+  foil = Airfoil()
+  table = get_binary_table(columns, binary_coordinate_columns, k)
+  foil.setCoordinates(table[:,0], table[:,1])
+  foil.setDerivatives(table[:,2], table[:,3])
+  foil.setGeometryInfo(*[columns[name][k] for name in DesignStore.info_names])
+  table = get_binary_table(columns, binary_polar_columns, k)
+  foil.setPolars(*[table[:,col] for col in range(len(binary_polar_columns))])
+
+  return foil
+
+################################################################################
+# Live channel of Xoptfoil-JX (<prefix>_design_live.bin, write_live_designs)
+#
+#    Xoptfoil publishes each design into a ring of fixed-size slots, which is
+#    mapped into memory here - new designs are taken in the monitor without
+#    parsing text or scanning the design files. The sequence number of a slot
+#    is -1 while it's written and is checked again after the copy. Designs
+#    which already left the ring (or a new run) are read from the design files.
+#
+#    header  'XOPTLIVE', version, slots, max. points, op-points (int32) and
+#            the sequence number of the latest design (int64)
+#    slot    sequence number (int64), design number, npoint (int32), objective,
+#            maxt, xmaxt, maxc, xmaxc, x, z, 2nd and 3rd derivative (max. points
+#            each) and alpha, cl, cd, cm, xtrt, xtrb, flap angle (op-points each)
+################################################################################
+
+live_designs = False            # take new designs from the live channel (--live)
+live_suffix = '_design_live.bin'
+live_magic = b'XOPTLIVE'
+live_version = 1
+live_headersize = 64
+
+class LiveChannel:
+
+  def __init__(self, filename):
+    self.filename = filename
+    self.mm = None
+    self.layout = None              # slots, max. points, op-points of the mapping
+    self.sequence = 0               # sequence number of the latest design taken
+
+  # Maps the file into memory - False if there is no (valid) live channel.
+  # Xoptfoil never shrinks the file, so an old mapping stays readable.
+
+  def open(self):
+
+    self.close()
+    try:
+      with open(self.filename, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (IOError, ValueError):           # ValueError: empty file
+      return False
+
+    layout = self.get_layout(mm)
+    if (layout is None) or (len(mm) < live_headersize + layout[0] * get_live_slotsize(layout)):
+      mm.close()
+      return False
+
+    self.mm = mm
+    self.layout = layout
+    return True
+
+  def close(self):
+    if self.mm is not None: self.mm.close()
+    self.mm = None
+    self.layout = None
+
+  def get_layout(self, mm):
+    if (mm[0:8] != live_magic) or (struct.unpack_from('=i', mm, 8)[0] != live_version):
+      return None
+    return struct.unpack_from('=3i', mm, 12)
+
+  # Designs published since the last call as list of (designnum, objective,
+  # geometry info, coordinates table, polars table)
+  #
+  #    returns None if they aren't all in the ring anymore - or the file was
+  #    created again by a new run - then the design files have to be read
+
+  @timed('read')
+  def read_new(self):
+
+    if (self.mm is None) or (self.get_layout(self.mm) != self.layout):
+      if not self.open(): return None
+
+    nslots, maxpoints, noppoint = self.layout
+    slotsize = get_live_slotsize(self.layout)
+    sequence = struct.unpack_from('=q', self.mm, 24)[0]
+
+    if (sequence < self.sequence) or (sequence - self.sequence > nslots):
+      self.sequence = sequence
+      return None
+
+    designs = []
+    for n in range(self.sequence + 1, sequence + 1):
+      start = live_headersize + ((n - 1) % nslots) * slotsize
+      slot = self.mm[start:start + slotsize]
+
+      # overwritten meanwhile - the optimizer is faster than the monitor
+
+      if ((struct.unpack_from('=q', slot, 0)[0] != n) or
+          (struct.unpack_from('=q', self.mm, start)[0] != n)):
+        self.sequence = sequence
+        return None
+
+      designnum, npoint = struct.unpack_from('=2i', slot, 8)
+      values = np.frombuffer(slot, dtype=float, offset=16)
+      coords = values[5:5 + 4 * maxpoints].reshape(4, maxpoints)[:,0:npoint]
+      polars = values[5 + 4 * maxpoints:].reshape(7, noppoint)
+      designs.append((designnum, values[0], values[1:5], coords.T, polars.T))
+
+    self.sequence = sequence
+    return designs
+
+#-------------------------------------------------------------------------------
+# Bytes of a slot of the live channel
+#-------------------------------------------------------------------------------
+def get_live_slotsize(layout):
+
+  nslots, maxpoints, noppoint = layout
+  return 56 + 8 * (4 * maxpoints + 7 * noppoint)
+
+#-------------------------------------------------------------------------------
+# Adds the designs of the live channel to designfoils
+#
+#    returns False if the design files have to be read - the live channel
+#    isn't available, the monitor missed designs or a new run was started
+#-------------------------------------------------------------------------------
+def read_live_designs(live, designfoils):
+
+  designs = live.read_new()
+  if designs is None: return False
+
+  for designnum, objective, info, coords, polars in designs:
+    if (designnum > 0) and (designnum <= len(designfoils)):
+      continue                              # already read from the files
+    if (designnum != len(designfoils) + 1):
+      return False
+
+    maxt, xmaxt, maxc, xmaxc = info
+    designfoils.append_coordinates(maxt, xmaxt, maxc, xmaxc, coords)
+    designfoils.set_polars(designnum - 1, polars)
+    print("Read design number " + str(designnum) + " from live channel " +
+          "(objective " + str(round(objective, 6)) + ").")
+
+  return True
+
+################################################################################
+#
+# Watches files for changes - with inotify on Linux, else by polling their status
+#
+#    Used in an asyncio loop: wait() returns as soon as one of the files changed
+#
+################################################################################
+
+watch_poll_interval = 0.5       # s between checks of the file status without inotify
+watch_settle_time   = 0.05      # s to collect the further changes of a write burst
+
+class FileWatcher:
+
+  def __init__(self, filenames, patterns=[]):
+    self.filenames = list(filenames)
+    self.patterns = list(patterns)          # also files of the directory like '*.dat'
+    self.directory = os.path.dirname(os.path.abspath(self.filenames[0]))
+    self.status = dict((f, get_file_status(f)) for f in self.get_filenames())
+    self.changed = set()
+    self.inotify = None
+    self.poller = None
+    self.loop = None
+    self.wakeup = None
+
+  # Start watching within the running asyncio loop
+
+  def start(self):
+    self.loop = asyncio.get_event_loop()
+    self.wakeup = asyncio.Event()
+    try:
+      self.inotify = Inotify(self.directory)
+      self.loop.add_reader(self.inotify.fd, self.on_inotify)
+    except (OSError, NotImplementedError):
+      if self.inotify is not None: self.inotify.close()
+      self.inotify = None
+      self.poller = self.loop.create_task(self.poll())
+
+  def stop(self):
+    if self.inotify is not None:
+      self.loop.remove_reader(self.inotify.fd)
+      self.inotify.close()
+      self.inotify = None
+    if self.poller is not None:
+      self.poller.cancel()
+      self.poller = None
+
+  # Watched files - the ones given and the files of the directory matching patterns
+
+  def get_filenames(self):
+    filenames = list(self.filenames)
+    for pattern in self.patterns:
+      filenames.extend(glob.glob(os.path.join(self.directory, pattern)))
+    return filenames
+
+  def on_inotify(self):
+    names = self.inotify.read_names()
+    for filename in self.filenames:
+      if os.path.basename(filename) in names:
+        self.changed.add(filename)
+        self.wakeup.set()
+    for name in names:
+      if any(fnmatch.fnmatch(name, pattern) for pattern in self.patterns):
+        self.changed.add(os.path.join(self.directory, name))
+        self.wakeup.set()
+
+  async def poll(self):
+    while True:
+      await asyncio.sleep(watch_poll_interval)
+      for filename in self.get_filenames():
+        status = get_file_status(filename)
+        if (status != self.status.get(filename)):
+          self.status[filename] = status
+          self.changed.add(filename)
+          self.wakeup.set()
+
+  # Waits until a file changed or timeout (s) - returns the changed files
+
+  async def wait(self, timeout):
+    try:
+      await asyncio.wait_for(self.wakeup.wait(), timeout)
+      await asyncio.sleep(watch_settle_time)
+    except asyncio.TimeoutError:
+      pass
+
+    self.wakeup.clear()
+    changed = self.changed
+    self.changed = set()
+    return changed
+
+#-------------------------------------------------------------------------------
+# Size and modification time of a file - None if it doesn't exist
+#-------------------------------------------------------------------------------
+def get_file_status(filename):
+
+  try:
+    stat = os.stat(filename)
+  except OSError:
+    return None
+  return (stat.st_size, stat.st_mtime)
+
+################################################################################
+# Minimal inotify binding (Linux) watching the files of a directory
+class Inotify:
+
+  IN_MODIFY      = 0x00000002
+  IN_CLOSE_WRITE = 0x00000008
+  IN_MOVED_TO    = 0x00000080
+  IN_CREATE      = 0x00000100
+  IN_DELETE      = 0x00000200
+
+  def __init__(self, directory):
+    if not sys.platform.startswith('linux'):
+      raise OSError("inotify is only available on Linux")
+
+    libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    self.fd = libc.inotify_init1(os.O_NONBLOCK)
+    if (self.fd < 0):
+      raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    mask = (self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE |
+            self.IN_DELETE)
+    if (libc.inotify_add_watch(self.fd, directory.encode(), mask) < 0):
+      os.close(self.fd)
+      raise OSError(ctypes.get_errno(), "inotify_add_watch failed for " + directory)
+
+  # Names of the files with events since the last call
+
+  def read_names(self):
+    try:
+      data = os.read(self.fd, 65536)
+    except BlockingIOError:
+      return set()
+
+    names = set()
+    pos = 0
+    while (pos + 16 <= len(data)):          # struct inotify_event + name
+      wd, mask, cookie, length = struct.unpack_from('iIII', data, pos)
+      names.add(data[pos+16:pos+16+length].rstrip(b'\0').decode(errors='replace'))
+      pos += 16 + length
+    return names
+
+  def close(self):
+    os.close(self.fd)
+
+################################################################################
+# Gets design number from zone title (0: seed airfoil, -1: match airfoil)
+def get_zone_designnum(zonetitle):
+
+  if ('SOLUTIONTIME=' in zonetitle):
+    return int(zonetitle.split("SOLUTIONTIME=")[1])
+  elif zonetitle.startswith('zone t="Match airfoil'):
+    return -1
+  else:
+    return 0
+
+################################################################################
+# Gets the number of data lines of a zone out of its title (I=...) - None for
+# files of older Xoptfoil versions without it
+def get_zone_numlines(zonetitle):
+
+  for item in zonetitle.split('"')[-1].split(','):
+    if item.strip().startswith('I='):
+      return int(item.strip()[2:])
+  return None
+
+################################################################################
+# Decodes the data lines of a zone in one shot into a table (lines x columns)
+#    the number of columns is taken from the first line of the zone
+@timed('parse')
+def decode_zone_data(data):
+
+  ncol = len(data[0:data.find(b'\n')].split())
+  if (ncol == 0): return np.zeros((0, 0))
+
+  values = np.fromstring(data, dtype=float, sep=' ')
+
+  return values.reshape(-1, ncol)
+
+################################################################################
+# Gets maxt, xmaxt, maxc, xmaxc out of the title of a coordinates zone
+@timed('parse')
+def parse_geometry_info(zonetitle):
+
+  maxt = 0.
+  xmaxt = 0.
+  maxc = 0.
+  xmaxc = 0.
+
+  splitline = zonetitle.split(",")
+  if len(splitline) > 2:
+    maxt = float((splitline[1].split("="))[1])
+    xmaxt = float((splitline[2].split("="))[1])
+    maxc = float((splitline[3].split("="))[1])
+    xmaxcline = splitline[4].split('"')[0]
+    xmaxc = float((xmaxcline.split("="))[1])
+
+  return maxt, xmaxt, maxc, xmaxc
+
+################################################################################
+# Creates airfoil out of a zone of the coordinates file
+def parse_coordinates_zone(zonetitle, data):
+
+  foil = Airfoil()
+  maxt, xmaxt, maxc, xmaxc = parse_geometry_info(zonetitle)
+
+  # x, z and - if available - 2nd and 3rd derivative
+
+  table = decode_zone_data(data)
+
+  foil.setCoordinates(table[:,0], table[:,1])
+  foil.setGeometryInfo(maxt, xmaxt, maxc, xmaxc)
+  # jx-mod additionally 2nd and 3rd derivative
+  if (table.shape[1] > 3):
+    foil.setDerivatives(table[:,2], table[:,3])
+
+  return foil
+
+################################################################################
+# Sets polars of airfoil out of a zone of the polars file
+def parse_polars_zone(foil, data):
+
+  # alpha, cl, cd, cm, xtrt, xtrb and - if available - flap angle
+
+  table = decode_zone_data(data)
+
+  foil.setPolars(table[:,0], table[:,1], table[:,2], table[:,3],
+                 table[:,4], table[:,5], table[:,6:7].ravel())
+
+################################################################################
+# Reads the polar zones appended since the last call and hands them over to
+# the airfoils - polars of designs not read yet are kept in the reader
+def read_new_polars(reader, seedfoil, designfoils):
+
+  # The records of the binary design history hold the polars
+
+  if reader.is_binary():
+    designfoils.polarfile = None
+    return reader.binfile.update()
+
+  ioerror = reader.polarfile.update_index()
+
+  # Only the seed polar is parsed now - the designs read their polars when used
+
+  if (seedfoil.npt > 0) and (seedfoil.noper == 0) and reader.has_polars(0):
+    zonetitle, data = reader.polarfile.read_zone(0)
+    parse_polars_zone(seedfoil, data)
+
+  designfoils.polarfile = reader.polarfile
+
+  return ioerror
+
+################################################################################
+# Reads the coordinate zones appended since the last call
+#    (in batches, so the raw text of a long run is never in memory at once)
+
+zone_batch_size = 1000
+
+def read_new_coordinates(reader, seedfoil, designfoils):
+
+  if reader.is_binary():
+    return read_new_binary_designs(reader, seedfoil, designfoils)
+
+  zones, ioerror = reader.coordfile.read_new_zones(zone_batch_size)
+
+  while (len(zones) > 0):
+    for zonetitle, data in zones:
+      designnum = get_zone_designnum(zonetitle)
+
+      # Seed airfoil - also when a new optimization was started in the meantime
+
+      if (designnum == 0):
+        seedfoil = parse_coordinates_zone(zonetitle, data)
+        designfoils = new_design_store(reader)
+      elif (designnum > len(designfoils)):    # not yet taken from the live channel
+        maxt, xmaxt, maxc, xmaxc = parse_geometry_info(zonetitle)
+        designfoils.append_coordinates(maxt, xmaxt, maxc, xmaxc,
+                                       decode_zone_data(data))
+
+    zones, dummy = reader.coordfile.read_new_zones(zone_batch_size)
+
+  return seedfoil, designfoils, ioerror
+
+#-------------------------------------------------------------------------------
+# Reads the records of the binary design history appended since the last call
+# - coordinates and polars at once
+#-------------------------------------------------------------------------------
+def read_new_binary_designs(reader, seedfoil, designfoils):
+
+  binfile = reader.binfile
+  columns, ioerror = binfile.read_new_records(zone_batch_size)
+
+  while columns is not None:
+
+    # Seed airfoil is the first record - also when a new optimization was
+    # started in the meantime
+
+    start = binfile.numread - len(columns['npoint'])
+    if (start == 0):
+      seedfoil = get_binary_airfoil(columns, 0)
+      designfoils = new_design_store(reader)
+
+    # Record k is design number k - only the designs not yet in the store
+    # (e.g. taken from the live channel)
+
+    skip = max(len(designfoils) + 1 - start, 0)
+    designs = dict((name, values[skip:]) for name, values in columns.items())
+    if (len(designs['npoint']) > 0):
+      designfoils.append_designs(designs)
+
+    columns, dummy = binfile.read_new_records(zone_batch_size)
+
+  return seedfoil, designfoils, ioerror
+
+################################################################################
+# Loads airfoil coordinates and polars from files
+def load_airfoils_from_file(coordfilename, polarfilename):
+
+  # Initialize output data - with the designs parsed at the last start
+  # (the cache holds all designs, so it isn't used with bounded memory)
+
+  reader = DesignFileReader(coordfilename, polarfilename)
+
+  # The binary design history is mapped into memory - it needs no cache
+
+  if reader.is_binary():
+    print("Checking for binary design history " + reader.binfile.filename + "...")
+    seedfoil, designfoils, ioerror = read_new_binary_designs(reader, Airfoil(),
+                                                             new_design_store(reader))
+    if (seedfoil.npt == 0):
+      print("Error: seed airfoil not found in " + reader.binfile.filename + ".")
+      return seedfoil, designfoils, reader, 2
+    print("   Found " + str(len(designfoils)) + " airfoils with polars plus seed airfoil.")
+    return seedfoil, designfoils, reader, 0
+
+  if (bounded_designs > 0):
+    seedfoil, designfoils = Airfoil(), new_design_store(reader)
+  else:
+    seedfoil, designfoils = read_design_cache(reader)
+  cachedoffsets = (reader.coordfile.offset, reader.polarfile.offset)
+
+  # Read seed airfoil and designs produced by optimizer (only the ones not cached)
+
+  print("Checking for airfoil coordinates file " + coordfilename + "...")
+
+  seedfoil, designfoils, ioerror = read_new_coordinates(reader, seedfoil,
+                                                        designfoils)
+  if (ioerror == 1):
+    print("Warning: file " + coordfilename + " not found.")
+    return seedfoil, designfoils, reader, ioerror
+  elif (seedfoil.npt == 0):
+    print("Error: zone labeled " + 'zone t="Seed airfoil' + " not found in " +
+          coordfilename + ".")
+    ioerror = 2
+    return seedfoil, designfoils, reader, ioerror
+
+  numfoils = len(designfoils)
+  print("   Found " + str(numfoils) + " airfoil coordinates plus seed airfoil.")
+
+  # Read polars of seed airfoil and designs (note: negative error code means
+  # coordinates were read but not polars)
+
+  print("Checking for airfoil polars file " + polarfilename + "...")
+
+  ioerror = read_new_polars(reader, seedfoil, designfoils)
+  if (ioerror == 1):
+    print("Warning: file " + polarfilename + " not found.")
+    return seedfoil, designfoils, reader, 0 - ioerror
+  elif (seedfoil.noper == 0):
+    ioerror = 2
+    print("Error: zone labeled " + 'zone t="Seed airfoil polar"' + " not found in " +
+          polarfilename + ".")
+    return seedfoil, designfoils, reader, 0 - ioerror
+
+  numpolars = len([designnum for designnum in reader.polarfile.zones
+                   if (designnum > 0) and (designnum <= numfoils)])
+  print("   Found " + str(numpolars) + " airfoil polars plus seed airfoil.")
+  if (numpolars != numfoils):
+    print("Error: number of airfoil coordinates and polars does not match.")
+    ioerror = 3
+    return seedfoil, designfoils, reader, ioerror
+
+  if (((reader.coordfile.offset, reader.polarfile.offset) != cachedoffsets) and
+      (bounded_designs == 0)):
+    write_design_cache(reader, seedfoil, designfoils)
+
+  return seedfoil, designfoils, reader, ioerror
+
+################################################################################
+# Sidecar cache of the parsed designs (<coordinates file>_cache.npz)
+#
+#    Holds the seed airfoil, the DesignStore and the zone index of both files.
+#    It is used as is while size and mtime of the files match. If a file has
+#    grown, its beginning and the end of the cached part must still be the same -
+#    then only the appended zones have to be parsed.
+################################################################################
+
+cache_version = 2
+cache_fingerprint_size = 256            # bytes compared at start and end of cached part
+
+seed_arrays = ['x', 'y', 'deriv2', 'deriv3', 'alpha', 'cl', 'cd', 'cm', 'xtrt', 'xtrb',
+               'glide', 'climb', 'flapangle']
+seed_values = ['maxt', 'xmaxt', 'maxc', 'xmaxc']
+
+def get_cache_filename(coordfilename):
+
+  return os.path.splitext(coordfilename)[0] + '_cache.npz'
+
+#-------------------------------------------------------------------------------
+# Seed airfoil and designs of the cache - the readers continue behind them
+#
+#    returns empty seed airfoil and designs if there is no valid cache
+#-------------------------------------------------------------------------------
+def read_design_cache(reader):
+
+  seedfoil = Airfoil()
+  designfoils = DesignStore()
+
+  try:
+    cache = np.load(get_cache_filename(reader.coordfile.filename), allow_pickle=False)
+  except Exception:
+    return seedfoil, designfoils
+
+  try:
+    with cache:
+      if (int(cache['version']) != cache_version): return seedfoil, designfoils
+
+      for name, zonefile in [('coord', reader.coordfile), ('polar', reader.polarfile)]:
+        if not is_cache_valid(zonefile.filename, cache[name + '_status'],
+                              int(cache[name + '_offset']), cache[name + '_fingerprint']):
+          return seedfoil, designfoils
+
+      for name, zonefile in [('coord', reader.coordfile), ('polar', reader.polarfile)]:
+        zonefile.set_state(dict((key, cache[name + '_' + key]) for key in
+                                ['designnums', 'ranges', 'offset', 'zonelines']))
+
+      for name in seed_arrays:
+        setattr(seedfoil, name, cache['seed_' + name])
+      for name in seed_values:
+        setattr(seedfoil, name, float(cache['seed_' + name]))
+      seedfoil.npt = seedfoil.x.shape[0]
+      seedfoil.noper = seedfoil.alpha.shape[0]
+
+      designfoils.set_arrays(dict((key[7:], cache[key]) for key in cache.files
+                                  if key.startswith('design_')))
+  except Exception:                       # broken cache - parse files again
+    reader.__init__(reader.coordfile.filename, reader.polarfile.filename)
+    return Airfoil(), DesignStore()
+
+  return seedfoil, designfoils
+
+#-------------------------------------------------------------------------------
+# Saves seed airfoil, designs and the state of the readers in the cache
+#-------------------------------------------------------------------------------
+def write_design_cache(reader, seedfoil, designfoils):
+
+  arrays = dict(version=np.int64(cache_version))
+
+  for name, zonefile in [('coord', reader.coordfile), ('polar', reader.polarfile)]:
+    filename = get_data_filename(zonefile.filename)
+    try:
+      status = os.stat(filename)
+    except OSError:
+      return
+    arrays[name + '_status'] = np.array([status.st_size, status.st_mtime_ns], dtype=np.int64)
+    arrays[name + '_fingerprint'] = get_file_fingerprint(filename, zonefile.offset)
+    for key, value in zonefile.get_state().items():
+      arrays[name + '_' + key] = value
+
+  for name in seed_arrays + seed_values:
+    arrays['seed_' + name] = getattr(seedfoil, name)
+  for key, value in designfoils.get_arrays().items():
+    arrays['design_' + key] = value
+
+  # write to a temporary file first, so a reader never sees a partial cache
+
+  cachefilename = get_cache_filename(reader.coordfile.filename)
+  try:
+    with open(cachefilename + '.tmp', 'wb') as f:
+      np.savez(f, **arrays)
+    os.replace(cachefilename + '.tmp', cachefilename)
+  except OSError:
+    print("Warning: cache file " + cachefilename + " could not be written.")
+
+#-------------------------------------------------------------------------------
+# True if the cached part of a file - up to offset - is still the same
+#-------------------------------------------------------------------------------
+def is_cache_valid(filename, cachedstatus, offset, fingerprint):
+
+  filename = get_data_filename(filename)
+  try:
+    status = os.stat(filename)
+  except OSError:
+    return False
+
+  # offsets of a compressed file are in the decompressed data - it must be unchanged
+
+  if ((status.st_size == cachedstatus[0]) and (status.st_mtime_ns == cachedstatus[1])):
+    return True
+  if (status.st_size < offset) or (get_compression(filename) is not None):
+    return False
+
+  return np.array_equal(get_file_fingerprint(filename, offset), fingerprint)
+
+#-------------------------------------------------------------------------------
+# Bytes at the beginning of a file and before offset to recognize it again
+#-------------------------------------------------------------------------------
+def get_file_fingerprint(filename, offset):
+
+  with open(filename, 'rb') as f:
+    head = f.read(min(cache_fingerprint_size, offset))
+    f.seek(max(0, offset - cache_fingerprint_size))
+    tail = f.read(min(cache_fingerprint_size, offset))
+
+  return np.frombuffer(head + tail, dtype=np.uint8)
+
+
+
+
+################################################################################
+# Figure whose artists are created once and afterwards only get new data
+#
+#    The changing (animated) artists are drawn over a cached background of the
+#    static parts of the figure (blitting). The background is taken again on
+#    every full draw of the canvas, e.g. after the window was resized.
+################################################################################
+class BlitFigure:
+
+  def __init__(self, fig, layout):
+    self.fig = fig
+    self.layout = layout            # plot options the artists were created for
+    self.artists = {}
+    self.state = {}                 # values of the full draw needed for updates
+    self.background = None
+    self.cid = fig.canvas.mpl_connect('draw_event', self.on_draw)
+
+  # Registers an artist which will be updated in later frames
+
+  def add(self, name, artist):
+    artist.set_animated(True)
+    self.artists[name] = artist
+    return artist
+
+  def disconnect(self):
+    self.fig.canvas.mpl_disconnect(self.cid)
+
+  def on_draw(self, event):
+    self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+    self.draw_artists()
+
+  def draw_artists(self):
+    for artist in self.artists.values():
+      self.fig.draw_artist(artist)
+
+  # True if the data of the lines is inside the current axes limits
+
+  def lines_within_limits(self, names):
+    for name in names:
+      artist = self.artists[name]
+      x, y = artist.get_data()
+      x = np.asarray(x, dtype=float)
+      y = np.asarray(y, dtype=float)
+      if (np.all(np.isnan(x)) or np.all(np.isnan(y))): continue
+      xlim = sorted(artist.axes.get_xlim())
+      ylim = sorted(artist.axes.get_ylim())
+      if ((np.nanmin(x) < xlim[0]) or (np.nanmax(x) > xlim[1]) or
+          (np.nanmin(y) < ylim[0]) or (np.nanmax(y) > ylim[1])):
+        return False
+    return True
+
+  # Restores the background and draws the artists with their new data
+
+  def update(self):
+    if self.background is None:
+      self.fig.canvas.draw()
+    else:
+      self.fig.canvas.restore_region(self.background)
+      self.draw_artists()
+    with timed_phase('flush'):
+      if self.background is not None: self.fig.canvas.blit(self.fig.bbox)
+      self.fig.canvas.flush_events()
+
+# Figures with reusable artists by window name
+
+blit_figures = {}
+
+################################################################################
+# Returns the BlitFigure of a window if its artists can be reused for this frame
+def get_blit_figure(window_name, layout, firsttime, animation):
+  global plotoptions
+
+  if (firsttime or (not animation) or (not plotoptions["fast_rendering"]) or
+      plotoptions["save_animation_frames"]):
+    return None
+
+  blit = blit_figures.get(window_name)
+  if (blit is None) or (blit.layout != layout): return None
+  if not plt.fignum_exists(window_name): exit()     # User closed the window - stop
+
+  return blit
+
+################################################################################
+# Creates a new BlitFigure for the window (None if artists are not reused)
+def new_blit_figure(window_name, fig, layout, animation):
+  global plotoptions
+
+  if window_name in blit_figures:
+    blit_figures.pop(window_name).disconnect()
+
+  if ((not animation) or (not plotoptions["fast_rendering"]) or
+      plotoptions["save_animation_frames"]):
+    return None
+
+  blit = BlitFigure(fig, layout)
+  blit_figures[window_name] = blit
+  return blit
+
+################################################################################
+# Positions and sizes the window of the current figure
+#
+#    without a window (headless Agg backend) only the figure gets the Qt size
+def place_window(qt_geometry, tk_position, tk_size):
+
+  manager = plt.get_current_fig_manager()
+  if not hasattr(manager, 'window'):
+    fig = plt.gcf()
+    fig.set_size_inches(qt_geometry[2] / fig.dpi, qt_geometry[3] / fig.dpi)
+    return
+
+  try:                            # Qt4Agg
+    manager.window.setGeometry(*qt_geometry)
+  except:                         # TkAgg
+    manager.window.wm_geometry(tk_position)       # position
+    manager.resize(*tk_size)                      # size
+
+################################################################################
+# Registers artist in blit figure - if there is one
+def add_blit_artist(blit, name, artist):
+
+  if blit is not None: blit.add(name, artist)
+  return artist
+
+################################################################################
+# Shows the timings of the last frame in the upper left corner of the window
+# (show_frame_timing) - updates the text if the artists are reused
+def plot_frame_timing(fig, blit, plot):
+  global plotoptions
+
+  if not plotoptions["show_frame_timing"]: return
+
+  text = frame_timer.get_text(plot)
+  if (blit is not None) and ('timing' in blit.artists):
+    blit.artists['timing'].set_text(text)
+    return
+
+  for artist in list(fig.texts):                # text of the previous frame
+    if (artist.get_gid() == 'frame_timing'): artist.remove()
+  add_blit_artist(blit, 'timing',
+                  fig.text(0.005, 0.995, text, gid='frame_timing', color='grey',
+                           verticalalignment='top', horizontalalignment='left',
+                           fontsize='x-small', family='monospace'))
+
+################################################################################
+# Plots airfoil coordinates
+################################################################################
+
+@timed('draw', 'coordinates')
+def plot_airfoil_coordinates(seedfoil, matchfoil, designfoils, plotnum, firsttime=True,
+                             animation=False, prefix=None):
+  global plotoptions
+
+  # Set plot options ------
+
+  plot_2nd_deriv  = True                 # Plot of curvature / 2nd derivative of polyline
+  plot_3rd_deriv  = False                # Plot of 3nd derivative of polyline
+  plot_delta_y    = True                 # Plot delta of y ("z") value between current and seed
+  plot_matchfoil  = True                 # Plot the matchfoil and the delta from current to match
+  plot_seedfoil   =     plotoptions["show_seed_airfoil_only"] or plotoptions["show_seed_airfoil"]
+  plot_foil       = not plotoptions["show_seed_airfoil_only"]
+
+  show_info       = plotoptions["show_airfoil_info"]
+  show_transition = True                 # show transition points
+
+  sc = plotoptions["color_for_seed"]
+  nc = plotoptions["color_for_new_designs"]
+
+  # --- end plot options
+
+  # Sanity check of plot options
+
+  if (plotnum > 0): foil = designfoils[plotnum-1]
+
+  plot_foil      = plot_foil and (plotnum > 0)
+  if not (plot_seedfoil or plot_foil): return
+
+  plot_2nd_deriv  = plot_2nd_deriv  and (len(seedfoil.deriv2) > 0)
+  plot_3rd_deriv  = plot_3rd_deriv  and (len(seedfoil.deriv3) > 0)
+  plot_3rd_deriv  = plot_3rd_deriv  and (not plot_2nd_deriv)
+  plot_matchfoil  = plot_matchfoil and (matchfoil.npt > 0)
+  plot_delta_y    = plot_foil and plot_delta_y and plot_seedfoil and (not plot_matchfoil)
+  plot_delta_y    = plot_delta_y and (np.array_equal(seedfoil.x, foil.x))
+  show_transition = plot_foil and show_transition and (len(foil.xtrt > 0))
+
+  window_name = "Geometry  " + str(prefix)
+
+  # Reuse artists of the previous frame - only new data for the design
+
+  layout = (plot_seedfoil, plot_foil, plot_2nd_deriv, plot_3rd_deriv, plot_delta_y,
+            plot_matchfoil, show_info, show_transition, len(foil.xtrt) if show_transition else 0)
+  blit = get_blit_figure(window_name, layout, firsttime, animation)
+  if blit is not None:
+    if update_airfoil_coordinates(blit, seedfoil, matchfoil, foil, plotnum):
+      return
+
+  # Set up coordinates plot, create figure and axes
+
+  if firsttime:
+    plt.close(window_name)
+    cfig = plt.figure(num= window_name)
+    if plot_matchfoil:                # in this case bigger window
+      place_window ((600,400,1300,550), "+600+400", (1300, 550))
+    else:
+      place_window ((850,630,1000,400), "+850+650", (1000, 350))
+    ax = plt.subplot(111)
+    mirrorax = ax.twinx()
+  else:
+    cfig = plt.figure(num= window_name)
+    if (len(cfig.get_axes()) > 0):
+      ax = cfig.get_axes()[0]
+    else:                                       # Window closed by user?
+      exit()
+
+    mirrorax = ax.get_shared_x_axes().get_siblings(ax)[0]
+    ax.clear()
+    mirrorax.clear()
+
+  blit = new_blit_figure(window_name, cfig, layout, animation)
+
+  # Auto plotting bounds
+
+  foils = []
+  if plot_seedfoil: foils.append(seedfoil)
+  if plot_foil:     foils.append(foil)
+  xmin, xmax = get_common_bounds(foils, 'x')
+  ymin, ymax = get_common_bounds(foils, 'y')
+
+  xrng = xmax - xmin
+  xmax= xmax + 0.05*xrng
+  xmin= xmin - 0.05*xrng
+  yrng = ymax - ymin
+  ymax= ymax + 0.05*yrng
+  ymin= ymin - 0.05*yrng
+  ax.set_aspect('equal', 'datalim')
+  ax.set_xlabel('x')
+  ax.set_ylabel('y')
+  ax.set_xlim([xmin,xmax])
+
+  # Plot airfoil coordinates
+
+  if plot_seedfoil:
+    ax.plot(seedfoil.x, seedfoil.y, color=sc, linewidth=0.8)
+  if plot_foil:
+    add_blit_artist(blit, 'foil', ax.plot(foil.x, foil.y, color=nc)[0])
+
+  # Plot specials like delta or derivatives
+
+  if plot_2nd_deriv:
+    ax.set_ylim([-ymax,ymax])       # achieve ax.plot and mirrorax.plot is aligned in x-axis
+    mirrorax.set_ylabel('curvature', color='grey')
+    mirrorax.set_ylim(0.8, -0.8)
+    mirrorax.grid (axis='y')
+    if plot_seedfoil:
+      mirrorax.plot(seedfoil.x,  seedfoil.deriv2,  color='blue', linewidth=0.5, linestyle='--') #top
+    if plot_foil:
+      add_blit_artist(blit, 'deriv2',
+                      mirrorax.plot(foil.x, foil.deriv2, color='red', linewidth=0.8, linestyle='--')[0])
+
+  if plot_3rd_deriv:
+    ax.set_ylim([-ymax,ymax])       # achieve ax.plot and mirrorax.plot is aligned in x-axis
+    mirrorax.set_ylabel('3rd derivative', color='magenta')
+    mirrorax.set_ylim(-8, 8)
+    mirrorax.grid (axis='y')
+    if plot_seedfoil:
+      mirrorax.plot(seedfoil.x,  seedfoil.deriv3,  color='grey', linewidth=0.8, linestyle=':')
+    if plot_foil:
+      add_blit_artist(blit, 'deriv3',
+                      mirrorax.plot(foil.x, foil.deriv3,  color='magenta', linewidth=0.8, linestyle='--')[0])
+
+  # Plot delta between seed and current airfoil
+  if plot_delta_y:
+    add_blit_artist(blit, 'delta_seed',
+                    ax.plot(foil.x, foil.get_delta_y(seedfoil, 5), color='green', linewidth=0.8, linestyle=':')[0])
+    ax.axhline(0, color='grey', linewidth=0.5)
+
+  # Plot matchfoil an delta to match foil from Xoptfoil match_foils mode
+  if plot_matchfoil:
+    # ax.plot(matchfoil.x, matchfoil.y, color='green', linewidth=0.8)
+    add_blit_artist(blit, 'delta_match',
+                    ax.plot(foil.x, foil.get_delta_y(matchfoil, 10), color='green', linewidth=0.8, linestyle='-.')[0])
+    ax.axhline(0, color='grey', linewidth=0.5)
+
+  # show points of transition for the operating points
+  if show_transition:
+    top, bottom = foil.get_transition_points(np.argmin(seedfoil.x))
+    plot_points_of_transition (ax, top[0], top[1], upperside = True, blit = blit)
+    plot_points_of_transition (ax, bottom[0], bottom[1], upperside = False, blit = blit)
+
+  # Display geometry info
+
+  if show_info:
+    if plot_seedfoil:
+      mytext = ("Thickness: " + str(seedfoil.maxt) + '\n' +
+                "   at x/c: " + str(seedfoil.xmaxt) + '\n' +
+                "Camber: " + str(seedfoil.maxc) + '\n' +
+                "   at x/c: " + str(seedfoil.xmaxc))
+      ax.text(0.02, 0.02, mytext, color=sc, verticalalignment='bottom', horizontalalignment='left',
+              transform=ax.transAxes, fontsize='small')
+    if plot_foil:
+      add_blit_artist(blit, 'info',
+                      ax.text(0.98, 0.02, get_geometry_info_text(foil), color=nc,
+                              verticalalignment='bottom', horizontalalignment='right',
+                              transform=ax.transAxes, fontsize='small'))
+
+  # Legend for coordinates plot
+
+  lines = []
+  if plot_seedfoil:   lines.append(plt.Line2D((0,1),(0,0), color=sc,
+                                  label="Seed airfoil"))
+  # if plot_matchfoil:  lines.append(plt.Line2D((0,1),(0,0), color='green', linewidth=0.8,
+  #                                label="Match airfoil"))
+  if plot_foil:       lines.append(plt.Line2D((0,1),(0,0), color=nc,
+                                  label="Design number " + str(plotnum)))
+  if plot_delta_y:    lines.append(plt.Line2D((0,1),(0,0), color='green', linewidth=0.8, linestyle=':',
+                                  label="   delta y *5 "))
+  if plot_matchfoil:  lines.append(plt.Line2D((0,1),(0,0), color='green', linewidth=0.8, linestyle='-.',
+                                  label="   delta y to match *10 "))
+  if plot_2nd_deriv:  lines.append(plt.Line2D((0,1),(0,0), color=nc, linewidth=0.8, linestyle='--',
+                                  label="   curvature"))
+  if plot_3rd_deriv:  lines.append(plt.Line2D((0,1),(0,0), color='magenta', linewidth=0.8, linestyle='--',
+                                  label="   3rd derivative"))
+
+  # Create legend
+
+  labels = [l.get_label() for l in lines]
+  legend = ax.legend(lines, labels, loc="upper right", numpoints=1)
+  if plot_foil:
+    add_blit_artist(blit, 'legend', legend)
+    if blit is not None:
+      blit.state['legend_text'] = legend.get_texts()[labels.index("Design number " + str(plotnum))]
+
+  # Update plot for animation only (for others, plt.show() must be called
+  # separately)
+
+  if animation:
+    if (firsttime): cfig.show()
+
+    # Save animation frames if requested
+
+    if plotoptions["save_animation_frames"]:
+      if (prefix == None):
+        print("Error: no file prefix specified - cannot save animation frames.")
+      else:
+        imagefname = prefix + '_coordinates.png'
+        print("Saving image frame to file " + imagefname + ' ...')
+        plt.savefig(imagefname)
+
+  plot_frame_timing(cfig, blit, 'coordinates')
+  cfig.canvas.draw()
+
+#---------------------------------------------------------------------------------------
+# Update the artists of the airfoil coordinates plot with a new design
+#
+#    returns False if the design doesn't fit into the current axes limits
+#---------------------------------------------------------------------------------------
+def update_airfoil_coordinates (blit, seedfoil, matchfoil, foil, plotnum):
+
+  artists = blit.artists
+
+  if 'foil' not in artists: return True        # only seed airfoil - nothing changes
+
+  artists['foil'].set_data(foil.x, foil.y)
+  if not blit.lines_within_limits(['foil']): return False
+
+  if 'deriv2' in artists:
+    artists['deriv2'].set_data(foil.x, foil.deriv2)
+  if 'deriv3' in artists:
+    artists['deriv3'].set_data(foil.x, foil.deriv3)
+  if 'delta_seed' in artists:
+    artists['delta_seed'].set_data(foil.x, foil.get_delta_y(seedfoil, 5))
+  if 'delta_match' in artists:
+    artists['delta_match'].set_data(foil.x, foil.get_delta_y(matchfoil, 10))
+
+  if 'transition_top' in artists:
+    top, bottom = foil.get_transition_points(np.argmin(seedfoil.x))
+    update_points_of_transition (blit, top[0], top[1], upperside = True)
+    update_points_of_transition (blit, bottom[0], bottom[1], upperside = False)
+  if 'info' in artists:
+    artists['info'].set_text(get_geometry_info_text(foil))
+  if 'legend_text' in blit.state:
+    blit.state['legend_text'].set_text("Design number " + str(plotnum))
+  plot_frame_timing(blit.fig, blit, 'coordinates')
+
+  blit.update()
+
+  return True
+
+#---------------------------------------------------------------------------------------
+# Text with geometry info of airfoil
+#---------------------------------------------------------------------------------------
+def get_geometry_info_text (foil):
+
+  return ("Thickness: " + str(foil.maxt) + '\n' +
+          "   at x/c: " + str(foil.xmaxt) + '\n' +
+          "Camber: " + str(foil.maxc) + '\n' +
+          "   at x/c: " + str(foil.xmaxc))
+
+#---------------------------------------------------------------------------------------
+# Plot points of transition x,y numbered by operating point
+#---------------------------------------------------------------------------------------
+def plot_points_of_transition (axes, x, y, upperside = True, blit = None):
+
+  if upperside:
+    my_marker = 7
+    y_text = 7
+    side = 'top'
+  else:
+    my_marker = 6
+    y_text = -13
+    side = 'bottom'
+
+  add_blit_artist(blit, 'transition_' + side,
+                  axes.plot(x, y, marker=my_marker, markersize=7,
+                            linestyle='None', color="grey")[0])
+  for i in range(len(x)):
+    add_blit_artist(blit, 'transition_' + side + '_' + str(i),
+                    axes.annotate(('{:d}'.format(i+1)), xy = (x[i], y[i]),
+                                  xytext = (-3,y_text), textcoords="offset points", fontsize = 8,
+                                  color='dimgrey'))
+
+#---------------------------------------------------------------------------------------
+# Update points of transition x,y of the blit figure
+#---------------------------------------------------------------------------------------
+def update_points_of_transition (blit, x, y, upperside = True):
+
+  if upperside:
+    side = 'top'
+  else:
+    side = 'bottom'
+
+  blit.artists['transition_' + side].set_data(x, y)
+  for i in range(len(x)):
+    blit.artists['transition_' + side + '_' + str(i)].xy = (x[i], y[i])
+
+#---------------------------------------------------------------------------------------
+# Index of the points of polyline x which are closest to the values xtrs
+#---------------------------------------------------------------------------------------
+def get_nearest_points (x, xtrs):
+
+  return np.argmin(np.abs(x[np.newaxis,:] - np.asarray(xtrs)[:,np.newaxis]), axis=1)
+
+#---------------------------------------------------------------------------------------
+# Minimum and maximum of values name (e.g. 'x', 'cl') of all foils
+#---------------------------------------------------------------------------------------
+def get_common_bounds (foils, name):
+
+  bounds = [foil.get_bounds(name) for foil in foils]
+  return min([b[0] for b in bounds]), max([b[1] for b in bounds])
+
+
+
+
+################################################################################
+# Plots polars
+################################################################################
+
+@timed('draw', 'polars')
+def plot_polars(seedfoil, designfoils, plotnum, firsttime=True, animation=False,
+                prefix=None):
+
+  global plotoptions
+
+  # Set plot options ------
+
+  plot_polar       = True                 # Plot polar of current
+  plot_seed_polar  = plotoptions["show_seed_polar_only"] or plotoptions["show_seed_polar"]
+  plot_vs_lift     = plotoptions["drag_plot_type"] == "vs. lift"
+
+  show_flap_angle  = True                 # show flap angle if available
+  show_cd_value    = True                 # show cd value at operating point
+
+  sc = plotoptions["color_for_seed"]
+  nc = plotoptions["color_for_new_designs"]
+
+  # --- end plot options
+
+  # Sanity check of plot options
+
+  if (len(seedfoil.alpha) == 0):  plot_seed_polar   = False
+
+  # foil and prev_foil are also passed to update_polars if only the seed polar
+  # is shown - it returns before using them
+
+  foil = None
+  prev_foil = None
+  if (plotnum > 0):
+    foil = designfoils[plotnum-1]
+    if (len(foil.alpha) == 0):
+      plot_polar   = False
+    else:
+      if (plotnum == 1):
+        prev_foil = seedfoil
+      else:
+        prev_foil = designfoils[plotnum-2]
+  else:
+    plot_polar   = False
+
+  if not (plot_seed_polar or plot_polar): return
+
+  window_name = "Polars  " + str(prefix)
+
+  # Reuse artists of the previous frame - only new data for the design
+
+  layout = (plot_seed_polar, plot_polar, plot_vs_lift, show_flap_angle, show_cd_value,
+            foil.noper if plot_polar else 0)
+  blit = get_blit_figure(window_name, layout, firsttime, animation)
+  if blit is not None:
+    if update_polars(blit, prev_foil, foil, plotnum, plot_vs_lift): return
+
+  # Set up polars plot.
+
+  if firsttime:
+    plt.close(window_name)
+    pfig, dummy = plt.subplots(2, 3, num= window_name)
+    pfig.subplots_adjust(hspace=0.3, wspace=0.3)
+    pfig.set_size_inches(11, 8, forward=True)
+    place_window ((100,30,1300,550), "+150+30", (1230, 580))
+  else:
+    pfig = plt.figure(num= window_name)
+    if (len(pfig.get_axes()) == 0): exit()     # User closed the window - stop
+    pfig.clear()
+    pfig.subplots (2,3)
+
+  axarr = pfig.get_axes()
+  blit = new_blit_figure(window_name, pfig, layout, animation)
+
+  # Auto plotting bounds
+
+  foils = []
+  if plot_seed_polar: foils.append(seedfoil)
+  if plot_polar:      foils.append(foil)
+  almin, almax       = get_common_bounds(foils, 'alpha')
+  clmin, clmax       = get_common_bounds(foils, 'cl')
+  cdmin, cdmax       = get_common_bounds(foils, 'cd')
+  cmmin, cmmax       = get_common_bounds(foils, 'cm')
+  xtrmin, xtrmax     = get_common_bounds(foils, 'xtr')
+  # jx-mod
+  glidemin, glidemax = get_common_bounds(foils, 'glide')
+  climbmin, climbmax = get_common_bounds(foils, 'climb')
+
+  alrng = almax - almin
+  almax = almax + 0.1*alrng
+  almin = almin - 0.1*alrng
+  cdrng = cdmax - cdmin
+  cdmax = cdmax + 0.1*cdrng
+  cdmin = cdmin - 0.1*cdrng
+  clrng = clmax - clmin
+  clmax = clmax + 0.1*clrng
+  clmin = clmin - 0.1*clrng
+  cmrng = cmmax - cmmin
+  cmmax = cmmax + 0.1*cmrng
+  cmmin = cmmin - 0.1*cmrng
+  xtrrng = xtrmax - xtrmin
+  xtrmax = xtrmax + 0.1*xtrrng
+  xtrmin = xtrmin - 0.1*xtrrng
+  # jx-mod
+  gliderng = glidemax - glidemin
+  glidemax = glidemax + 0.1*gliderng
+  glidemin = glidemin - 0.1*gliderng
+  if (glidemin < 0.0):
+    glidemin = 0.0
+  climbrng = climbmax - climbmin
+  climbmax = climbmax + 0.1*climbrng
+  climbmin = climbmin - 0.1*climbrng
+  if (climbmin < 0.0):
+    climbmin = 0.0
+  glideclmin = clmin
+  if (glideclmin < 0.0):
+    glideclmin = 0.0
+
+
+  # Plot polars
+
+  if plot_vs_lift:
+    if plot_seed_polar: seed_x_values = seedfoil.cl
+    if plot_polar:      foil_x_values = foil.cl
+    x_label = 'Lift coefficient'
+  else:
+    if plot_seed_polar: seed_x_values = seedfoil.alpha
+    if plot_polar:      foil_x_values = foil.alpha
+    x_label = 'Angle of attack'
+
+  if plot_seed_polar :
+    plot_single_polar (axarr[0], seedfoil.alpha, seedfoil.alpha, seedfoil.cl, '-', sc, 'o')
+    plot_single_polar (axarr[1], seedfoil.alpha, seedfoil.cd, seedfoil.cl, '-', sc, 'o')
+    plot_single_polar (axarr[3], seedfoil.alpha, seedfoil.alpha, seedfoil.cm, '-', sc, 'o')
+    plot_single_polar (axarr[4], seedfoil.alpha, seedfoil.xtrt, seedfoil.alpha, '-', sc, 'o')
+    plot_single_polar (axarr[4], seedfoil.alpha, seedfoil.xtrb, seedfoil.alpha, '--', sc, 'o')
+    plot_single_polar (axarr[2], seedfoil.alpha, seed_x_values, seedfoil.glide, '-', sc, 'o')
+    plot_single_polar (axarr[5], seedfoil.alpha, seed_x_values, seedfoil.climb, '-', sc, 'o')
+
+  if plot_polar:
+    for name, ax_index, x, y, linestyle in get_polar_lines(foil, foil_x_values):
+      add_blit_artist(blit, name,
+                      plot_single_polar (axarr[ax_index], foil.alpha, x, y, linestyle, nc, 's'))
+
+    for name, ax_index, prev_x, prev_y, x, y, change_dir in get_polar_changes(prev_foil, foil,
+                                                                               foil_x_values):
+      annotate_changes (axarr[ax_index], prev_x, prev_y, x, y, change_dir, blit, name)
+
+    # show cd-value or flap anglein graph
+
+    flap_x = cdmax - 0.29*cdrng
+    for i in range(len(foil.cl)):
+      if ((len(foil.flapangle) > 0) and (foil.flapangle[i] != 0) and show_flap_angle):
+        flaptext = 'f {:5.2f}'.format(foil.flapangle[i])
+        cdtext = ''
+      elif (show_cd_value):
+        flaptext = ''
+        cdtext = '{:5.5f}'.format(foil.cd[i])
+      else:
+        flaptext = ''
+        cdtext = ''
+      if (flaptext != '') or (blit is not None):
+        add_blit_artist(blit, 'flap_' + str(i),
+                        axarr[1].annotate(flaptext, (flap_x, foil.cl[i]),
+                                          fontsize = 8,color='dimgrey'))
+      if (cdtext != '') or (blit is not None):
+        add_blit_artist(blit, 'cdvalue_' + str(i),
+                        axarr[1].annotate(cdtext, (foil.cd[i], foil.cl[i]),
+                                          xytext = (12,-3), textcoords="offset points", fontsize = 8,
+                                          color='dimgrey'))
+    if blit is not None:
+      blit.state['flap_x'] = flap_x
+      blit.state['show_flap_angle'] = show_flap_angle
+      blit.state['show_cd_value'] = show_cd_value
+
+  # set axis
+
+  axarr[0].set_xlabel('Angle of attack')
+  axarr[0].set_ylabel('Lift coefficient')
+  axarr[0].set_xlim([almin,almax])
+  axarr[0].set_ylim([clmin,clmax])
+  axarr[0].grid(True)
+
+  axarr[1].set_xlabel('Drag coefficient')
+  axarr[1].set_ylabel('Lift coefficient')
+  axarr[1].set_xlim([cdmin,cdmax])
+  axarr[1].set_ylim([clmin,clmax])
+  axarr[1].grid(True)
+
+  axarr[3].set_xlabel('Angle of attack')
+  axarr[3].set_ylabel('Pitching moment coefficient')
+  axarr[3].set_xlim([almin,almax])
+  axarr[3].set_ylim([cmmin,cmmax])
+  axarr[3].grid(True)
+
+  axarr[4].set_xlabel('Transition x/c\n(top: solid, bottom: dashed)')
+  axarr[4].set_ylabel('Angle of attack')
+  axarr[4].set_xlim([xtrmin,xtrmax])
+  axarr[4].set_ylim([almin,almax])
+  axarr[4].grid(True)
+
+  axarr[2].set_xlabel(x_label)
+  axarr[2].set_ylabel('Glide ratio')
+  axarr[2].set_ylim([glidemin,glidemax])
+  axarr[2].grid(True)
+
+  axarr[5].set_xlabel(x_label)
+  axarr[5].set_ylabel('Climb ratio')
+  axarr[5].set_ylim([climbmin,climbmax])
+  axarr[5].grid(True)
+
+  if plot_vs_lift:
+    axarr[2].set_xlim([glideclmin,clmax])
+    axarr[5].set_xlim([glideclmin,clmax])
+  else:
+    axarr[2].set_xlim([almin,almax])
+    axarr[5].set_xlim([almin,almax])
+
+  # Draw legend
+
+  lines = []
+
+  if plot_seed_polar:
+    fakeline = plt.Line2D((0,1),(0,0), linestyle='-', color=sc, marker='o', label="Seed airfoil")
+    lines.append(fakeline)
+
+  if plot_polar:
+    fakeline = plt.Line2D((0,1),(0,0), linestyle='-', color=nc, marker='s', label="Design number " + str(plotnum))
+    lines.append(fakeline)
+
+  bbox_loc = (0.5, 1.00)
+  labels = [l.get_label() for l in lines]
+  legend = pfig.legend(lines, labels, loc="upper center",
+                       bbox_to_anchor=bbox_loc, numpoints=1)
+  if plot_polar:
+    add_blit_artist(blit, 'legend', legend)
+    if blit is not None:
+      blit.state['legend_text'] = legend.get_texts()[labels.index("Design number " + str(plotnum))]
+
+  # Update plot for animation only (for others, plt.show() must be called separately)
+
+  if animation:
+    if (firsttime): pfig.show()
+
+    # Save animation frames if requested
+
+    if plotoptions["save_animation_frames"]:
+      if (prefix == None):
+        print("Error: no file prefix specified - cannot save animation frames.")
+      else:
+        imagefname = prefix + '_polars.png'
+        print("Saving image frame to file " + imagefname + ' ...')
+        plt.savefig(imagefname)
+
+  plot_frame_timing(pfig, blit, 'polars')
+  pfig.canvas.draw()
+
+  return
+
+#---------------------------------------------------------------------------------------
+# Update the artists of the polars plot with a new design
+#
+#    returns False if the polars don't fit into the current axes limits
+#---------------------------------------------------------------------------------------
+def update_polars (blit, prev_foil, foil, plotnum, plot_vs_lift):
+
+  artists = blit.artists
+  if 'cl' not in artists: return True        # only seed polar - nothing changes
+
+  if plot_vs_lift:
+    foil_x_values = foil.cl
+  else:
+    foil_x_values = foil.alpha
+
+  for name, ax_index, x, y, linestyle in get_polar_lines(foil, foil_x_values):
+    artists[name].set_data(*get_polar_segments(foil.alpha, x, y))
+
+  # glide and climb ratio axes are cut at 0 - only the maximum has to fit
+
+  if not blit.lines_within_limits(['cl', 'cd', 'cm', 'xtrt', 'xtrb']): return False
+  for name in ['glide', 'climb']:
+    if (np.max(getattr(foil, name)) > max(artists[name].axes.get_ylim())): return False
+
+  for name, ax_index, prev_x, prev_y, x, y, change_dir in get_polar_changes(prev_foil, foil,
+                                                                             foil_x_values):
+    update_changes (blit, name, prev_x, prev_y, x, y, change_dir)
+
+  for i in range(len(foil.cl)):
+    flaptext = ''
+    cdtext = ''
+    if ((len(foil.flapangle) > 0) and (foil.flapangle[i] != 0) and blit.state['show_flap_angle']):
+      flaptext = 'f {:5.2f}'.format(foil.flapangle[i])
+    elif blit.state['show_cd_value']:
+      cdtext = '{:5.5f}'.format(foil.cd[i])
+    artists['flap_' + str(i)].set_text(flaptext)
+    artists['flap_' + str(i)].xy = (blit.state['flap_x'], foil.cl[i])
+    artists['cdvalue_' + str(i)].set_text(cdtext)
+    artists['cdvalue_' + str(i)].xy = (foil.cd[i], foil.cl[i])
+
+  blit.state['legend_text'].set_text("Design number " + str(plotnum))
+  plot_frame_timing(blit.fig, blit, 'polars')
+
+  blit.update()
+
+  return True
+
+#---------------------------------------------------------------------------------------
+# Lines of the design polar as (name, axes index, x, y, linestyle)
+#---------------------------------------------------------------------------------------
+def get_polar_lines (foil, foil_x_values):
+
+  return [('cl',    0, foil.alpha,    foil.cl,    '-'),
+          ('cd',    1, foil.cd,       foil.cl,    '-'),
+          ('cm',    3, foil.alpha,    foil.cm,    '-'),
+          ('xtrt',  4, foil.xtrt,     foil.alpha, '-'),
+          ('xtrb',  4, foil.xtrb,     foil.alpha, '--'),
+          ('glide', 2, foil_x_values, foil.glide, '-'),
+          ('climb', 5, foil_x_values, foil.climb, '-')]
+
+#---------------------------------------------------------------------------------------
+# Changes to previous design to annotate as (name, axes index, prev_x, prev_y, x, y, dir)
+#---------------------------------------------------------------------------------------
+def get_polar_changes (prev_foil, foil, foil_x_values):
+
+  return [('change_cl',    0, prev_foil.alpha, prev_foil.cl,    foil.alpha,    foil.cl,    "y"),
+          ('change_cd',    1, prev_foil.cd,    prev_foil.cl,    foil.cd,       foil.cl,    "x"),
+          ('change_glide', 2, foil_x_values,   prev_foil.glide, foil_x_values, foil.glide, "y"),
+          ('change_cm',    3, prev_foil.alpha, prev_foil.cm,    foil.alpha,    foil.cm,    "y"),
+          ('change_xtrt',  4, prev_foil.xtrt,  prev_foil.alpha, foil.xtrt,     foil.alpha, "x"),
+          ('change_xtrb',  4, prev_foil.xtrb,  prev_foil.alpha, foil.xtrb,     foil.alpha, "x"),
+          ('change_climb', 5, foil_x_values,   prev_foil.climb, foil_x_values, foil.climb, "y")]
+
+#---------------------------------------------------------------------------------------
+# Plots a single polar
+#
+#    tries to draw separate curves if the op_points do not belong to single "polar"
+#    so there will be no zick-zack on the screen 
+#
+#---------------------------------------------------------------------------------------
+def plot_single_polar (axes, alpha, x, y, my_linestyle, my_color, my_marker):
+
+  x, y = get_polar_segments (alpha, x, y)
+
+  return axes.plot(x, y, linestyle=my_linestyle, color=my_color,
+                   marker=my_marker, linewidth=0.8)[0]
+
+#---------------------------------------------------------------------------------------
+# Splits polyline x,y into separate curves where alpha decreases
+#
+#    the curves are separated by NaN, so they can be drawn as a single line
+#---------------------------------------------------------------------------------------
+def get_polar_segments (alpha, x, y):
+
+  new_curve = np.nonzero(np.diff(alpha) < 0)[0] + 1
+
+  return (np.insert(np.asarray(x, dtype=float), new_curve, np.nan),
+          np.insert(np.asarray(y, dtype=float), new_curve, np.nan))
+
+#---------------------------------------------------------------------------------------
+# Annotate marker depending value increased or decreased
+#
+#    change_dir == "x""  watch the x- value - else watch the y_value for changes
+#
+#---------------------------------------------------------------------------------------
+def annotate_changes (axes, prev_x, prev_y, x, y, change_dir, blit = None, name = None):
+
+  markers = get_change_markers (prev_x, prev_y, x, y, change_dir)
+
+  for i in range(len(x)):
+    text, offset = markers[i]
+    if (text != '') or (blit is not None):  # blit figure needs an artist for every point
+      add_blit_artist(blit, name + '_' + str(i),
+                      axes.annotate(text, xy = (x[i], y[i]),
+                          xytext = offset, textcoords="offset points", fontsize = 8, color='dimgrey'))
+
+#---------------------------------------------------------------------------------------
+# Update change markers of the blit figure
+#---------------------------------------------------------------------------------------
+def update_changes (blit, name, prev_x, prev_y, x, y, change_dir):
+
+  markers = get_change_markers (prev_x, prev_y, x, y, change_dir)
+
+  for i in range(len(x)):
+    text, offset = markers[i]
+    annotation = blit.artists[name + '_' + str(i)]
+    annotation.set_text(text)
+    annotation.xy = (x[i], y[i])
+    annotation.xyann = offset
+
+#---------------------------------------------------------------------------------------
+# Marker text and offset for each point depending value increased or decreased
+#---------------------------------------------------------------------------------------
+def get_change_markers (prev_x, prev_y, x, y, change_dir):
+
+  markers = []
+
+  for i in range(len(x)):
+
+    if   (change_dir == "x") and (prev_x[i] != 0):
+      rel_improv = (x[i] - prev_x[i]) / prev_x[i]
+    elif (change_dir == "y") and (prev_y[i] != 0):
+      rel_improv = (y[i] - prev_y[i]) / prev_y[i]
+    else:
+      rel_improv = 0
+
+    if (abs(rel_improv) <= 1e-4):           # show annotation only if delta > epsilon
+      markers.append(('', (0,0)))
+    elif (change_dir == "x"):
+      if (rel_improv > 0.0):
+        markers.append(('>', (5,-2)))
+      else:
+        markers.append(('<', (-12,-2)))
+    else:
+      if (rel_improv > 0.0):
+        markers.append(('^', (-3,3)))
+      else:
+        markers.append(('v', (-2,-10)))
+
+  return markers
+
+
+
+################################################################################
+# Downsampling of the history to the pixel width of the axes
+#
+#    Largest-Triangle-Three-Buckets: of each bucket of steps the point spanning
+#    the largest triangle with the point kept before and the mean of the next
+#    bucket is kept. A bucket holds a power of 2 steps, so the buckets done stay
+#    valid when new steps arrive - they are sampled again only when the number
+#    of steps has doubled. Steps where the value changes (improvements of the
+#    objective function) can be kept in addition, so they are shown exactly.
+################################################################################
+class HistorySampler:
+
+  def __init__(self, numbuckets, logscale=False, keep_changes=False):
+    self.numbuckets = numbuckets
+    self.logscale = logscale        # triangles in log10 of the values
+    self.keep_changes = keep_changes
+    self.clear()
+
+  def clear(self):
+    self.width = 1                  # steps per bucket
+    self.first = None               # first step - to detect a new history
+    self.numpoints = 0
+    self.indices = GrowableArray(dtype=int)     # kept point of each bucket done
+    self.changes = GrowableArray(dtype=int)     # steps where the value changed
+
+  # Indices of the points to plot
+
+  @timed('derive')
+  def get_indices(self, x, y):
+
+    n = len(x)
+    numbuckets = max(self.numbuckets, 8)
+
+    width = self.width
+    while ((n - 2) > width * numbuckets): width = 2 * width
+
+    if ((width != self.width) or (n < self.numpoints) or
+        ((n > 0) and (x[0] != self.first))):
+      self.clear()
+      self.width = width
+      self.first = x[0] if (n > 0) else None
+
+    # Changes of the value since the last call
+
+    if self.keep_changes and (n > 1):
+      start = max(self.numpoints - 1, 0)
+      self.changes.extend(np.nonzero(np.diff(y[start:n]))[0] + start + 1)
+    self.numpoints = n
+
+    if (width == 1): return np.arange(n)
+
+    # Buckets are done when the next bucket is complete - the last point is
+    # always kept
+
+    numdone = self.indices.size
+    while (1 + (numdone + 2) * width <= n - 1):
+      start = 1 + numdone * width
+      if (numdone == 0): prev = 0
+      else: prev = self.indices.data[-1]
+
+      bx = np.asarray(x[start:start+width], dtype=float)
+      by = self.get_values(y[start:start+width])
+      nx = np.mean(np.asarray(x[start+width:start+2*width], dtype=float))
+      ny = np.mean(self.get_values(y[start+width:start+2*width]))
+      px = float(x[prev])
+      py = self.get_values(y[prev:prev+1])[0]
+
+      area = np.abs((px - nx) * (by - py) - (px - bx) * (ny - py))
+      self.indices.extend([start + np.argmax(area)])
+      numdone += 1
+
+    tail = np.arange(1 + numdone * width, n)
+    indices = np.concatenate([[0], self.indices.data, tail])
+    if self.keep_changes:
+      indices = np.union1d(indices, self.changes.data)
+    return indices
+
+  def get_values(self, y):
+    y = np.asarray(y, dtype=float)
+    if self.logscale:
+      with np.errstate(divide='ignore', invalid='ignore'):
+        return np.nan_to_num(np.log10(y), nan=0.0, neginf=0.0)
+    return y
+
+# Samplers by window - they are kept while the window is redrawn
+
+history_samplers = {}
+
+#-------------------------------------------------------------------------------
+# Samplers of objective function and design radius for the axes of a window
+#-------------------------------------------------------------------------------
+def get_history_samplers(window_name, axes):
+
+  numbuckets = int(axes.bbox.width)
+  samplers = history_samplers.get(window_name)
+  if (samplers is None) or (samplers[0].numbuckets != numbuckets):
+    samplers = (HistorySampler(numbuckets, keep_changes=True),
+                HistorySampler(numbuckets, logscale=True))
+    history_samplers[window_name] = samplers
+  return samplers
+
+################################################################################
+# Plots optimization history
+################################################################################
+
+@timed('draw', 'history')
+def plot_optimization_history(steps, fmins, relfmins, rads, firsttime=True,
+                              animation=False, prefix=None, duplicates=None):
+  global plotoptions
+
+  if (len(steps) == 0): return           # nothing to show
+
+  window_name = "Optimization History  " + str(prefix)
+
+  # Reuse artists of the previous frame - only append new steps
+
+  layout = (duplicates is not None,)
+  blit = get_blit_figure(window_name, layout, firsttime, animation)
+  if blit is not None:
+    if update_optimization_history(blit, steps, fmins, relfmins, rads, duplicates): return
+
+  # Set up optimization history plot.
+
+  if firsttime:
+    plt.close(window_name)
+    ofig, dummy  = plt.subplots(2, 1, num= window_name)
+    axarr = ofig.get_axes()
+    mirrorax0   = axarr[0].twinx()
+    place_window ((1420,70,480,380), "+1400+30", (500, 380))
+  else:
+    ofig  = plt.figure(num= window_name)
+    axarr = ofig.get_axes()
+    if (len(axarr) == 0): exit()            # User closed the window - stop
+    mirrorax0 = axarr[0].get_shared_x_axes().get_siblings(axarr[0])[0]
+    axarr[0].clear()
+    mirrorax0.clear()
+    axarr[1].clear()
+  blit = new_blit_figure(window_name, ofig, layout, animation)
+
+  # Plot optimization history - downsampled to the width of the axes
+
+  samplers = get_history_samplers(window_name, axarr[0])
+  if blit is not None: blit.state['samplers'] = samplers
+  i_fmin = samplers[0].get_indices(steps, fmins)
+  i_rad  = samplers[1].get_indices(steps, rads)
+
+  add_blit_artist(blit, 'fmin',
+                  axarr[0].plot(steps[i_fmin], fmins[i_fmin], color='grey', linewidth=0.8)[0])
+#  for t1 in axarr[0].get_yticklabels(): t1.set_color('grey')
+  add_blit_artist(blit, 'relfmin',
+                  mirrorax0.plot(steps[i_fmin], relfmins[i_fmin], color='red', linewidth=0.8)[0])
+  for t2 in mirrorax0.get_yticklabels(): t2.set_color('red')
+  add_blit_artist(blit, 'rad',
+                  axarr[1].plot(steps[i_rad], rads[i_rad], color='grey', linewidth=0.8)[0])
+
+  axarr[0].set_xlabel('Iteration')
+  axarr[0].set_ylabel('Objective function')
+  mirrorax0.set_ylabel('% Improvement over seed', color='red')
+  axarr[0].grid(axis='x')
+  axarr[1].set_xlabel('Iteration')
+  axarr[1].set_ylabel('Design radius')
+  axarr[1].set_yscale("log")
+  axarr[1].grid()
+
+  # leave some room for the next steps so the artists can be reused for a while
+
+  if blit is not None:
+    for axes in axarr:
+      axes.set_xlim(right = steps[-1] + max(10, 0.2 * steps[-1]))
+    ymin, ymax = axarr[0].get_ylim()                     # objective goes down
+    axarr[0].set_ylim(bottom = ymin - 0.2 * (ymax - ymin))
+    ymin, ymax = mirrorax0.get_ylim()                    # improvement goes up
+    mirrorax0.set_ylim(top = ymax + 0.2 * (ymax - ymin))
+    ymin, ymax = axarr[1].get_ylim()                     # radius goes down (log scale)
+    axarr[1].set_ylim(bottom = ymin * (ymin / ymax) ** 0.2)
+
+  improvement = print_improvement (mirrorax0, steps, relfmins)
+  if (blit is not None) and (improvement is not None):
+    add_blit_artist(blit, 'best_marker', improvement[0])
+    add_blit_artist(blit, 'best_text', improvement[1])
+
+  # Number of designs which are duplicates of earlier designs
+
+  if duplicates is not None:
+    add_blit_artist(blit, 'duplicates',
+                    axarr[1].text(0.02, 0.04, get_duplicates_text(duplicates), color='grey',
+                                  verticalalignment='bottom', horizontalalignment='left',
+                                  transform=axarr[1].transAxes, fontsize='small'))
+
+  # Update plot for animation only (for others, plt.show() must be called
+  # separately)
+
+  if animation:
+    if (firsttime): ofig.show()
+
+  plot_frame_timing(ofig, blit, 'history')
+  ofig.canvas.draw()
+
+  return
+
+#---------------------------------------------------------------------------------------
+# Update the artists of the history plot with new steps
+#
+#    returns False if the history doesn't fit into the current axes limits
+#---------------------------------------------------------------------------------------
+def update_optimization_history (blit, steps, fmins, relfmins, rads, duplicates):
+
+  artists = blit.artists
+
+  samplers = blit.state['samplers']
+  i_fmin = samplers[0].get_indices(steps, fmins)
+  i_rad  = samplers[1].get_indices(steps, rads)
+
+  artists['fmin'].set_data(steps[i_fmin], fmins[i_fmin])
+  artists['relfmin'].set_data(steps[i_fmin], relfmins[i_fmin])
+  artists['rad'].set_data(steps[i_rad], rads[i_rad])
+
+  if not blit.lines_within_limits(['fmin', 'relfmin', 'rad']): return False
+
+  best = get_best_improvement (steps, relfmins)
+  if (best is None) != ('best_marker' not in artists): return False
+
+  if best is not None:
+    i_best, latest = best
+    text, color, bbox = get_improvement_style(relfmins[i_best], latest)
+    artists['best_marker'].set_data([steps[i_best]], [relfmins[i_best]])
+    artists['best_text'].set_text(text)
+    artists['best_text'].xy = (steps[i_best], relfmins[i_best])
+    artists['best_text'].set_color(color)
+    artists['best_text'].set_bbox(bbox)
+  if 'duplicates' in artists:
+    artists['duplicates'].set_text(get_duplicates_text(duplicates))
+  plot_frame_timing(blit.fig, blit, 'history')
+
+  blit.update()
+
+  return True
+
+#---------------------------------------------------------------------------------------
+# Text with the number of duplicate designs
+#---------------------------------------------------------------------------------------
+def get_duplicates_text (duplicates):
+
+  if (duplicates == 1): return "1 duplicate design"
+  return str(duplicates) + " duplicate designs"
+
+#---------------------------------------------------------------------------------------
+# Print actual improvement in history plot
+#
+#    returns marker and annotation if there is an improvement
+#---------------------------------------------------------------------------------------
+def print_improvement (axes, steps, improvements):
+
+  best = get_best_improvement (steps, improvements)
+  if best is None: return None           # nothing to show
+
+  i_best, latest = best
+
+  my_marker = 7
+  y_text = 10
+  x_text = -4
+
+  text, color, bbox = get_improvement_style(improvements[i_best], latest)
+
+  marker = axes.plot([steps[i_best]], [improvements[i_best]], marker=my_marker, markersize=7,
+                     color="red")[0]
+  annotation = axes.annotate(text, xy = (steps[i_best], improvements[i_best]),
+                             xytext = (x_text,y_text), textcoords="offset points", ha = "center",
+                             fontsize='small', color=color, bbox = bbox)
+
+  return marker, annotation
+
+#---------------------------------------------------------------------------------------
+# Index of the step where the best improvement was reached first - None if no improvement
+#
+#    second value is True if the best improvement was reached with the latest step
+#---------------------------------------------------------------------------------------
+def get_best_improvement (steps, improvements):
+
+  if (len(steps) < 2): return None       # nothing to show
+
+  best_improve   = improvements [-1]
+
+  if not (best_improve > 0): return None
+
+  smaller = np.nonzero(np.asarray(improvements[:-1]) < best_improve)[0]
+  if (len(smaller) > 0):
+    i_best = smaller[-1] + 1
+  else:
+    i_best = 0
+
+  return i_best, (i_best == (len(steps) - 1))
+
+#---------------------------------------------------------------------------------------
+# Text, color and box of the improvement annotation
+#---------------------------------------------------------------------------------------
+def get_improvement_style (improvement, latest):
+
+  text = '{:.5f}'.format(improvement)+'%'
+  if latest:
+    return text, 'white', dict (facecolor="green")
+  else:
+    return text, 'grey', None
+
+################################################################################
+# Plots the evolution of shape and drag over all designs as heatmaps
+#
+#    The columns of the DesignStore are already matrices (designs x values),
+#    so the heatmaps are computed in one pass without a loop over the designs
+################################################################################
+def plot_design_evolution(seedfoil, designfoils, prefix=None):
   global plotoptions
 
-  # Set plot options ------
+  numfoils = len(designfoils)
+  if (numfoils == 0): return             # nothing to show
 
-  plot_polar       = True                 # Plot polar of current
-  plot_seed_polar  = plotoptions["show_seed_polar_only"] or plotoptions["show_seed_polar"]
-  plot_vs_lift     = plotoptions["drag_plot_type"] == "vs. lift"
+  window_name = "Design Evolution  " + str(prefix)
+  delta = plotoptions["evolution_delta_y"]
 
-  show_flap_angle  = True                 # show flap angle if available
-  show_cd_value    = True                 # show cd value at operating point
+  # Matrices of all designs - NaN where a design has less values than others
 
-  sc = plotoptions["color_for_seed"]
-  nc = plotoptions["color_for_new_designs"]
+  y = designfoils.values('y')
+  cd = designfoils.values('cd')
+  shape, shapelabel, shapecmap = get_evolution_values(y, seedfoil.y, delta, 'y', False)
+  drag, draglabel, dragcmap = get_evolution_values(cd, seedfoil.cd, delta, 'cd', True)
 
-  # --- end plot options
+  plt.close(window_name)
+  efig, axarr = plt.subplots(1, 2, num= window_name, gridspec_kw=dict(width_ratios=[3, 1]))
+  place_window ((70,480,1330,480), "+50+500", (1300, 480))
 
-  # Sanity check of plot options
+  # Rows are designs - design 1 at the bottom
 
-  if (len(seedfoil.alpha) == 0):  plot_seed_polar   = False
+  extent = [-0.5, 0.5, 0.5, numfoils + 0.5]
+  for axes, values, label, cmap in zip(axarr, [shape, drag], [shapelabel, draglabel],
+                                       [shapecmap, dragcmap]):
+    vmin, vmax = get_evolution_limits(values, cmap)
+    xmax = values.shape[1] - 0.5
+    image = axes.imshow(values, origin='lower', aspect='auto', interpolation='nearest',
+                        cmap=cmap, vmin=vmin, vmax=vmax,
+                        extent=[extent[0], xmax, extent[2], extent[3]])
+    efig.colorbar(image, ax=axes, label=label)
+    axes.set_ylabel('Design number')
 
-  if (plotnum > 0):
-    foil = designfoils[plotnum-1]
-    if (len(foil.alpha) == 0):
-      plot_polar   = False
+  # Coordinate points are labeled with x of the seed airfoil
+
+  iLE = np.argmin(seedfoil.x)
+  npt = y.shape[1]
+  ticks = np.unique(np.linspace(0, npt - 1, 9).astype(int).tolist() + [iLE])
+  ticks = ticks[ticks < seedfoil.npt]
+  axarr[0].set_xticks(ticks)
+  axarr[0].set_xticklabels(['{:.2f}'.format(seedfoil.x[i]) for i in ticks])
+  axarr[0].set_xlabel('x of coordinate point  (upper side - LE - lower side)')
+  axarr[0].axvline(iLE, color='grey', linewidth=0.8, linestyle='dashed')
+
+  axarr[1].set_xticks(range(cd.shape[1]))
+  axarr[1].set_xticklabels([str(i+1) for i in range(cd.shape[1])])
+  axarr[1].set_xlabel('Operating point')
+
+  efig.suptitle('Evolution of ' + str(numfoils) + ' designs')
+  efig.canvas.draw()
+
+  return
+
+#-------------------------------------------------------------------------------
+# Values of the heatmap - change against the seed (in % for drag) or absolute
+#-------------------------------------------------------------------------------
+def get_evolution_values(values, seedvalues, delta, name, relative):
+
+  seedvalues = np.asarray(seedvalues, dtype=float)
+  if (not delta) or (len(seedvalues) == 0):
+    return values, name, 'viridis'
+
+  # Designs with more values than the seed have no reference for them
+
+  width = values.shape[1]
+  reference = np.full(width, np.nan)
+  reference[0:min(width, len(seedvalues))] = seedvalues[0:width]
+
+  if relative:
+    with np.errstate(divide='ignore', invalid='ignore'):
+      return (values / reference - 1.0) * 100.0, name + ' change to seed [%]', 'RdBu_r'
+  else:
+    return values - reference, 'delta ' + name + ' to seed', 'RdBu_r'
+
+#-------------------------------------------------------------------------------
+# Color limits - symmetric around 0 for changes, outliers are clipped
+#-------------------------------------------------------------------------------
+def get_evolution_limits(values, cmap):
+
+  finite = values[np.isfinite(values)]
+  if (finite.size == 0): return None, None
+
+  if (cmap == 'RdBu_r'):
+    vmax = np.percentile(np.abs(finite), 99)
+    if (vmax == 0.0): vmax = 1.0
+    return -vmax, vmax
+  else:
+    return np.percentile(finite, [1, 99])
+
+################################################################################
+# Search of designs by the shape of their polar
+#
+#    The drag polar of each design is resampled onto a common grid of cl values
+#    (the cl range of the seed polar), so every polar is a vector of cd values.
+#    The nearest designs to a target polar are found with a KD-tree over these
+#    vectors - or brute force with numpy if scipy isn't installed. The distance
+#    is given as rms of the cd differences on the grid.
+################################################################################
+
+polar_search_points = 20        # cl values of the common grid
+
+class PolarSearch:
+
+  def __init__(self, seedfoil, designfoils, numpoints=polar_search_points):
+
+    self.numfoils = len(designfoils)
+
+    # Designs without polars (not written yet or not in memory) are left out
+
+    cl = designfoils.values('cl')
+    cd = designfoils.values('cd')
+    valid = np.all(np.isfinite(cl), axis=1) & np.all(np.isfinite(cd), axis=1)
+    valid = valid & (np.sum(np.isfinite(cl), axis=1) > 0)
+
+    if (len(seedfoil.cl) > 1):
+      clmin, clmax = np.min(seedfoil.cl), np.max(seedfoil.cl)
     else:
-      if (plotnum == 1):
-        prev_foil = seedfoil
+      clmin, clmax = np.min(cl[valid]), np.max(cl[valid])
+    self.grid = np.linspace(clmin, clmax, numpoints)
+
+    self.designnums = np.nonzero(valid)[0] + 1
+    self.cd = cd[valid]                         # cd at the op-points
+    self.vectors = get_resampled_polars(cl[valid], self.cd, self.grid)
+
+    self.tree = None
+    if (cKDTree is not None) and (len(self.designnums) > 0):
+      self.tree = cKDTree(self.vectors)
+
+  # k nearest designs to a vector as list of (design number, rms delta cd)
+  #    mask selects the designs which may be found
+
+  def nearest(self, vector, k, mask=None):
+
+    n = len(self.designnums)
+    if mask is None: mask = np.ones(n, dtype=bool)
+    k = min(k, int(np.sum(mask)))
+    if (k == 0): return []
+
+    if self.tree is not None:
+
+      # Ask the tree for more designs until enough of them are in the mask
+
+      numasked = k
+      while True:
+        distances, indices = self.tree.query(vector, k=min(numasked, n))
+        distances = np.atleast_1d(distances)
+        indices = np.atleast_1d(indices)
+        found = mask[indices]
+        if (np.sum(found) >= k) or (numasked >= n): break
+        numasked = 4 * numasked
+      distances = distances[found][0:k]
+      indices = indices[found][0:k]
+
+    else:
+      distances = np.sqrt(np.sum((self.vectors - vector)**2, axis=1))
+      distances[~mask] = np.inf
+      indices = np.argpartition(distances, k - 1)[0:k]
+      indices = indices[np.argsort(distances[indices])]
+      distances = distances[indices]
+
+    rms = distances / np.sqrt(len(self.grid))
+    return list(zip(self.designnums[indices].tolist(), rms.tolist()))
+
+  # k designs with the polar closest to the polar cl, cd
+
+  def nearest_to_polar(self, cl, cd, k):
+
+    vector = get_resampled_polars(np.atleast_2d(cl), np.atleast_2d(cd), self.grid)[0]
+    return self.nearest(vector, k)
+
+  # k designs closest to design designnum - with oppoint (1..noper) only those
+  # with a lower cd than designnum at this op-point
+
+  def nearest_to_design(self, designnum, k, oppoint=None):
+
+    index = np.searchsorted(self.designnums, designnum)
+    if (index == len(self.designnums)) or (self.designnums[index] != designnum):
+      return None
+
+    mask = (self.designnums != designnum)
+    if oppoint is not None:
+      mask = mask & (self.cd[:,oppoint-1] < self.cd[index,oppoint-1])
+
+    return self.nearest(self.vectors[index], k, mask)
+
+# Search of the current designs - built again when there are new designs
+
+polar_search = None
+
+#-------------------------------------------------------------------------------
+# Polar search over the current designs
+#-------------------------------------------------------------------------------
+def get_polar_search(seedfoil, designfoils):
+  global polar_search
+
+  if (polar_search is None) or (polar_search.numfoils != len(designfoils)):
+    polar_search = PolarSearch(seedfoil, designfoils)
+  return polar_search
+
+#-------------------------------------------------------------------------------
+# cd of the polars (rows of cl and cd) at the cl values of grid - linear
+# interpolation in one pass over all polars, constant beyond the last op-point
+#-------------------------------------------------------------------------------
+def get_resampled_polars(cl, cd, grid):
+
+  order = np.argsort(cl, axis=1)
+  cl = np.take_along_axis(cl, order, axis=1)
+  cd = np.take_along_axis(cd, order, axis=1)
+  rows = np.arange(cl.shape[0])[:,np.newaxis]
+
+  upper = np.sum(cl[:,:,np.newaxis] <= grid, axis=1)
+  upper = np.clip(upper, 1, cl.shape[1] - 1)
+  lower = upper - 1
+
+  cl0, cl1 = cl[rows, lower], cl[rows, upper]
+  cd0, cd1 = cd[rows, lower], cd[rows, upper]
+  with np.errstate(divide='ignore', invalid='ignore'):
+    t = np.clip(np.where(cl1 > cl0, (grid - cl0) / (cl1 - cl0), 0.0), 0.0, 1.0)
+
+  return cd0 + t * (cd1 - cd0)
+
+#-------------------------------------------------------------------------------
+# cl and cd of a polar file of xfoil (or of Xoptfoil) - None if not readable
+#-------------------------------------------------------------------------------
+def read_polar_file(filename):
+
+  f, compressed = open_data_file(filename)
+  if f is None: return None
+  data = f.read()
+  f.close()
+
+  # Values are behind the line '-------' - alpha, cl, cd, ...
+
+  start = data.rfind(b'-----')
+  if (start >= 0): start = data.find(b'\n', start) + 1
+  else: start = 0
+  table = decode_zone_data(data[start:].lstrip(b'\r\n'))
+  if (table.shape[0] < 2) or (table.shape[1] < 3): return None
+
+  return table[:,1], table[:,2]
+
+################################################################################
+# Menu to find designs by their polar
+def polar_search_menu(seedfoil, designfoils):
+
+  if (len(designfoils) == 0):
+    print("There are no designs to search.  Run xoptfoil first.")
+    return
+
+  starttime = time.perf_counter()
+  search = get_polar_search(seedfoil, designfoils)
+  if (len(search.designnums) == 0):
+    print("There are no designs with polars to search.")
+    return
+  buildtime = time.perf_counter() - starttime
+
+  print("")
+  target = my_input("Enter design number (0 for seed) or polar file as target: ")
+  numfound = my_input("Number of designs to find [5]: ")
+  numfound = int(numfound) if numfound.isdigit() and (int(numfound) > 0) else 5
+
+  starttime = time.perf_counter()
+
+  if target.isdigit():
+    designnum = int(target)
+    if (designnum == 0):
+      if (len(seedfoil.cl) < 2):
+        print("The seed airfoil has no polar.")
+        return
+      found = search.nearest_to_polar(seedfoil.cl, seedfoil.cd, numfound)
+    else:
+      oppoint = my_input("Only designs with lower cd at op-point (1-" +
+                         str(search.cd.shape[1]) + ", enter for all): ")
+      if oppoint.isdigit() and (1 <= int(oppoint) <= search.cd.shape[1]):
+        oppoint = int(oppoint)
       else:
-        prev_foil = designfoils[plotnum-2]
+        oppoint = None
+      found = search.nearest_to_design(designnum, numfound, oppoint)
+      if found is None:
+        print("Design number " + str(designnum) + " has no polar.")
+        return
   else:
-    plot_polar   = False
+    polar = read_polar_file(target)
+    if polar is None:
+      print("Error: no polar found in " + target + ".")
+      return
+    found = search.nearest_to_polar(polar[0], polar[1], numfound)
 
-  if not (plot_seed_polar or plot_polar): return
+  searchtime = time.perf_counter() - starttime
 
+  print("")
+  print("Searched " + str(len(search.designnums)) + " designs in " +
+        '{:.1f}'.format(1000 * searchtime) + " ms (index built in " +
+        '{:.1f}'.format(1000 * buildtime) + " ms)")
+  print("")
+  if (len(found) == 0):
+    print("No design found.")
+  for designnum, rms in found:
+    print("   Design number " + str(designnum).rjust(6) + "   rms delta cd " +
+          '{:.6f}'.format(rms))
 
-  # Set up polars plot.
+################################################################################
+# Monitors an ongoing optimization - updates the plots when new data arrives
+#
+#    Waits for changes of the files and keeps the windows responsive meanwhile.
+#    All data is re-read after monitor_update_interval anyway (in case changes
+#    were not signalled e.g. on a network drive)
+################################################################################
 
-  window_name = "Polars  " + str(prefix)
+gui_event_interval = 0.1        # s between processing of window events
 
-  if firsttime:
-    plt.close(window_name)
-    pfig, dummy = plt.subplots(2, 3, num= window_name)
-    pfig.subplots_adjust(hspace=0.3, wspace=0.3)
-    pfig.set_size_inches(11, 8, forward=True)
-    try:                            # Qt4Agg
-      plt.get_current_fig_manager().window.setGeometry(100,30,1300,550)
-    except:                         # TkAgg
-      plt.get_current_fig_manager().window.wm_geometry("+150+30")    # position
-      plt.get_current_fig_manager().resize(1230, 580)                # size
-  else:
-    pfig = plt.figure(num= window_name)
-    if (len(pfig.get_axes()) == 0): exit()     # User closed the window - stop
-    pfig.clear()
-    pfig.subplots (2,3)
+async def monitor_optimization(seedfoil, designfoils, reader, history, prefix):
+  global plotoptions
 
-  axarr = pfig.get_axes()
+  filenames = reader.get_filenames() + [history.filename, 'run_control']
 
+  # With the live channel the design files are only read when it can't deliver
+  # the new designs - and when there was no change for the update interval
 
-  # Auto plotting bounds
+  live = None
+  if live_designs:
+    live = LiveChannel(prefix + live_suffix)
+    filenames.append(live.filename)
 
-  if ( plot_seed_polar and not plot_polar ):
-    almax = np.max(seedfoil.alpha)
-    almin = np.min(seedfoil.alpha)
-    clmax = np.max(seedfoil.cl)
-    clmin = np.min(seedfoil.cl)
-    cdmax = np.max(seedfoil.cd)
-    cdmin = np.min(seedfoil.cd)
-    cmmax = np.max(seedfoil.cm)
-    cmmin = np.min(seedfoil.cm)
-    xtrmax = max([np.max(seedfoil.xtrt), np.max(seedfoil.xtrb)])
-    xtrmin = min([np.min(seedfoil.xtrt), np.min(seedfoil.xtrb)])
-    glidemax = np.max(seedfoil.glide)
-    glidemin = np.min(seedfoil.glide)
-    climbmax = np.max(seedfoil.climb)
-    climbmin = np.min(seedfoil.climb)
-
-  elif (plot_seed_polar and plot_polar ):
-    almax = max([np.max(seedfoil.alpha), np.max(foil.alpha)])
-    almin = min([np.min(seedfoil.alpha), np.min(foil.alpha)])
-    clmax = max([np.max(seedfoil.cl), np.max(foil.cl)])
-    clmin = min([np.min(seedfoil.cl), np.min(foil.cl)])
-    cdmax = max([np.max(seedfoil.cd), np.max(foil.cd)])
-    cdmin = min([np.min(seedfoil.cd), np.min(foil.cd)])
-    cmmax = max([np.max(seedfoil.cm), np.max(foil.cm)])
-    cmmin = min([np.min(seedfoil.cm), np.min(foil.cm)])
-    xtrmax = max([np.max(seedfoil.xtrt), np.max(seedfoil.xtrb),
-                  np.max(foil.xtrt), np.max(foil.xtrb)])
-    xtrmin = min([np.min(seedfoil.xtrt), np.min(seedfoil.xtrb),
-                  np.min(foil.xtrt), np.min(foil.xtrb)])
-    glidemax = max([np.max(seedfoil.glide), np.max(foil.glide)])
-    glidemin = min([np.min(seedfoil.glide), np.min(foil.glide)])
-    climbmax = max([np.max(seedfoil.climb), np.max(foil.climb)])
-    climbmin = min([np.min(seedfoil.climb), np.min(foil.climb)])
+  watcher = FileWatcher(filenames)
+  watcher.start()
 
-  else:
-    almax = np.max(foil.alpha)
-    almin = np.min(foil.alpha)
-    clmax = np.max(foil.cl)
-    clmin = np.min(foil.cl)
-    cdmax = np.max(foil.cd)
-    cdmin = np.min(foil.cd)
-    cmmax = np.max(foil.cm)
-    cmmin = np.min(foil.cm)
-    xtrmax = max([np.max(foil.xtrt), np.max(foil.xtrb)])
-    xtrmin = min([np.min(foil.xtrt), np.min(foil.xtrb)])
-    # jx-mod
-    glidemax = np.max(foil.glide)
-    glidemin = np.min(foil.glide)
-    climbmax = np.max(foil.climb)
-    climbmin = np.min(foil.climb)
+  init = True
+  monitoring = True
+  ioerror = 0
+  replot = True
 
-  alrng = almax - almin
-  almax = almax + 0.1*alrng
-  almin = almin - 0.1*alrng
-  cdrng = cdmax - cdmin
-  cdmax = cdmax + 0.1*cdrng
-  cdmin = cdmin - 0.1*cdrng
-  clrng = clmax - clmin
-  clmax = clmax + 0.1*clrng
-  clmin = clmin - 0.1*clrng
-  cmrng = cmmax - cmmin
-  cmmax = cmmax + 0.1*cmrng
-  cmmin = cmmin - 0.1*cmrng
-  xtrrng = xtrmax - xtrmin
-  xtrmax = xtrmax + 0.1*xtrrng
-  xtrmin = xtrmin - 0.1*xtrrng
-  # jx-mod
-  gliderng = glidemax - glidemin
-  glidemax = glidemax + 0.1*gliderng
-  glidemin = glidemin - 0.1*gliderng
-  if (glidemin < 0.0):
-    glidemin = 0.0
-  climbrng = climbmax - climbmin
-  climbmax = climbmax + 0.1*climbrng
-  climbmin = climbmin - 0.1*climbrng
-  if (climbmin < 0.0):
-    climbmin = 0.0
-  glideclmin = clmin
-  if (glideclmin < 0.0):
-    glideclmin = 0.0
+  while (monitoring):
 
+    # Update plot
 
-  # Plot polars
+    if (ioerror != 1) and replot:
+      numfoils = len(designfoils)
+      if plotoptions["plot_airfoils"]:
+        plot_airfoil_coordinates(seedfoil, matchfoil, designfoils, numfoils,
+                                  firsttime=init, animation=True, prefix = prefix)
+      if plotoptions["plot_polars"]:
+        plot_polars(seedfoil, designfoils, numfoils,
+                                  firsttime=init, animation=True, prefix = prefix)
+      if plotoptions["plot_optimization_history"]:
+        plot_optimization_history(history.steps, history.fmins, history.relfmins,
+                                  history.rads, firsttime=init, prefix = prefix,
+                                  animation=True,
+                                  duplicates=designfoils.count_duplicates())
 
-  if plot_vs_lift:
-    if plot_seed_polar: seed_x_values = seedfoil.cl
-    if plot_polar:      foil_x_values = foil.cl
-    x_label = 'Lift coefficient'
-  else:
-    if plot_seed_polar: seed_x_values = seedfoil.alpha
-    if plot_polar:      foil_x_values = foil.alpha
-    x_label = 'Angle of attack'
+      init = False
 
-  if plot_seed_polar :
-    plot_single_polar (axarr[0], seedfoil.alpha, seedfoil.alpha, seedfoil.cl, '-', sc, 'o')
-    plot_single_polar (axarr[1], seedfoil.alpha, seedfoil.cd, seedfoil.cl, '-', sc, 'o')
-    plot_single_polar (axarr[3], seedfoil.alpha, seedfoil.alpha, seedfoil.cm, '-', sc, 'o')
-    plot_single_polar (axarr[4], seedfoil.alpha, seedfoil.xtrt, seedfoil.alpha, '-', sc, 'o')
-    plot_single_polar (axarr[4], seedfoil.alpha, seedfoil.xtrb, seedfoil.alpha, '--', sc, 'o')
-    plot_single_polar (axarr[2], seedfoil.alpha, seed_x_values, seedfoil.glide, '-', sc, 'o')
-    plot_single_polar (axarr[5], seedfoil.alpha, seed_x_values, seedfoil.climb, '-', sc, 'o')
+      with timed_phase('flush'):
+        process_gui_events()
+
+    # Timings of reading the last update and of plotting it
+
+    frame_timer.end_frame()
+
+    # Wait for changes of files or the update interval
+
+    changed, reread = await wait_for_changes(watcher)
+
+    # Update airfoil and optimization data
+
+    prevseedfoil = seedfoil
+    numfoils = len(designfoils)
+    numpolars = len(reader.polarfile.zones)
+    numsteps = len(history.steps)
+
+    if (live is not None) and not reread:
+      readfiles = (len(changed) > 0) and not read_live_designs(live, designfoils)
+    else:
+      readfiles = reread or any((f in changed) for f in reader.get_filenames())
+
+    if readfiles:
+      seedfoil, designfoils, ioerror = read_new_airfoil_data(reader, seedfoil,
+                                                             designfoils)
+    if reread or (history.filename in changed):
+      history = read_new_optimization_history(history)
+
+    replot = ((seedfoil is not prevseedfoil) or (len(designfoils) != numfoils) or
+              (len(reader.polarfile.zones) != numpolars) or
+              (len(history.steps) != numsteps))
+
+    # Check for stop_monitoring in run_control file
+
+    if reread or ('run_control' in changed):
+      monitoring = read_run_control()
+
+  watcher.stop()
+
+  return seedfoil, designfoils
+
+#-------------------------------------------------------------------------------
+# Waits until files changed or monitor_update_interval is over - keeps the
+# windows responsive meanwhile
+#
+#    returns the changed files and True if all data should be re-read
+#-------------------------------------------------------------------------------
+async def wait_for_changes(watcher):
+  global plotoptions
+
+  readtime = time.time()
+  changed = set()
+  while ((len(changed) == 0) and
+         (time.time() - readtime < plotoptions["monitor_update_interval"])):
+    process_gui_events()
+    changed = await watcher.wait(gui_event_interval)
+
+  return changed, (len(changed) == 0)
+
+#-------------------------------------------------------------------------------
+# Checks run_control for stop commands - returns False if monitoring should stop
+#
+#    stop_monitoring is removed from run_control, stop is left for Xoptfoil
+#-------------------------------------------------------------------------------
+def read_run_control():
+
+  try:
+    f = open('run_control')
+  except IOError:
+    return True
+
+  monitoring = True
+  commands = []
+  for line in f:
+    commands += [line.strip()]
+    if (line.strip() == "stop_monitoring"):
+      print("stop_monitoring command found. Returning to main menu.")
+      monitoring = False
+    if (line.strip() == "stop"):
+      print("stop command found. Returning to main menu.")
+      monitoring = False
+  f.close()
+
+  if "stop_monitoring" in commands:
+    f = open('run_control', 'w')
+    for command in commands:
+      if command != "stop_monitoring":
+        f.write(command + '\n')
+    f.close()
+
+  return monitoring
+
+#-------------------------------------------------------------------------------
+# Lets the windows handle their events (redraw, resize, close, ...)
+#-------------------------------------------------------------------------------
+def process_gui_events():
+
+  for num in plt.get_fignums():
+    plt.figure(num).canvas.flush_events()
+
+################################################################################
+# Monitors all optimizations of the current directory in one window
+#
+#    e.g. the competitors <foil>_n_c and the final <foil> of the strak machine
+#    in its build directory. Each row of the window shows a case: its latest
+#    design, the polar of it and the objective function.
+################################################################################
+
+multi_monitor_max_cases = 6     # number of most recently changed cases shown
+multi_monitor_active_time = 600 # s since the last change of a case to be shown
+
+coordfile_suffix   = '_design_coordinates.dat'
+polarfile_suffix   = '_design_polars.dat'
+historyfile_suffix = '_optimization_history.dat'
+
+################################################################################
+# An optimization case read by the multi-run monitor
+class MonitoredCase:
+
+  def __init__(self, prefix):
+    self.prefix = prefix
+    self.reader = DesignFileReader(prefix + coordfile_suffix, prefix + polarfile_suffix)
+    self.seedfoil = Airfoil()
+    self.designfoils = new_design_store(self.reader)
+    self.history = None
+    self.lastchange = 0.0
+
+  # Reads the data appended since the last update - True if there was new data
 
-  if plot_polar:
-    plot_single_polar (axarr[0], foil.alpha, foil.alpha, foil.cl, '-', nc, 's')
-    plot_single_polar (axarr[1], foil.alpha, foil.cd, foil.cl, '-', nc, 's')
-    plot_single_polar (axarr[3], foil.alpha, foil.alpha, foil.cm, '-', nc, 's')
-    plot_single_polar (axarr[4], foil.alpha, foil.xtrt, foil.alpha, '-', nc, 's')
-    plot_single_polar (axarr[4], foil.alpha, foil.xtrb, foil.alpha, '--', nc, 's')
-    plot_single_polar (axarr[2], foil.alpha, foil_x_values, foil.glide, '-', nc, 's')
-    plot_single_polar (axarr[5], foil.alpha, foil_x_values, foil.climb, '-', nc, 's')
-
-    annotate_changes (axarr[0], prev_foil.alpha,prev_foil.cl,    foil.alpha,    foil.cl,    "y")
-    annotate_changes (axarr[1], prev_foil.cd,   prev_foil.cl,    foil.cd,       foil.cl,    "x")
-    annotate_changes (axarr[2], foil_x_values,  prev_foil.glide, foil_x_values, foil.glide, "y")
-    annotate_changes (axarr[3], prev_foil.alpha,prev_foil.cm,    foil.alpha,    foil.cm,    "y")
-    annotate_changes (axarr[4], prev_foil.xtrt, prev_foil.alpha, foil.xtrt,     foil.alpha, "x")
-    annotate_changes (axarr[4], prev_foil.xtrb, prev_foil.alpha, foil.xtrb,     foil.alpha, "x")
-    annotate_changes (axarr[5], foil_x_values,  prev_foil.climb, foil_x_values, foil.climb, "y")
+  def update(self):
+    prevseedfoil = self.seedfoil
+    numfoils = len(self.designfoils)
 
-    # show cd-value or flap anglein graph
+    self.seedfoil, self.designfoils, ioerror = read_new_coordinates(self.reader, self.seedfoil,
+                                                                    self.designfoils)
+    read_new_polars(self.reader, self.seedfoil, self.designfoils)
 
-    for i in range(len(foil.cl)):
-      if ((len(foil.flapangle) > 0) and (foil.flapangle[i] != 0) and show_flap_angle):
-        axarr[1].annotate(('f {:5.2f}'.format(foil.flapangle[i])), (cdmax - 0.29*cdrng, foil.cl[i]),
-                          fontsize = 8,color='dimgrey')
-      elif (show_cd_value):
-        axarr[1].annotate(('{:5.5f}'.format(foil.cd[i])), (foil.cd[i], foil.cl[i]),
-                          xytext = (12,-3), textcoords="offset points", fontsize = 8, color='dimgrey')
+    for filename in [self.reader.coordfile.filename, self.reader.binfile.filename]:
+      status = get_file_status(filename)
+      if status is not None:
+        self.lastchange = max(self.lastchange, status[1])
 
-  # set axis
+    return (self.seedfoil is not prevseedfoil) or (len(self.designfoils) != numfoils)
 
-  axarr[0].set_xlabel('Angle of attack')
-  axarr[0].set_ylabel('Lift coefficient')
-  axarr[0].set_xlim([almin,almax])
-  axarr[0].set_ylim([clmin,clmax])
-  axarr[0].grid(True)
+  # Reads the optimization history - True if there were new steps
 
-  axarr[1].set_xlabel('Drag coefficient')
-  axarr[1].set_ylabel('Lift coefficient')
-  axarr[1].set_xlim([cdmin,cdmax])
-  axarr[1].set_ylim([clmin,clmax])
-  axarr[1].grid(True)
+  def update_history(self):
+    if self.history is None: return False
+    numsteps = len(self.history.steps)
+    self.history.read_new()
+    return (len(self.history.steps) != numsteps)
 
-  axarr[3].set_xlabel('Angle of attack')
-  axarr[3].set_ylabel('Pitching moment coefficient')
-  axarr[3].set_xlim([almin,almax])
-  axarr[3].set_ylim([cmmin,cmmax])
-  axarr[3].grid(True)
+async def monitor_all_cases():
+  global plotoptions
 
-  axarr[4].set_xlabel('Transition x/c\n(top: solid, bottom: dashed)')
-  axarr[4].set_ylabel('Angle of attack')
-  axarr[4].set_xlim([xtrmin,xtrmax])
-  axarr[4].set_ylim([almin,almax])
-  axarr[4].grid(True)
+  window_name = "Monitor  " + os.path.basename(os.getcwd())
+  cases = {}
+  shown = []
 
-  axarr[2].set_xlabel(x_label)
-  axarr[2].set_ylabel('Glide ratio')
-  axarr[2].set_ylim([glidemin,glidemax])
-  axarr[2].grid(True)
+  watcher = FileWatcher(['run_control', 'optimization_history.dat'],
+                        patterns=['*' + coordfile_suffix, '*' + polarfile_suffix,
+                                  '*' + binary_suffix, '*' + historyfile_suffix])
+  watcher.start()
 
-  axarr[5].set_xlabel(x_label)
-  axarr[5].set_ylabel('Climb ratio')
-  axarr[5].set_ylim([climbmin,climbmax])
-  axarr[5].grid(True)
+  print('Monitoring all optimizations in ' + os.getcwd() + '. To stop, enter the command ' +
+        '"stop_monitoring" in run_control.')
 
-  if plot_vs_lift:
-    axarr[2].set_xlim([glideclmin,clmax])
-    axarr[5].set_xlim([glideclmin,clmax])
-  else:
-    axarr[2].set_xlim([almin,almax])
-    axarr[5].set_xlim([almin,almax])
+  monitoring = True
+  changed = set()
+  reread = True
 
-  # Draw legend
+  while (monitoring):
 
-  lines = []
+    # Look for new cases and read the changed ones
 
-  if plot_seed_polar:
-    fakeline = plt.Line2D((0,1),(0,0), linestyle='-', color=sc, marker='o', label="Seed airfoil")
-    lines.append(fakeline)
+    updated = set()
+    for filename in glob.glob('*' + coordfile_suffix) + glob.glob('*' + binary_suffix):
+      prefix = filename[0:-len(coordfile_suffix if filename.endswith(coordfile_suffix)
+                               else binary_suffix)]
+      if (prefix not in cases):
+        cases[prefix] = MonitoredCase(prefix)
+        print("Found optimization " + prefix + ".")
 
-  if plot_polar:
-    fakeline = plt.Line2D((0,1),(0,0), linestyle='-', color=nc, marker='s', label="Design number " + str(plotnum))
-    lines.append(fakeline)
+    for prefix, case in cases.items():
+      casefiles = case.reader.get_filenames()
+      if (reread or any((os.path.basename(f) in casefiles) for f in changed)):
+        if case.update(): updated.add(prefix)
 
-  bbox_loc = (0.5, 1.00)
-  labels = [l.get_label() for l in lines]
-  pfig.legend(lines, labels, loc="upper center",
-              bbox_to_anchor=bbox_loc, numpoints=1)
+    if assign_histories(cases) or reread or any(os.path.basename(f).endswith(
+                                       'optimization_history.dat') for f in changed):
+      for prefix, case in cases.items():
+        if case.update_history(): updated.add(prefix)
 
-  # Update plot for animation only (for others, plt.show() must be called separately)
+    # Update window - all rows if the shown cases changed
 
-  if animation:
-    if (firsttime): pfig.show()
+    newshown = get_shown_cases(cases)
+    if (newshown != shown) or not plt.fignum_exists(window_name):
+      if (len(shown) > 0) and not plt.fignum_exists(window_name):
+        break                                   # user closed the window - stop
+      shown = newshown
+      plot_all_cases(window_name, [cases[prefix] for prefix in shown], shown)
+    elif (len(updated & set(shown)) > 0):
+      plot_all_cases(window_name, [cases[prefix] for prefix in shown], updated)
 
-    # Save animation frames if requested
+    # Wait for changes of files or the update interval
 
-    if plotoptions["save_animation_frames"]:
-      if (prefix == None):
-        print("Error: no file prefix specified - cannot save animation frames.")
-      else:
-        imagefname = prefix + '_polars.png'
-        print("Saving image frame to file " + imagefname + ' ...')
-        plt.savefig(imagefname)
+    changed, reread = await wait_for_changes(watcher)
 
-  pfig.canvas.draw()
+    if reread or any((os.path.basename(f) == 'run_control') for f in changed):
+      monitoring = read_run_control()
 
-  return
+  watcher.stop()
 
-#---------------------------------------------------------------------------------------
-# Plots a single polar
-#
-#    tries to draw separate curves if the op_points do not belong to single "polar"
-#    so there will be no zick-zack on the screen 
+#-------------------------------------------------------------------------------
+# Gives each case its optimization history
 #
-#---------------------------------------------------------------------------------------
-def plot_single_polar (axes, alpha, x, y, my_linestyle, my_color, my_marker):
-
-  istart = 0
-  prev_alpha = -100
+#    <case>_optimization_history.dat or else optimization_history.dat, which is
+#    written by the latest started optimization - returns True if it was reassigned
+#-------------------------------------------------------------------------------
+def assign_histories(cases):
+
+  reassigned = False
+  latest = None
+
+  for prefix, case in cases.items():
+    if os.path.isfile(prefix + historyfile_suffix):
+      if case.history is None:
+        case.history = OptimizationHistory(prefix + historyfile_suffix)
+    elif (latest is None) or (case.lastchange > latest.lastchange):
+      latest = case
+
+  if ((latest is not None) and (latest.history is None) and
+      os.path.isfile('optimization_history.dat')):
+    for prefix, case in cases.items():
+      if (case.history is not None) and (case.history.filename == 'optimization_history.dat'):
+        case.history = case.history.get_finished()      # keeps the data read so far
+    latest.history = OptimizationHistory('optimization_history.dat')
+    reassigned = True
+
+  return reassigned
+
+#-------------------------------------------------------------------------------
+# Names of the cases shown in the window - the most recently changed ones
+#-------------------------------------------------------------------------------
+def get_shown_cases(cases):
+
+  active = [case for case in cases.values()
+            if (case.seedfoil.npt > 0) and
+               (time.time() - case.lastchange < multi_monitor_active_time)]
+  if (len(active) == 0):                        # nothing active - show the latest ones
+    active = [case for case in cases.values() if (case.seedfoil.npt > 0)]
+
+  active.sort(key=lambda case: case.lastchange, reverse=True)
+  return sorted(case.prefix for case in active[0:multi_monitor_max_cases])
+
+#-------------------------------------------------------------------------------
+# Plots the rows of the cases in prefixes into the monitor window
+#-------------------------------------------------------------------------------
+def plot_all_cases(window_name, cases, prefixes):
+  global plotoptions
 
-  for i in range(len(alpha)):
+  sc = plotoptions["color_for_seed"]
+  nc = plotoptions["color_for_new_designs"]
 
-    if (alpha[i] < prev_alpha) :              # draw new curve? 
-      iend = i 
-      axes.plot(x[istart:iend], y[istart:iend], linestyle=my_linestyle, color=my_color, 
-                marker=my_marker, linewidth=0.8)
-      istart = i 
-    
-    prev_alpha = alpha[i]
+  if (len(cases) == 0): return
 
-  iend   = len(alpha) 
-  axes.plot(x[istart:iend], y[istart:iend], linestyle=my_linestyle, color=my_color, 
-            marker=my_marker, linewidth=0.8)
+  # New window layout if the number of cases changed
 
+  if plt.fignum_exists(window_name):
+    fig = plt.figure(num= window_name)
+    axarr = fig.get_axes()
+  else:
+    axarr = []
+  if (len(axarr) != 3 * len(cases)):
+    plt.close(window_name)
+    fig, dummy = plt.subplots(len(cases), 3, num= window_name, squeeze=False,
+                              gridspec_kw=dict(width_ratios=[2, 1, 1]))
+    fig.subplots_adjust(hspace=0.5, wspace=0.3, left=0.05, right=0.97, top=0.95, bottom=0.06)
+    place_window ((100,30,1300,150+150*len(cases)), "+150+30", (1230, 150+150*len(cases)))
+    axarr = fig.get_axes()
+    fig.show()
+    prefixes = [case.prefix for case in cases]
+
+  for row, case in enumerate(cases):
+    if case.prefix not in prefixes: continue
+
+    ax_geo, ax_polar, ax_history = axarr[3*row:3*row+3]
+    for ax in [ax_geo, ax_polar, ax_history]:
+      ax.clear()
+      ax.tick_params(labelsize='x-small')
+
+    numfoils = len(case.designfoils)
+    seedfoil = case.seedfoil
+
+    # latest design with seed airfoil
+
+    ax_geo.plot(seedfoil.x, seedfoil.y, color=sc, linewidth=0.8)
+    if (numfoils > 0):
+      foil = case.designfoils[numfoils-1]
+      ax_geo.plot(foil.x, foil.y, color=nc, linewidth=0.8)
+      ax_geo.set_title(case.prefix + "  -  design number " + str(numfoils), fontsize='small',
+                       loc='left')
+    else:
+      ax_geo.set_title(case.prefix + "  -  seed airfoil", fontsize='small', loc='left')
+    ax_geo.set_aspect('equal', 'datalim')
+
+    # polar of latest design with the one of the seed airfoil
+
+    if (seedfoil.noper > 0):
+      ax_polar.plot(seedfoil.cd, seedfoil.cl, color=sc, marker='o', markersize=2, linewidth=0.8)
+    if (numfoils > 0) and (foil.noper > 0):
+      ax_polar.plot(foil.cd, foil.cl, color=nc, marker='s', markersize=2, linewidth=0.8)
+    ax_polar.set_title('cl over cd', fontsize='small')
+    ax_polar.grid()
+
+    # objective function
+
+    history = case.history
+    if (history is not None) and (len(history.steps) > 0):
+      i_fmin = get_history_samplers(case.prefix, ax_history)[0].get_indices(history.steps,
+                                                                            history.fmins)
+      ax_history.plot(history.steps[i_fmin], history.fmins[i_fmin], color='grey', linewidth=0.8)
+      if (len(history.relfmins) == len(history.steps)):
+        ax_history.set_title('Objective function  ' + '{:.5f}'.format(history.relfmins[-1]) +
+                             '%', fontsize='small')
+      else:
+        ax_history.set_title('Objective function', fontsize='small')
+    else:
+      ax_history.set_title('no optimization history', fontsize='small')
+    ax_history.grid(axis='x')
 
+  fig.canvas.draw_idle()
 
-#---------------------------------------------------------------------------------------
-# Annotate marker depending value increased or decreased
-#
-#    change_dir == "x""  watch the x- value - else watch the y_value for changes
+################################################################################
+# Web dashboard of an optimization (--serve)
 #
-#---------------------------------------------------------------------------------------
-def annotate_changes (axes, prev_x, prev_y, x, y, change_dir):
+#    A small HTTP server tails the design, polar and history files and pushes
+#    only the new records as Server-Sent Events to the browser, which draws
+#    them. For headless machines: e.g. ssh -L 8050:localhost:8050 <host>
+################################################################################
 
-  for i in range(len(x)):
+serve_keepalive = 15            # s between keepalive comments of an idle stream
+serve_max_queued = 1000         # events queued for a slow browser before it's dropped
 
-    if   (change_dir == "x") and (prev_x[i] != 0):
-      rel_improv = (x[i] - prev_x[i]) / prev_x[i]
-    elif (change_dir == "y") and (prev_y[i] != 0):
-      rel_improv = (y[i] - prev_y[i]) / prev_y[i]
+class DashboardServer:
+
+  def __init__(self, prefix):
+    self.prefix = prefix
+    self.case = MonitoredCase(prefix)
+    if os.path.isfile(prefix + historyfile_suffix):
+      self.case.history = OptimizationHistory(prefix + historyfile_suffix)
     else:
-      rel_improv = 0
+      self.case.history = OptimizationHistory()
+    self.clients = set()            # event queues of the connected browsers
+    self.numsent = 0                # number of designs sent
+    self.nopolars = []              # designs sent before their polars were written
+    self.numsteps = 0               # number of optimization steps sent
+
+  async def run(self, host, port):
+
+    server = await asyncio.start_server(self.handle_client, host, port)
+    print("Dashboard of " + self.prefix + " at http://" + host + ":" + str(port) +
+          "/  To stop, enter the command \"stop_monitoring\" in run_control.")
+
+    case = self.case
+    watcher = FileWatcher(case.reader.get_filenames() + [case.history.filename, 'run_control'])
+    watcher.start()
+
+    self.update()
+    monitoring = True
+    while (monitoring):
+      changed = await watcher.wait(serve_keepalive)
+      if (len(changed) == 0):
+        self.broadcast(None)                    # keepalive - and re-read anyway
+      self.update()
+      if ('run_control' in changed) or (len(changed) == 0):
+        monitoring = read_run_control()
+
+    watcher.stop()
+    server.close()
+    await server.wait_closed()
+
+  # Reads new data and sends it to all browsers
+
+  def update(self):
+
+    case = self.case
+    prevseedfoil = case.seedfoil
+    case.update()
+    case.update_history()
+
+    if (case.seedfoil is not prevseedfoil):       # new optimization run
+      self.broadcast(('seed', get_airfoil_record(0, case.seedfoil, True)))
+      self.numsent = 0
+      self.nopolars = []
+
+    history = case.history
+    if (len(history.steps) < self.numsteps):       # history file was replaced
+      self.numsteps = 0
+    if (len(history.steps) > self.numsteps):
+      self.broadcast(('history', get_history_record(history, self.numsteps)))
+      self.numsteps = len(history.steps)
+
+    for designnum in list(self.nopolars):
+      if case.reader.has_polars(designnum):
+        self.broadcast(('polars', get_polars_record(designnum, case.designfoils[designnum-1])))
+        self.nopolars.remove(designnum)
+
+    for i in range(self.numsent, len(case.designfoils)):
+      withpolars = case.reader.has_polars(i+1)
+      self.broadcast(('design', get_airfoil_record(i+1, case.designfoils[i], withpolars)))
+      if not withpolars: self.nopolars.append(i+1)
+    self.numsent = len(case.designfoils)
+
+  # Events for a new browser: seed, latest design and the history so far
+
+  def get_snapshot(self):
+
+    case = self.case
+    events = []
+    if (case.seedfoil.npt > 0):
+      events.append(('seed', get_airfoil_record(0, case.seedfoil, True)))
+    if (self.numsent > 0):
+      events.append(('design', get_airfoil_record(self.numsent, case.designfoils[self.numsent-1],
+                                                  case.reader.has_polars(self.numsent))))
+    events.append(('history', get_history_record(case.history, 0)))
+    return events
+
+  def broadcast(self, event):
+    for queue in list(self.clients):
+      if (queue.qsize() > serve_max_queued):
+        self.clients.discard(queue)
+        queue.put_nowait(False)                 # too slow - close stream
+      else:
+        queue.put_nowait(event)
 
+  # Answers a request of a browser: the page or the event stream
 
-    if (abs(rel_improv) > 1e-4):            # show annotation only if delta > epsilon
+  async def handle_client(self, reader, writer):
 
-      if (change_dir == "x"):
-        if (rel_improv > 0.0):
-          axes.annotate('>', xy = (x[i], y[i]),
-                xytext = (5,-2),   textcoords="offset points", fontsize = 8, color='dimgrey')
-        else:
-          axes.annotate('<', xy = (x[i], y[i]),
-                xytext = (-12,-2), textcoords="offset points", fontsize = 8, color='dimgrey')
+    try:
+      request = (await reader.readline()).decode('latin-1').split()
+      while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+        pass                                    # skip headers
+      path = request[1] if (len(request) > 1) else ''
+
+      if (path == '/'):
+        body = dashboard_html.replace('CASE_NAME', self.prefix).encode('utf-8')
+        writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8\r\n' +
+                     b'Content-Length: ' + str(len(body)).encode() + b'\r\n\r\n' + body)
+      elif (path == '/events'):
+        await self.stream_events(writer)
       else:
-        if (rel_improv > 0.0):
-          axes.annotate('^', xy = (x[i], y[i]),
-                xytext = (-3,3),   textcoords="offset points", fontsize = 8, color='dimgrey')
+        writer.write(b'HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n')
+      await writer.drain()
+    except (ConnectionError, asyncio.CancelledError):
+      pass
+    finally:
+      writer.close()
+
+  async def stream_events(self, writer):
+
+    writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n' +
+                 b'Cache-Control: no-cache\r\nConnection: keep-alive\r\n\r\n')
+
+    queue = asyncio.Queue()
+    for event in self.get_snapshot():
+      queue.put_nowait(event)
+    self.clients.add(queue)
+
+    try:
+      while True:
+        event = await queue.get()
+        if event is False: break
+        if event is None:
+          writer.write(b': keepalive\n\n')
         else:
-          axes.annotate('v', xy = (x[i], y[i]),
-                xytext = (-2,-10), textcoords="offset points", fontsize = 8, color='dimgrey')
+          name, record = event
+          writer.write(('event: ' + name + '\ndata: ' + json.dumps(record) + '\n\n').encode())
+        await writer.drain()
+    finally:
+      self.clients.discard(queue)
+
+#-------------------------------------------------------------------------------
+# Records of the events as dicts for JSON
+#-------------------------------------------------------------------------------
+def get_airfoil_record(designnum, foil, withpolars):
+
+  record = dict(design=designnum, x=get_json_values(foil.x), y=get_json_values(foil.y),
+                maxt=float(foil.maxt), xmaxt=float(foil.xmaxt),
+                maxc=float(foil.maxc), xmaxc=float(foil.xmaxc))
+  if withpolars:
+    record.update(get_polars_record(designnum, foil))
+  return record
+
+def get_polars_record(designnum, foil):
+
+  record = dict(design=designnum)
+  for name in ['alpha', 'cl', 'cd', 'cm', 'xtrt', 'xtrb', 'glide', 'climb']:
+    record[name] = get_json_values(getattr(foil, name))
+  return record
+
+def get_history_record(history, start):
+
+  record = dict(reset=(start == 0), steps=history.steps[start:].tolist(),
+                fmins=get_json_values(history.fmins[start:]),
+                rads=get_json_values(history.rads[start:]))
+  if (len(history.relfmins) == len(history.steps)):
+    record['relfmins'] = get_json_values(history.relfmins[start:])
+  return record
+
+# List of values for JSON - which has no NaN or inf
+
+def get_json_values(values):
+
+  values = np.asarray(values, dtype=float)
+  if np.all(np.isfinite(values)):
+    return values.tolist()
+  return [float(v) if np.isfinite(v) else None for v in values]
+
+#-------------------------------------------------------------------------------
+# The page of the dashboard - draws the events into canvases
+#-------------------------------------------------------------------------------
+dashboard_html = '''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Xoptfoil - CASE_NAME</title>
+<style>
+  body   { font-family: sans-serif; margin: 10px; background: #f4f4f4; }
+  canvas { background: #fff; border: 1px solid #ccc; margin: 3px; }
+  #status { color: #666; font-size: small; }
+</style>
+</head>
+<body>
+<h3>Xoptfoil - CASE_NAME</h3>
+<div id="status">connecting ...</div>
+<canvas id="geometry" width="1000" height="320"></canvas><br>
+<canvas id="polar" width="330" height="280"></canvas>
+<canvas id="glide" width="330" height="280"></canvas>
+<canvas id="history" width="330" height="280"></canvas>
+<script>
+var seed = null, design = null;
+var optHistory = { steps: [], fmins: [], relfmins: [], rads: [] };
+var pending = false;
+
+function bounds(values, b) {
+  for (var i = 0; i < values.length; i++) {
+    var v = values[i];
+    if (v === null) continue;
+    if (v < b[0]) b[0] = v;
+    if (v > b[1]) b[1] = v;
+  }
+  return b;
+}
+
+// curves: [{x: [], y: [], color: '', marker: false}]
+function plot(id, title, curves, equal) {
+  var canvas = document.getElementById(id), g = canvas.getContext('2d');
+  var m = 45, w = canvas.width - 2*m, h = canvas.height - 2*m;
+  g.clearRect(0, 0, canvas.width, canvas.height);
+  g.fillStyle = '#000'; g.font = '13px sans-serif';
+  g.fillText(title, m, 20);
+  g.strokeStyle = '#999'; g.strokeRect(m, m, w, h);
+
+  var bx = [Infinity, -Infinity], by = [Infinity, -Infinity];
+  curves.forEach(function (c) { if (c.x) { bounds(c.x, bx); bounds(c.y, by); } });
+  if (!(bx[1] >= bx[0])) return;
+  if (bx[1] == bx[0]) { bx[0] -= 1; bx[1] += 1; }
+  if (by[1] == by[0]) { by[0] -= 1; by[1] += 1; }
+  var sx = w / (bx[1] - bx[0]), sy = h / (by[1] - by[0]);
+  if (equal) { sx = sy = Math.min(sx, sy); }
+  var X = function (x) { return m + (x - bx[0]) * sx; };
+  var Y = function (y) { return m + h - (y - by[0]) * sy; };
+
+  g.font = '11px sans-serif'; g.fillStyle = '#666';
+  g.fillText(bx[0].toPrecision(3), m, m + h + 15);
+  g.fillText(bx[1].toPrecision(3), m + w - 30, m + h + 15);
+  g.fillText(by[0].toPrecision(3), 2, m + h);
+  g.fillText(by[1].toPrecision(3), 2, m + 10);
+
+  curves.forEach(function (c) {
+    if (!c.x) return;
+    g.strokeStyle = g.fillStyle = c.color; g.lineWidth = 1.2;
+    g.beginPath();
+    var pen = false;
+    for (var i = 0; i < c.x.length; i++) {
+      if (c.x[i] === null || c.y[i] === null) { pen = false; continue; }
+      if (pen) g.lineTo(X(c.x[i]), Y(c.y[i])); else g.moveTo(X(c.x[i]), Y(c.y[i]));
+      pen = true;
+      if (c.marker) g.fillRect(X(c.x[i]) - 2, Y(c.y[i]) - 2, 4, 4);
+    }
+    g.stroke();
+  });
+}
+
+function redraw() {
+  pending = false;
+  var d = design || {}, s = seed || {};
+  var title = 'Geometry';
+  if (design) title += '  -  design number ' + design.design + '  -  thickness ' +
+                       design.maxt + ' at ' + design.xmaxt + ', camber ' + design.maxc +
+                       ' at ' + design.xmaxc;
+  plot('geometry', title, [{x: s.x, y: s.y, color: 'blue'}, {x: d.x, y: d.y, color: 'red'}], true);
+  plot('polar', 'cl over cd', [{x: s.cd, y: s.cl, color: 'blue', marker: true},
+                               {x: d.cd, y: d.cl, color: 'red', marker: true}]);
+  plot('glide', 'Glide ratio over cl', [{x: s.cl, y: s.glide, color: 'blue', marker: true},
+                                        {x: d.cl, y: d.glide, color: 'red', marker: true}]);
+  var n = optHistory.steps.length, htitle = 'Objective function';
+  if (n > 0 && optHistory.relfmins.length == n)
+    htitle += '  -  ' + optHistory.relfmins[n-1].toFixed(5) + '% improvement';
+  plot('history', htitle, [{x: optHistory.steps, y: optHistory.fmins, color: 'grey'}]);
+}
+
+function schedule() {
+  if (!pending) { pending = true; window.requestAnimationFrame(redraw); }
+}
+
+var source = new EventSource('/events');
+source.onopen  = function () { document.getElementById('status').textContent = 'connected'; };
+source.onerror = function () { document.getElementById('status').textContent = 'reconnecting ...'; };
+source.addEventListener('seed', function (e) { seed = JSON.parse(e.data); design = null; schedule(); });
+source.addEventListener('design', function (e) { design = JSON.parse(e.data); schedule(); });
+source.addEventListener('polars', function (e) {
+  var p = JSON.parse(e.data);
+  if (design && design.design == p.design) { for (var k in p) design[k] = p[k]; schedule(); }
+});
+source.addEventListener('history', function (e) {
+  var h = JSON.parse(e.data);
+  if (h.reset) optHistory = { steps: [], fmins: [], relfmins: [], rads: [] };
+  for (var k in optHistory) if (h[k]) Array.prototype.push.apply(optHistory[k], h[k]);
+  schedule();
+});
+</script>
+</body>
+</html>
+'''
+
+################################################################################
+# Designs which are always shown in an animation: first, last and the designs
+# with the biggest improvements of the objective function
+################################################################################
+
+key_improvement = 0.02          # min. share of the total improvement of a key design
+
+def get_key_designs(numfoils, history):
+
+  keydesigns = [1, numfoils]
+
+  # A design is written for each improvement of the objective function. Assign
+  # them from the end as the first design may be written without an improvement
+
+  improvements = -np.diff(history.fmins)
+  improvements = improvements[improvements > 0]
+  numimproved = min(len(improvements), numfoils)
+
+  if (numimproved > 0):
+    improvements = improvements[-numimproved:]
+    designnums = np.arange(numfoils - numimproved + 1, numfoils + 1)
+    keydesigns.extend(designnums[improvements >= key_improvement * np.sum(improvements)])
+
+  return np.unique(keydesigns)
 
+#-------------------------------------------------------------------------------
+# Next design to show after design i if numframes frames were needed to render it
+#
+#    key designs are never skipped, duplicates of earlier designs (which look
+#    the same) are always skipped - except key designs
+#-------------------------------------------------------------------------------
+def get_next_design(i, numframes, keydesigns, numfoils, duplicates):
+
+  if (i >= numfoils): return numfoils + 1
 
+  nextdesign = min(i + max(numframes, 1), numfoils)
+  while ((nextdesign < numfoils) and duplicates[nextdesign-1] and
+         (nextdesign not in keydesigns)):
+    nextdesign += 1
+  skipped = keydesigns[(keydesigns > i) & (keydesigns < nextdesign)]
+  if (len(skipped) > 0):
+    nextdesign = skipped[0]
+
+  return int(nextdesign)
 
 ################################################################################
-# Plots optimization history
+# Export of all designs without windows
+#
+#    The designs are split into ranges which are rendered by a pool of processes
+#    with the Agg backend. Each window ('coordinates', 'polars') becomes a video
+#    if ffmpeg is available - otherwise image frames are written like option 2
 ################################################################################
 
-def plot_optimization_history(steps, fmins, relfmins, rads, firsttime=True,
-                              animation=False, prefix=None):
+export_framerate = 10                       # like the 0.1s pause of option 2
+
+# Data of the current export worker process
+
+export_data = {}
+
+def export_animation(seedfoil, matchfoil, designfoils, prefix, jobs=None):
   global plotoptions
 
-  if (len(steps) == 0): return           # nothing to show
+  numfoils = len(designfoils)
+  if (numfoils == 0):
+    print("There are no designs to export.  Run xoptfoil first.")
+    return
 
-  # Set up optimization history plot.
+  windows = []
+  if plotoptions["plot_airfoils"]: windows.append('coordinates')
+  if plotoptions["plot_polars"]:   windows.append('polars')
+  if (len(windows) == 0):
+    print("Neither airfoils nor polars are switched on in plotting options.")
+    return
 
-  window_name = "Optimization History  " + str(prefix)
+  if (jobs is None) or (jobs < 1): jobs = os.cpu_count() or 1
+  jobs = min(jobs, numfoils)
 
-  if firsttime:
-    plt.close(window_name)
-    ofig, dummy  = plt.subplots(2, 1, num= window_name)
-    axarr = ofig.get_axes()
-    mirrorax0   = axarr[0].twinx()
-    try:                            # Qt4Agg
-      plt.get_current_fig_manager().window.setGeometry(1420,70,480,380)
-    except:                         # TkAgg
-      plt.get_current_fig_manager().window.wm_geometry("+1400+30")    # position
-      plt.get_current_fig_manager().resize(500, 380)                  # size
-  else:
-    ofig  = plt.figure(num= window_name)
-    axarr = ofig.get_axes()
-    if (len(axarr) == 0): exit()            # User closed the window - stop
-    mirrorax0 = axarr[0].get_shared_x_axes().get_siblings(axarr[0])[0]
-    axarr[0].clear()
-    mirrorax0.clear()
-    axarr[1].clear()
+  ffmpeg = shutil.which('ffmpeg')
 
-  # Plot optimization history
+  # duplicates of earlier designs look the same - they are skipped, except
+  # the key designs which option 2 shows as well
 
-  axarr[0].plot(steps, fmins, color='grey', linewidth=0.8)
-#  for t1 in axarr[0].get_yticklabels(): t1.set_color('grey')
-  mirrorax0.plot(steps, relfmins, color='red', linewidth=0.8)
-  for t2 in mirrorax0.get_yticklabels(): t2.set_color('red')
-  axarr[1].plot(steps, rads, color='grey', linewidth=0.8)
+  keydesigns = get_key_designs(numfoils, read_new_optimization_history())
+  numframes = int(np.count_nonzero(get_exported_designs(designfoils, keydesigns)))
 
-  axarr[0].set_xlabel('Iteration')
-  axarr[0].set_ylabel('Objective function')
-  mirrorax0.set_ylabel('% Improvement over seed', color='red')
-  axarr[0].grid(axis='x')
-  axarr[1].set_xlabel('Iteration')
-  axarr[1].set_ylabel('Design radius')
-  axarr[1].set_yscale("log")
-  axarr[1].grid()
+  # contiguous range of designs for each process - ranges are rendered in order
 
-  print_improvement (mirrorax0, steps, relfmins)
+  bounds = np.linspace(1, numfoils + 1, jobs + 1).astype(int)
+  ranges = [(k, bounds[k], bounds[k+1]) for k in range(jobs)]
 
-  # Update plot for animation only (for others, plt.show() must be called
-  # separately)
+  if ffmpeg:
+    print("Exporting " + str(numframes) + " designs to video with " + str(jobs) + " processes ...")
+  else:
+    print("ffmpeg not found - exporting " + str(numframes) + " designs as image frames with " +
+          str(jobs) + " processes ...")
 
-  if animation:
-    if (firsttime): ofig.show()
+  starttime = time.time()
+  done = 0
 
-  ofig.canvas.draw()
+  # spawn fresh processes which didn't inherit the GUI backend and its windows
 
-  return
+  context = multiprocessing.get_context('spawn')
+  with context.Pool(jobs, initializer=init_export_worker,
+                    initargs=(seedfoil, matchfoil, designfoils, prefix, plotoptions,
+                              windows, ffmpeg, keydesigns)) as pool:
+    for rangeframes in pool.imap(export_frames, ranges):
+      done += rangeframes
+      print("   " + str(done) + " of " + str(numframes) + " designs exported.")
 
-#---------------------------------------------------------------------------------------
-# Print actual improvement in history plot
-#---------------------------------------------------------------------------------------
-def print_improvement (axes, steps, improvements):
+  if ffmpeg:
+    for window in windows:
+      join_video_segments(ffmpeg, prefix, window, len(ranges))
 
-  if (len(steps) < 2): return            # nothing to show
+  print("Export finished in " + '{:.1f}'.format(time.time() - starttime) + "s.")
 
-  i_best = len(steps) - 1
-  best_improve   = improvements [-1]
+#-------------------------------------------------------------------------------
+# Prepare export worker process
+#-------------------------------------------------------------------------------
+def init_export_worker(seedfoil, matchfoil, designfoils, prefix, options, windows, ffmpeg,
+                       keydesigns):
+  global plotoptions
 
-  if (best_improve > 0):
-    for i in reversed(range(len(steps)-1)):
-      if (improvements[i] < best_improve):
-        break
+  plt.switch_backend('Agg')
+  set_plot_style()
+
+  plotoptions.update(options)
+  plotoptions["save_animation_frames"] = False
+  plotoptions["fast_rendering"] = False
+
+  export_data.update(seedfoil=seedfoil, matchfoil=matchfoil, designfoils=designfoils,
+                     prefix=prefix, windows=windows, ffmpeg=ffmpeg, keydesigns=keydesigns)
+
+#-------------------------------------------------------------------------------
+# Render designs first .. last-1 of range number k - returns number of frames
+#    (duplicates of earlier designs look the same - they are skipped)
+#-------------------------------------------------------------------------------
+def export_frames(designrange):
+
+  k, first, last = designrange
+
+  seedfoil    = export_data['seedfoil']
+  matchfoil   = export_data['matchfoil']
+  designfoils = export_data['designfoils']
+  prefix      = export_data['prefix']
+  windows     = export_data['windows']
+  ffmpeg      = export_data['ffmpeg']
+  keydesigns  = export_data['keydesigns']
+
+  window_names = {'coordinates': "Geometry  " + str(prefix),
+                  'polars':      "Polars  " + str(prefix)}
+
+  # with ffmpeg each range becomes a video segment per window
+
+  videos = {}
+  if ffmpeg:
+    for window in windows:
+      videos[window] = subprocess.Popen([ffmpeg, '-y', '-loglevel', 'error',
+                                         '-f', 'image2pipe', '-framerate', str(export_framerate),
+                                         '-i', '-',
+                                         '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2',
+                                         '-pix_fmt', 'yuv420p',
+                                         get_video_segment_name(prefix, window, k)],
+                                        stdin=subprocess.PIPE)
+
+  # Image frames are numbered without the skipped duplicates - continuing the
+  # frames of the ranges before
+
+  exported = get_exported_designs(designfoils, keydesigns)
+  numframes = int(np.count_nonzero(exported))
+  firstframe = int(np.count_nonzero(exported[:first-1]))
+  framenum = firstframe
+
+  firsttime = True
+  for i in range(first, last):
+
+    if not exported[i-1]: continue
+    framenum += 1
+
+    if 'coordinates' in windows:
+      plot_airfoil_coordinates(seedfoil, matchfoil, designfoils, i, firsttime=firsttime,
+                               prefix=prefix)
+    if 'polars' in windows:
+      plot_polars(seedfoil, designfoils, i, firsttime=firsttime, prefix=prefix)
+    firsttime = False
+
+    for window in windows:
+      fig = plt.figure(num= window_names[window])
+      if ffmpeg:
+        fig.savefig(videos[window].stdin, format='png')
       else:
-        i_best = i
+        fig.savefig(get_frame_prefix(prefix, framenum, numframes) + '_' + window + '.png')
 
+  for video in videos.values():
+    video.stdin.close()
+    video.wait()
 
-    my_marker = 7
-    y_text = 10
-    x_text = -4
-
-    axes.plot([steps[i_best]], [improvements[i_best]], marker=my_marker, markersize=7, color="red")
-    if (i_best == (len(steps) - 1)):
-      axes.annotate(('{:.5f}'.format(improvements[i_best])+'%'),
-                    xy = (steps[i_best], improvements[i_best]),
-                    xytext = (x_text,y_text), textcoords="offset points", ha = "center",
-                    fontsize='small', color='white', bbox = dict (facecolor="green"))
-    else:
-      axes.annotate(('{:.5f}'.format(improvements[i_best])+'%'),
-                    xy = (steps[i_best], improvements[i_best]),
-                    xytext = (x_text,y_text), textcoords="offset points", ha = "center",
-                    fontsize='small', color='grey')
+  return framenum - firstframe
+
+#-------------------------------------------------------------------------------
+# Per design True if it's exported - all but the duplicates which aren't key
+# designs
+#-------------------------------------------------------------------------------
+def get_exported_designs(designfoils, keydesigns):
+
+  exported = ~designfoils.get_duplicates()
+  exported[np.asarray(keydesigns, dtype=int) - 1] = True
+  return exported
+
+#-------------------------------------------------------------------------------
+# Concatenate the video segments of a window in order and remove them
+#-------------------------------------------------------------------------------
+def join_video_segments(ffmpeg, prefix, window, numsegments):
+
+  segments = [get_video_segment_name(prefix, window, k) for k in range(numsegments)]
+  listname = prefix + '_' + window + '_segments.txt'
+  videoname = prefix + '_' + window + '.mp4'
+
+  # a range of only duplicate designs has no frames - and no video
+
+  with open(listname, 'w') as f:
+    for segment in segments:
+      if os.path.isfile(segment) and (os.path.getsize(segment) > 0):
+        f.write("file '" + os.path.abspath(segment) + "'\n")
+
+  subprocess.call([ffmpeg, '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0',
+                   '-i', listname, '-c', 'copy', videoname])
+
+  for name in segments + [listname]:
+    if os.path.isfile(name): os.remove(name)
+  print("Video written to file " + videoname)
+
+#-------------------------------------------------------------------------------
+# File name of video segment k of a window
+#-------------------------------------------------------------------------------
+def get_video_segment_name(prefix, window, k):
+
+  return prefix + '_' + window + '_part' + str(k) + '.mp4'
+
+#-------------------------------------------------------------------------------
+# File prefix of image frame of design i - padded with zeroes
+#-------------------------------------------------------------------------------
+def get_frame_prefix(prefix, i, numfoils):
+
+  width = int(floor(log10(float(numfoils)))) - 1
+  currwidth = int(floor(log10(float(i)))) - 1
+  numzeroes = width - currwidth
+  return prefix + numzeroes*'0' + str(i)
+
+################################################################################
+# Common style of all plot windows
+def set_plot_style():
+
+  rcParams['toolbar'] = 'None'    # Turn on matplotlib toolbar
+  plt.style.use('seaborn-paper')
+  rcParams['lines.linewidth'] = 1.5
 
 ################################################################################
 # Input function that checks python version
@@ -1107,12 +4469,17 @@ def my_input(message):
 
 ################################################################################
 # Plotting menu
-def plotting_menu(seedfoil, designfoils):
+def plotting_menu(seedfoil, designfoils, reader):
   global plotoptions
 
   # Load optimization history data if it's available
 
-  steps, fmins, relfmins, rads = read_new_optimization_history()
+  history = read_new_optimization_history()
+
+  # Designs written in the meantime are found by extending the zone index
+
+  seedfoil, designfoils, ioerror = read_new_airfoil_data(reader, seedfoil,
+                                                         designfoils)
 
   numfoils = len(designfoils)
   plotting_complete = False
@@ -1143,170 +4510,134 @@ def plotting_menu(seedfoil, designfoils):
         plot_airfoil_coordinates(seedfoil, matchfoil, designfoils, plotnum, firsttime=True)
       if plotoptions["plot_polars"]:
         plot_polars(seedfoil, designfoils, plotnum, firsttime=True)
-      if (plotoptions["plot_optimization_history"] and steps.shape[0] > 0):
-        plot_optimization_history(steps, fmins, relfmins, rads, firsttime=True)
+      if (plotoptions["plot_optimization_history"] and history.steps.shape[0] > 0):
+        plot_optimization_history(history.steps, history.fmins, history.relfmins,
+                                  history.rads, firsttime=True,
+                                  duplicates=designfoils.count_duplicates())
       plt.show(block=False)
       plotting_complete = False
 
-  return plotting_complete
+  return plotting_complete, seedfoil, designfoils
 
 ################################################################################
 # Reads new airfoil coordinates and polar files for updates during optimization
-def read_new_airfoil_data(seedfoil, designfoils, prefix):
+def read_new_airfoil_data(reader, seedfoil, designfoils):
 
-  # Temporary airfoil struct
+  # Read coordinates appended since the last update
 
-  foil = Airfoil()
-
-  # Set up file names to monitor
-
-  coordfilename = prefix + '_design_coordinates.dat'
-  polarfilename = prefix + '_design_polars.dat'
-
-  # Loop through files until we reach latest available design
+  prevseedfoil = seedfoil
+  numfoils = len(designfoils)
 
-  reading = True
-  while reading:
+  seedfoil, designfoils, ioerror = read_new_coordinates(reader, seedfoil,
+                                                        designfoils)
+  if (ioerror == 1):
+    print("Airfoil coordinates file " + reader.coordfile.filename +
+          " not available yet.")
+    return seedfoil, designfoils, ioerror
 
-    if (seedfoil.npt == 0):
-      zonetitle = 'zone t="Seed airfoil"'
-      foilstr = 'seed'
-      nextdesign = 0
-    else:
-      nextdesign = len(designfoils) + 1
-      zonetitle = 'zone t="Airfoil'
-      foilstr = 'design number ' + str(nextdesign)
-
-    # Read data from coordinate file
-
-    x, y, maxt, xmaxt, maxc, xmaxc, ioerror, deriv2, deriv3 = read_airfoil_coordinates(
-                                           coordfilename, zonetitle, nextdesign)
-    if (ioerror == 1):
-      print("Airfoil coordinates file " + coordfilename + " not available yet.")
-      reading = False
-      break
-    elif (ioerror == 2):
-      reading = False
-      break
+  newfoils = []
+  if (seedfoil is not prevseedfoil):
+    newfoils.append(('seed', 0))
+    numfoils = 0
+  for i in range(numfoils, len(designfoils)):
+    newfoils.append(('design number ' + str(i+1), i+1))
+
+  for foilstr, designnum in newfoils:
+    if (designnum > 0) and designfoils.is_duplicate(designnum-1):
+      print("Read coordinates for " + foilstr + " (duplicate of design number " +
+            str(designfoils.get_original(designnum-1) + 1) + ").")
     else:
       print("Read coordinates for " + foilstr + ".")
-      foil.setCoordinates(np.array(x), np.array(y))
-      # jx-mod additional 2nd and 3rd deriv
-      foil.setDerivatives (deriv2, deriv3)
-      # jx-mod additional 2nd and 3rd deriv
-      foil.setGeometryInfo(maxt, xmaxt, maxc, xmaxc)
-
-    # Set zone title for polars
 
-    if (foilstr == 'seed'):
-      zonetitle = 'zone t="Seed airfoil polar"'
-    else:
-      zonetitle = 'zone t="Polars", SOLUTIONTIME=' + str(nextdesign)
-
-    # Read data from polar file (not: negative error code means coordinates were
-    # read but not polars)
+  # Index polars appended since the last update - they are read when used
+  # (note: error code 3 means coordinates were read but not polars)
+  #
+  # Only completely written zones are indexed. Xoptfoil writes the polars
+  # after the coordinates, so polars not there yet are found at the next update
 
-    alpha, cl, cd, cm, xtrt, xtrb, flapangle, ioerror = read_airfoil_polars(polarfilename,
-                                                                      zonetitle)
+  ioerror = read_new_polars(reader, seedfoil, designfoils)
 
-    # retry - maybe it was a timing problem between Xoptfoil and visualizer
-    if (ioerror == 2):
-      time.sleep (2)
-      print("         Retry Zone labeled " + zonetitle )
-      alpha, cl, cd, cm, xtrt, xtrb, flapangle, ioerror = read_airfoil_polars(polarfilename,
-                                                                      zonetitle)
-
-    if (ioerror == 1):
-      print("Warning: polars will not be available for this design.")
-      ioerror = 3
-      reading = False
-    elif (ioerror == 2):
-      print("         Zone labeled " + zonetitle + " not found in " + polarfilename + ".")
-      print("Warning: polars will not be available for this design.")
-      ioerror = 3
-      reading = False
+  for foilstr, designnum in newfoils:
+    if reader.has_polars(designnum):
+      print("Found polars for " + foilstr + ".")
     else:
-      print("Read polars for " + foilstr + ".")
-      foil.setPolars(np.array(alpha), np.array(cl), np.array(cd), np.array(cm),
-                     np.array(xtrt), np.array(xtrb), np.array(flapangle))
-
-    # Copy data to output objects
+      print("Polars for " + foilstr + " not written yet.")
+      ioerror = 3
 
-    if (foilstr == 'seed'): seedfoil = foil
-    else: designfoils.append(foil)
+  if (ioerror == 1): ioerror = 3
 
   return seedfoil, designfoils, ioerror
 
 
 ################################################################################
 # Reads match airfoil coordinates
-def read_matchfoil (coordfilename):
+def read_matchfoil (reader):
 
   matchfoil = Airfoil()
-  zonetitle = 'zone t="Match airfoil"'
   foilstr = 'Match'
 
-  # Read data from coordinate file
-  x, y, maxt, xmaxt, maxc, xmaxc, ioerror, deriv2, deriv3 = read_airfoil_coordinates(
-                                          coordfilename, zonetitle, 0)
+  # Match airfoil mode writes no binary design history
+
+  if reader.is_binary():
+    return matchfoil, 2
+
+  # Read data from coordinate file - the zone index gives its position
+
+  ioerror = reader.coordfile.update_index()
+  zone = reader.coordfile.read_zone(-1)
 
   if (ioerror == 1):
-    print("Airfoil coordinates file " + coordfilename + " not available yet.")
-  elif (ioerror == 2):
+    print("Airfoil coordinates file " + reader.coordfile.filename + " not available yet.")
+  elif zone is None:
     # This is the normal "no match foil" mode
-    ioerror = 2             #dummy
+    ioerror = 2
   else:
     print("Read coordinates for " + foilstr + ".")
-    matchfoil.setCoordinates(np.array(x), np.array(y))
-    matchfoil.setDerivatives (deriv2, deriv3)
-    matchfoil.setGeometryInfo(maxt, xmaxt, maxc, xmaxc)
+    zonetitle, data = zone
+    matchfoil = parse_coordinates_zone(zonetitle, data)
 
   return matchfoil, ioerror
 
 ################################################################################
-# Reads new optimization history data for updates during optimization
-def read_new_optimization_history(steps=None, fmins=None, relfmins=None,
-                                  rads=None):
-
-  if ((steps is None) or steps.shape[0] == 0):
-    steps = np.zeros((0), dtype=int)
-    fmins = np.zeros((0))
-    relfmins = np.zeros((0))
-    rads = np.zeros((0))
-    currstep = 0
-  else:
-    numsteps = steps.shape[0]
-    currstep = steps[numsteps-1]
+# Reads a single design with a seek into coordinates and polars file
+#    (returns None if the design is not available)
+def read_design(reader, designnum):
 
-  # Loop through file until we reach latest available step
+  if reader.is_binary():
+    reader.binfile.update()
+    columns = reader.binfile.read_records(designnum, designnum + 1)
+    if columns is None: return None
+    return get_binary_airfoil(columns, 0)
 
-  reading = True
-  while reading:
+  zone = reader.coordfile.read_zone(designnum)
+  if zone is None: return None
 
-    if (steps.shape[0] == 0): nextstep = 1
-    else:
-      numsteps = steps.shape[0]
-      nextstep = steps[numsteps-1] + 1
-
-    # Read data from optimization history file
-
-    fmin, relfmin, rad, ioerror = read_optimization_history(nextstep)
-    if (ioerror == 1):
-      print("optimization_history.dat not available yet.")
-      reading = False
-    elif (ioerror == 2):
-      reading = False
-      if (nextstep - 1 > currstep):
-        print("Read optimization data to step " + str(nextstep-1) + ".")
-    else:
-      # Copy data to output objects
+  zonetitle, data = zone
+  foil = parse_coordinates_zone(zonetitle, data)
+
+  zone = reader.polarfile.read_zone(designnum)
+  if zone is not None:
+    zonetitle, data = zone
+    parse_polars_zone(foil, data)
+
+  return foil
+
+################################################################################
+# Reads new optimization history data for updates during optimization
+def read_new_optimization_history(history=None):
 
-      steps = np.append(steps, nextstep)
-      fmins = np.append(fmins, fmin)
-      relfmins = np.append(relfmins, relfmin)
-      rads = np.append(rads, rad)
+  if history is None:
+    history = OptimizationHistory()
 
-  return steps, fmins, relfmins, rads
+  numsteps = history.steps.shape[0]
+
+  ioerror = history.read_new()
+  if (ioerror == 1):
+    print("optimization_history.dat not available yet.")
+  elif (history.steps.shape[0] > numsteps):
+    print("Read optimization data to step " + str(history.steps[-1]) + ".")
+
+  return history
 
 ################################################################################
 # Gets boolean input from user
@@ -1441,7 +4772,8 @@ def options_menu():
        (key == "show_seed_polar") or (key == "show_seed_polar_only") or
        (key == "save_animation_frames") or (key == "plot_airfoils") or
        (key == "plot_polars") or (key == "show_airfoil_info") or
-       (key == "plot_optimization_history") ):
+       (key == "plot_optimization_history") or (key == "fast_rendering") or
+       (key == "evolution_delta_y") or (key == "show_frame_timing") ):
     options_complete = False
     plotoptions[key] = get_boolean_input(key, plotoptions[key])
 
@@ -1459,7 +4791,7 @@ def options_menu():
 
   # Change monitor update interval
 
-  elif (key == "monitor_update_interval"):
+  elif ((key == "monitor_update_interval") or (key == "animation_fps")):
     options_complete = False
     plotoptions[key] = get_float_input(key, plotoptions[key], minallow=0.0)
 
@@ -1482,13 +4814,11 @@ def options_menu():
 #
 # jx-mod initialchoice to autostart operation
 #
-def main_menu(initialchoice, seedfoil, designfoils, prefix):
+def main_menu(initialchoice, seedfoil, designfoils, reader, prefix, jobs=None):
   global plotoptions
 
   exitchoice = False
-  rcParams['toolbar'] = 'None'    # Turn on matplotlib toolbar
-  plt.style.use('seaborn-paper')
-  rcParams['lines.linewidth'] = 1.5
+  set_plot_style()
 
 
   while (not exitchoice):
@@ -1503,9 +4833,12 @@ def main_menu(initialchoice, seedfoil, designfoils, prefix):
       print("[2] Animate all designs")
       print("[3] Monitor an ongoing optimization")
       print("[4] Change plotting options")
+      print("[5] Export animation of all designs")
+      print("[6] Show evolution of all designs")
+      print("[7] Find designs by their polar")
       print("")
 
-      choice = my_input("Enter a choice [0-4]: ")
+      choice = my_input("Enter a choice [0-7]: ")
 
     # Exit design_visualizer
 
@@ -1520,8 +4853,9 @@ def main_menu(initialchoice, seedfoil, designfoils, prefix):
       # Go to plotting menu
 
       plotting_complete = False
-      while (not plotting_complete): plotting_complete = plotting_menu(
-                                                          seedfoil, designfoils)
+      while (not plotting_complete):
+        plotting_complete, seedfoil, designfoils = plotting_menu(seedfoil,
+                                                                 designfoils, reader)
 
     # Animate all designs
 
@@ -1537,42 +4871,67 @@ def main_menu(initialchoice, seedfoil, designfoils, prefix):
       if (numfoils == 0):
         print("There are no designs to animate.  Run xoptfoil first.")
         continue
-      width = int(floor(log10(float(numfoils)))) - 1
 
       # Loop through designs, updating plot
 
+      history = read_new_optimization_history()
+
       # Show history window
       if plotoptions["plot_optimization_history"]:
 
-        steps, fmins, relfmins, rads = read_new_optimization_history()
+        plot_optimization_history(history.steps, history.fmins, history.relfmins,
+                                  history.rads, firsttime=True, prefix = prefix,
+                                  animation=True,
+                                  duplicates=designfoils.count_duplicates())
+
+      # Designs are dropped if rendering is slower than animation_fps - except
+      # first, last and the designs with big improvements
 
-        plot_optimization_history(steps, fmins, relfmins, rads,
-                  firsttime=True, prefix = prefix, animation=True)
+      keydesigns = get_key_designs(numfoils, history)
+      duplicates = designfoils.get_duplicates()
+      frametime = 1.0 / plotoptions["animation_fps"]
+      numshown = 0
 
-      for i in range(0, numfoils):
-        if (i == 0): init = True
+      i = 1
+      while (i <= numfoils):
+        if (i == 1): init = True
         else: init = False
 
         if (plotoptions["save_animation_frames"]):
-
-          # Determine number of zeroes to pad with and image file prefix
-
-          currwidth = int(floor(log10(float(i+1)))) - 1
-          numzeroes = width - currwidth
-          imagepref = prefix + numzeroes*'0' + str(i+1)
-
+          imagepref = get_frame_prefix(prefix, i, numfoils)
         else: imagepref = None
 
         # Update plots
 
+        starttime = time.time()
+
         if plotoptions["plot_airfoils"]:
-          plot_airfoil_coordinates(seedfoil, matchfoil, designfoils, i+1, firsttime=init,
+          plot_airfoil_coordinates(seedfoil, matchfoil, designfoils, i, firsttime=init,
                                    animation=True, prefix=imagepref)
         if plotoptions["plot_polars"]:
-          plot_polars(seedfoil, designfoils, i+1,
+          plot_polars(seedfoil, designfoils, i,
                              firsttime=init, animation=True, prefix=imagepref)
+        with timed_phase('flush'):
+          process_gui_events()
+        frame_timer.end_frame()
+
+        plt.pause(max(frametime - (time.time() - starttime), 0.001))
+        numshown += 1
+
+        # all frames are needed when saving them - except of duplicates
+
+        if (plotoptions["save_animation_frames"]):
+          i = get_next_design(i, 1, keydesigns, numfoils, duplicates)
+        else:
+          numframes = int((time.time() - starttime) / frametime)
+          i = get_next_design(i, numframes, keydesigns, numfoils, duplicates)
 
-        plt.pause(0.1)
+      numduplicates = int(np.count_nonzero(duplicates))
+      if (numduplicates > 0):
+        print("Animation skipped " + str(numduplicates) + " duplicates of earlier designs.")
+      if (numshown < numfoils - numduplicates):
+        print("Animation showed " + str(numshown) + " of " + str(numfoils) +
+              " designs to keep " + str(plotoptions["animation_fps"]) + " frames per second.")
 
     # Monitor optimization progress
 
@@ -1596,65 +4955,15 @@ def main_menu(initialchoice, seedfoil, designfoils, prefix):
       # (clears any data from previous run)
 
       if not initialchoice:                       # if choice from command line do not re-read data
-        seedfoil, designfoils, ioerror = load_airfoils_from_file(coordfilename, polarfilename)
-
-      steps, fmins, relfmins, rads = read_new_optimization_history()
-
-      # Periodically read data and update plot
-
-      init = True
-      monitoring = True
-      ioerror = 0
-
-      while (monitoring):
-
-        # Update plot
-
-        if (ioerror != 1):
-          numfoils = len(designfoils)
-          if plotoptions["plot_airfoils"]:
-            plot_airfoil_coordinates(seedfoil, matchfoil, designfoils, numfoils,
-                                      firsttime=init, animation=True, prefix = prefix)
-          if plotoptions["plot_polars"]:
-            plot_polars(seedfoil, designfoils, numfoils,
-                                      firsttime=init, animation=True, prefix = prefix)
-          if plotoptions["plot_optimization_history"]:
-            plot_optimization_history(steps, fmins, relfmins, rads,
-                                      firsttime=init, prefix = prefix, animation=True)
-
-          init = False
-
-        # Pause for requested update interval
-        plt.pause(plotoptions["monitor_update_interval"])
-
-        # Update airfoil and optimization data
-        seedfoil, designfoils, ioerror = read_new_airfoil_data(seedfoil,
-                                                            designfoils, prefix)
-        steps, fmins, relfmins, rads  = read_new_optimization_history(
-                                                   steps, fmins, relfmins, rads)
-
-        # Check for stop_monitoring in run_control file
-        try:
-          f = open('run_control')
-        except IOError:
-          continue
-
-        commands = []
-        for line in f:
-          commands += [line.strip()]
-          if (line.strip() == "stop_monitoring"):
-            print("stop_monitoring command found. Returning to main menu.")
-            monitoring = False
-          if (line.strip() == "stop"):
-            print("stop command found. Returning to main menu.")
-            monitoring = False
-        f.close()
-        if len(commands) > 0:
-          f = open('run_control', 'w')
-          for command in commands:
-            if command != "stop_monitoring":
-              f.write(command + '\n')
-          f.close()
+        seedfoil, designfoils, reader, ioerror = load_airfoils_from_file(coordfilename,
+                                                                         polarfilename)
+
+      history = read_new_optimization_history()
+
+      # Read data and update plot whenever the files change
+
+      seedfoil, designfoils = asyncio.run(monitor_optimization(seedfoil, designfoils,
+                                                               reader, history, prefix))
 
       # Change save_animation_frames back to original setting when done
 
@@ -1667,10 +4976,36 @@ def main_menu(initialchoice, seedfoil, designfoils, prefix):
       options_complete = False
       while (not options_complete): options_complete = options_menu()
 
+    # Export all designs in background processes
+
+    elif (choice == "5"):
+      exitchoice = False
+
+      export_animation(seedfoil, matchfoil, designfoils, prefix, jobs)
+
+    # Heatmaps of shape and drag over all designs
+
+    elif (choice == "6"):
+      exitchoice = False
+
+      if (len(designfoils) == 0):
+        print("There are no designs to show.  Run xoptfoil first.")
+        continue
+
+      plot_design_evolution(seedfoil, designfoils, prefix)
+      plt.show(block=False)
+
+    # Designs with the polar closest to a target polar
+
+    elif (choice == "7"):
+      exitchoice = False
+
+      polar_search_menu(seedfoil, designfoils)
+
     # Invalid choice
 
     else:
-      print("Error: please enter a choice 0-4.")
+      print("Error: please enter a choice 0-7.")
 
     initialchoice = ""
 
@@ -1689,11 +5024,39 @@ if __name__ == "__main__":
 #
   # initiate the parser
   parser = argparse.ArgumentParser('')
-  parser.add_argument("--option", "-o", help="set initial action option", choices=['1','2','3','4'])
+  parser.add_argument("--option", "-o", help="set initial action option",
+                      choices=['1','2','3','4','5','6','7'])
   parser.add_argument("--case", "-c", help="the case name for the optimization (e.g., optfoil)")
+  parser.add_argument("--jobs", "-j", type=int,
+                      help="number of processes for export of animation (default: all cores)")
+  parser.add_argument("--all", "-a", action="store_true",
+                      help="monitor all optimizations of the current directory in one window")
+  parser.add_argument("--serve", "-s", nargs='?', const=8050, type=int, metavar='PORT',
+                      help="serve a web dashboard of the optimization (default port 8050)")
+  parser.add_argument("--host", default='127.0.0.1',
+                      help="address of the web dashboard (default 127.0.0.1)")
+  parser.add_argument("--keep", "-k", type=int, default=0, metavar='N',
+                      help="bounded memory: keep only the latest N designs and a sample " +
+                           "of older ones in memory (for long monitoring sessions)")
+  parser.add_argument("--live", "-l", action="store_true",
+                      help="monitor: take new designs from the live channel of Xoptfoil " +
+                           "(write_live_designs = .true.)")
+  parser.add_argument("--timing", "-t", metavar='FILE',
+                      help="write the timings of read, parse, derive, draw and flush " +
+                           "of each frame to a csv file")
 
   # read arguments from the command line
   args = parser.parse_args()
+  bounded_designs = args.keep
+  live_designs = args.live
+  if args.timing: frame_timer.start_log(args.timing)
+
+  # Monitor all optimizations (e.g. in the build directory of the strak machine)
+
+  if args.all:
+    set_plot_style()
+    asyncio.run(monitor_all_cases())
+    exit()
 
   if args.case:
     prefix = args.case
@@ -1705,9 +5068,15 @@ if __name__ == "__main__":
   coordfilename = prefix + '_design_coordinates.dat'
   polarfilename = prefix + '_design_polars.dat'
 
+  # Web dashboard instead of plot windows
+
+  if args.serve:
+    asyncio.run(DashboardServer(prefix).run(args.host, args.serve))
+    exit()
+
   # Read airfoil coordinates and polars
 
-  seedfoil, designfoils, ioerror = load_airfoils_from_file(
+  seedfoil, designfoils, reader, ioerror = load_airfoils_from_file(
                                                    coordfilename, polarfilename)
   # Warning if file is not found
 
@@ -1718,7 +5087,7 @@ if __name__ == "__main__":
 
   # Is there a matchfoil? If yes switch of polars as there will be no polars..
 
-  matchfoil, ioerror = read_matchfoil (coordfilename)
+  matchfoil, ioerror = read_matchfoil (reader)
   if (ioerror == 0):
     plotoptions["plot_polars"] = False
     plotoptions["plot_optimization_history"] = False
@@ -1734,4 +5103,5 @@ if __name__ == "__main__":
 
   # Call main menu
 
-  if (abs(ioerror) <= 1): main_menu(args.option, seedfoil, designfoils, prefix)
+  if (abs(ioerror) <= 1): main_menu(args.option, seedfoil, designfoils, reader, prefix,
+                                    args.jobs)